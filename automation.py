@@ -1,20 +1,104 @@
+from datetime import timedelta
 from prefect import task, flow
-from genre_analysis import GenrePulseAnalyzer
-from data_collector import GenreDataCollector
-
-collector = GenreDataCollector()
-analyzer = GenrePulseAnalyzer()
-
-@task
-def collect_and_analyze():
-    data = collector.collect_all_data(days=7)
-    analyzer.process_api_data(data["spotify"], data["youtube"], data["lastfm"])
-    analyzer.analyze_trends()
-    analyzer.save_report()
-
-@flow
-def weekly_flow():
-    collect_and_analyze()
+from prefect.cache_policies import INPUTS
+from prefect.task_runners import ThreadPoolTaskRunner
+from config import FLOW_WORKERS, FLOW_TASK_RETRIES, FLOW_RETRY_DELAY_SECONDS, FLOW_CACHE_HOURS
+from services import get_analyzer, get_collector
+
+# Collector and analyzer are built inside the tasks, so registering or
+# inspecting the deployment does not load the dataframe stack.
+#
+# The weekly flow is a DAG: one collection task per (provider, artist),
+# mapped over a thread pool, then one storage task per collected shard and
+# the metric history, then forecasting, genre flow, trend detection and
+# similarity side by side, then rendering. Collection, storage and history
+# results are cached by input hash, so a rerun after a partial failure only
+# refetches and stores the shards that failed. The other
+# tasks read the warehouse and rely on its own caches (forecast cache,
+# genre graph watermark, similarity index version).
+
+SOURCES = ("spotify", "youtube", "lastfm")
+
+RETRIES = {"retries": FLOW_TASK_RETRIES, "retry_delay_seconds": FLOW_RETRY_DELAY_SECONDS}
+CACHED = {"cache_policy": INPUTS, "cache_expiration": timedelta(hours=FLOW_CACHE_HOURS)}
+
+
+@task(task_run_name="collect-{source}-{artist}", **RETRIES, **CACHED)
+def collect_shard(source, artist):
+    # Raising (rather than returning None) makes Prefect retry the shard and
+    # keeps a failed fetch out of the result cache
+    data = get_collector().collect_source(source, artist)
+    if data is None:
+        raise RuntimeError(f"No {source} data for {artist}")
+    return data
+
+@task(task_run_name="store-{source}-{artist}", **RETRIES, **CACHED)
+def store_shard(source, artist, data, target):
+    # Cached too, so a rerun does not append an already stored shard again
+    from data_collector import shard_sources
+
+    sources = shard_sources({(source, artist): data}, target, [] if artist == target else [artist])
+    get_analyzer().process_api_data(sources["spotify"], sources["youtube"], sources["lastfm"],
+                                    artist_name=target, history=False)
+
+@task(**RETRIES, **CACHED)
+def record_history(sources, artist):
+    # Genre rollups span artists, so history is derived from every shard at once
+    get_analyzer().process_api_data(sources["spotify"], sources["youtube"], sources["lastfm"],
+                                    artist_name=artist, store=False)
+
+@task(**RETRIES)
+def forecast_trends():
+    get_analyzer().analyze_trends()
+
+@task(**RETRIES)
+def update_genre_flow():
+    # Applies only observations newer than the persisted graph's watermark
+    return get_analyzer().update_genre_flow()
+
+@task(**RETRIES)
+def detect_trends():
+    return get_analyzer().detect_trends()
+
+@task(**RETRIES)
+def compare_artists(artist, comparisons):
+    return get_analyzer().compare_artists(artist, comparisons)
+
+@task(**RETRIES)
+def render_report(artist, similarity, genre_flow, trends):
+    get_analyzer().save_report(artist_name=artist, similarity=similarity, genre_flow=genre_flow, trends=trends)
+
+@flow(task_runner=ThreadPoolTaskRunner(max_workers=FLOW_WORKERS))
+def weekly_flow(artist=None, comparisons=None):
+    from data_collector import TARGET_ARTIST, COMPARISON_ARTISTS, shard_sources
+
+    artist = artist or TARGET_ARTIST
+    comparisons = list(COMPARISON_ARTISTS if comparisons is None else comparisons)
+    shards = [(source, name) for source in SOURCES for name in (artist, *comparisons)]
+    futures = collect_shard.map([source for source, _ in shards], [name for _, name in shards])
+
+    # A shard that is still failing after its retries is left out of this
+    # report rather than blocking it; the run is then marked failed so a
+    # rerun picks up just those shards
+    results, failed = {}, []
+    for shard, future in zip(shards, futures):
+        future.wait()
+        if future.state.is_completed():
+            results[shard] = future.result()
+        else:
+            failed.append(shard)
+
+    stored = [store_shard.submit(source, name, data, artist) for (source, name), data in results.items()]
+    processed = record_history.submit(shard_sources(results, artist, comparisons), artist, wait_for=stored)
+    forecast = forecast_trends.submit(wait_for=[processed])
+    genre_flow = update_genre_flow.submit(wait_for=[processed])
+    trends = detect_trends.submit(wait_for=[processed])
+    similarity = compare_artists.submit(artist, comparisons, wait_for=[processed])
+    render_report.submit(artist, similarity, genre_flow, trends, wait_for=[forecast]).result()
+
+    if failed:
+        names = ", ".join(f"{source}/{name}" for source, name in failed)
+        raise RuntimeError(f"Report built without {len(failed)} failed collection shards: {names}")
 
 if __name__ == "__main__":
     weekly_flow()
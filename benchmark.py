@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from replay import ReplayServer, replay_collector, synthetic_roster
+
+# Endpoint request models cap a batch at 500 artists
+API_BATCH_LIMIT = 500
+
+# Modules a worker must not need just to start and answer /health
+HEAVY_MODULES = ("pandas", "pyarrow", "statsforecast", "sklearn", "numba", "networkx", "scipy")
+
+# Runs in a fresh interpreter so nothing is already imported
+STARTUP_PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+result = {{"import_seconds": time.perf_counter() - started}}
+if {health}:
+    from fastapi.testclient import TestClient
+    with TestClient({module}.app) as client:
+        client.get("/health").raise_for_status()
+    result["first_health_seconds"] = time.perf_counter() - started
+result["heavy_modules"] = sorted(m for m in {heavy!r} if m in sys.modules)
+print(json.dumps(result))
+"""
+
+
+def _rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Recorder:
+    def __init__(self, server):
+        self.server = server
+        self.results = []
+
+    def time(self, size, stage, fn, *args, **kwargs):
+        requests_before = self.server.counts["requests"]
+        errors_before = self.server.counts["errors"]
+        started = time.perf_counter()
+        value = fn(*args, **kwargs)
+        self.add(
+            size, stage, time.perf_counter() - started,
+            upstream_requests=self.server.counts["requests"] - requests_before,
+            injected_errors=self.server.counts["errors"] - errors_before,
+            max_rss_mb=round(_rss_mb(), 1),
+        )
+        return value
+
+    def add(self, size, stage, seconds, **extra):
+        self.results.append({"size": size, "stage": stage, "seconds": round(seconds, 6), **extra})
+        print(f"  {stage:<28} {seconds:9.3f}s", flush=True)
+
+
+def measure_startup(module="main", health=True, repeats=3):
+    # Median import (and first /health) time over fresh interpreters, from
+    # an empty working directory
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+    samples = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as cwd:
+            probe = STARTUP_PROBE.format(module=module, health=health, heavy=HEAVY_MODULES)
+            output = subprocess.run([sys.executable, "-c", probe], cwd=cwd, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {"heavy_modules": samples[-1]["heavy_modules"]}
+    for key in ("import_seconds", "first_health_seconds"):
+        if key in samples[0]:
+            result[key] = float(np.median([sample[key] for sample in samples]))
+    return result
+
+
+def bench_startup(recorder, repeats=3):
+    # Size 0: import-time stages, independent of the roster
+    print("startup", flush=True)
+    api = measure_startup("main", health=True, repeats=repeats)
+    recorder.add(0, "startup_import_main", api["import_seconds"], heavy_modules=api["heavy_modules"])
+    recorder.add(0, "startup_first_health", api["first_health_seconds"], heavy_modules=api["heavy_modules"])
+    flow = measure_startup("automation", health=False, repeats=repeats)
+    recorder.add(0, "startup_import_automation", flow["import_seconds"], heavy_modules=flow["heavy_modules"])
+
+
+def seed_history(analyzer, tables, weeks, seed=0):
+    # Backfill `weeks` of weekly observations from one run's tables, with a
+    # random walk per series, so analyze_trends has real history to fit
+    from history_store import extract_observations
+
+    observations = extract_observations(tables)
+    if observations.empty:
+        return 0
+    rng = np.random.default_rng(seed)
+    latest = observations["ds"].max()
+    frames = []
+    for week in range(weeks, 0, -1):
+        drift = 1 + rng.normal(0, 0.03, len(observations))
+        frames.append(observations.assign(
+            ds=latest - pd.Timedelta(weeks=week),
+            y=observations["y"] * drift,
+        ))
+    return analyzer.history.append(pd.concat(frames, ignore_index=True))
+
+
+def bench_api(recorder, size, roster, collector, analyzer):
+    import main
+    import services
+    from fastapi.testclient import TestClient
+    from coalesce import RequestCoalescer
+    from storage import SingleFlight
+
+    # Swap in the benchmark's pipeline for the duration of the API stages and
+    # put the app's own back afterwards
+    saved_instances = dict(services._instances)
+    saved_coalescer = main.coalescer
+    services.provide("collector", collector)
+    services.provide("analyzer", analyzer)
+    services.provide("renderer", analyzer.renderer)
+    # Every call should do the full work, not reuse a fresh coalesced result
+    main.coalescer = RequestCoalescer(freshness_seconds=0, flights=SingleFlight())
+    try:
+        batch = roster[:API_BATCH_LIMIT]
+        with TestClient(main.app) as client:
+            def call(method, path, expected=200, **kwargs):
+                response = client.request(method, path, **kwargs)
+                if response.status_code != expected:
+                    raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+                return response
+
+            recorder.time(size, "api_health", call, "GET", "/health")
+            recorder.time(size, "api_analyze_artists", call, "POST", "/analyze_artists", json={"artists": batch})
+            recorder.time(size, "api_analyze_artist", call, "GET", f"/analyze_artist/{roster[0]}")
+            recorder.time(size, "api_generate_report", call, "GET", "/generate_report")
+            report = recorder.time(size, "api_download_report", call, "GET", "/download_report")
+            recorder.time(size, "api_download_report_304", call, "GET", "/download_report", expected=304,
+                          headers={"If-None-Match": report.headers["etag"]})
+            recorder.time(size, "api_download_report_html", call, "GET", "/download_report", params={"format": "html"})
+    finally:
+        main.coalescer.shutdown()
+        main.coalescer = saved_coalescer
+        with services._lock:
+            services._instances.clear()
+            services._instances.update(saved_instances)
+
+
+def run(sizes, latency=0.005, jitter=0.0, error_rate=0.0, history_weeks=12, max_reports=100,
+        fixtures_dir=None, rate_limited=False, api=True, seed=0, workdir=None, startup=True):
+    workdir = workdir or tempfile.mkdtemp(prefix="genre-pulse-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    if fixtures_dir:
+        fixtures_dir = os.path.abspath(fixtures_dir)
+
+    from data_collector import PROVIDER_RATE_LIMITS, batch_sources
+    from data_store import normalize_payloads
+    from genre_analysis import GenrePulseAnalyzer
+
+    # Every relative ./data and ./reports path resolves inside the workdir
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with ReplayServer(fixtures_dir=fixtures_dir, latency=latency, jitter=jitter,
+                          error_rate=error_rate, seed=seed) as server:
+            recorder = Recorder(server)
+            if startup:
+                bench_startup(recorder)
+            for size in sizes:
+                print(f"size={size}", flush=True)
+                data_directory = os.path.join(workdir, f"data-{size}")
+                collector = replay_collector(
+                    server.url, data_directory, rate_limits=PROVIDER_RATE_LIMITS if rate_limited else None
+                )
+                analyzer = GenrePulseAnalyzer(data_directory)
+                roster = synthetic_roster(size, seed=seed)
+
+                data = recorder.time(size, "collect_all_data", collector.collect_all_data)
+                recorder.time(size, "process_api_data", analyzer.process_api_data,
+                              data["spotify"], data["youtube"], data["lastfm"])
+
+                batch = recorder.time(size, "collect_batch", collector.collect_batch, roster)
+                sources = batch_sources(batch)
+                # Backfill before this run's observations set each series' watermark
+                seed_history(analyzer, normalize_payloads(sources), history_weeks, seed=seed)
+                recorder.time(size, "process_batch", analyzer.process_api_data,
+                              sources["spotify"], sources["youtube"], sources["lastfm"])
+
+                recorder.time(size, "analyze_trends", analyzer.analyze_trends)
+                # Second pass: unchanged series come from the forecast cache
+                recorder.time(size, "analyze_trends_cached", analyzer.analyze_trends)
+                trends = recorder.time(size, "detect_trends", analyzer.detect_trends)
+                genre_flow = recorder.time(size, "update_genre_flow", analyzer.update_genre_flow)
+
+                def save_reports():
+                    for name in list(batch["reports"])[:max_reports]:
+                        view = batch["reports"][name]
+                        similarity = analyzer.compare_artists(name, view["spotify"]["comparison_artists"])
+                        analyzer.save_report(
+                            filename=os.path.join(workdir, "reports", f"{size}", f"{name}.md"),
+                            artist_name=name, artist_data=view, similarity=similarity, genre_flow=genre_flow,
+                            trends=trends
+                        )
+
+                recorder.time(size, "save_report", save_reports)
+                if api:
+                    bench_api(recorder, size, roster, collector, analyzer)
+                collector.http.close()
+
+        return {
+            "meta": {
+                "commit": _commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "options": {
+                    "sizes": sizes, "latency": latency, "jitter": jitter, "error_rate": error_rate,
+                    "history_weeks": history_weeks, "max_reports": max_reports, "rate_limited": rate_limited,
+                    "fixtures": fixtures_dir is not None, "api": api, "seed": seed, "startup": startup,
+                },
+            },
+            "results": recorder.results,
+        }
+    finally:
+        os.chdir(cwd)
+
+
+def compare(current, baseline, threshold=0.2, min_seconds=0.05):
+    # Per (size, stage): ratio of current to baseline time. A stage regresses
+    # when it is more than `threshold` slower and slower by min_seconds
+    # absolute, so sub-millisecond noise never fails a run.
+    before = {(r["size"], r["stage"]): r["seconds"] for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = (result["size"], result["stage"])
+        if key not in before:
+            continue
+        ratio = result["seconds"] / before[key] if before[key] else float("inf")
+        regressed = ratio > 1 + threshold and result["seconds"] - before[key] > min_seconds
+        rows.append({"size": key[0], "stage": key[1], "baseline": before[key],
+                     "current": result["seconds"], "ratio": round(ratio, 3), "regressed": regressed})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay benchmark for the collection-to-report pipeline")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Roster sizes, e.g. 10 100 1000 10000")
+    parser.add_argument("--latency", type=float, default=0.005, help="Stand-in response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of responses replaced by 429/500")
+    parser.add_argument("--history-weeks", type=int, default=12, help="Weeks of synthetic history before analyze_trends")
+    parser.add_argument("--max-reports", type=int, default=100, help="Artist reports rendered per size")
+    parser.add_argument("--fixtures", help="Directory of recorded fixtures to replay before synthetic data")
+    parser.add_argument("--rate-limited", action="store_true", help="Keep the production client-side rate limits")
+    parser.add_argument("--no-api", action="store_true", help="Skip the FastAPI endpoint benchmarks")
+    parser.add_argument("--no-startup", action="store_true", help="Skip the import/startup-time benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Where data and reports are written (default: a temp directory)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Machine-readable results file")
+    parser.add_argument("--compare", help="Baseline results file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown ratio before a stage regresses")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    results = run(
+        args.sizes, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        history_weeks=args.history_weeks, max_reports=args.max_reports, fixtures_dir=args.fixtures,
+        rate_limited=args.rate_limited, api=not args.no_api, seed=args.seed, workdir=args.workdir,
+        startup=not args.no_startup,
+    )
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if baseline is not None:
+        rows = compare(results, baseline, threshold=args.threshold)
+        for row in rows:
+            flag = "REGRESSED" if row["regressed"] else ""
+            print(f"{row['size']:>6} {row['stage']:<28} {row['baseline']:9.3f}s -> {row['current']:9.3f}s  x{row['ratio']:<6} {flag}")
+        if any(row["regressed"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
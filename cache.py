@@ -0,0 +1,163 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from metrics import record_cache_lookup
+from config import REDIS_URL, CACHE_MAX_ENTRIES, CACHE_DEFAULT_TTL, CACHE_KEY_PREFIX
+
+# Query params that carry credentials rather than identify the resource
+SECRET_PARAMS = {"key", "api_key", "client_secret", "access_token"}
+
+
+def make_cache_key(url, params=None, prefix=CACHE_KEY_PREFIX):
+    items = sorted(
+        (str(k), str(v))
+        for k, v in (params or {}).items()
+        if v is not None and k not in SECRET_PARAMS
+    )
+    raw = f"{url}?{urlencode(items)}"
+    return f"{prefix}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+
+class MemoryCache:
+    # In-process LRU with per-entry expiry
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    # Shared tier across uvicorn workers. Any Redis error degrades to a miss.
+
+    def __init__(self, url=REDIS_URL, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.client = client
+
+    def get(self, key):
+        try:
+            value = self.client.get(key)
+        except Exception as e:
+            logging.warning(f"Redis cache get failed: {e}")
+            return None
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        try:
+            self.client.set(key, json.dumps(value), ex=max(1, int(ttl)))
+        except Exception as e:
+            logging.warning(f"Redis cache set failed: {e}")
+
+    def delete(self, key):
+        try:
+            self.client.delete(key)
+        except Exception as e:
+            logging.warning(f"Redis cache delete failed: {e}")
+
+
+class ResponseCache:
+    # Read-through tiers: memory first, then the optional remote backend.
+    # Remote hits are promoted into memory for a short window (promote_ttl).
+
+    def __init__(self, memory=None, remote=None, default_ttl=CACHE_DEFAULT_TTL, promote_ttl=60):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.remote = remote
+        self.default_ttl = default_ttl
+        self.promote_ttl = promote_ttl
+        self._lock = threading.Lock()
+        self._counts = {"memory_hits": 0, "remote_hits": 0, "misses": 0, "sets": 0}
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            record_cache_lookup("response", True)
+            return value
+        if self.remote is not None:
+            value = self.remote.get(key)
+            if value is not None:
+                self._count("remote_hits")
+                record_cache_lookup("response", True)
+                self.memory.set(key, value, self.promote_ttl)
+                return value
+        self._count("misses")
+        record_cache_lookup("response", False)
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self.memory.set(key, value, ttl)
+        if self.remote is not None:
+            self.remote.set(key, value, ttl)
+        self._count("sets")
+
+    def invalidate(self, key):
+        self.memory.delete(key)
+        if self.remote is not None:
+            self.remote.delete(key)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        hits = counts["memory_hits"] + counts["remote_hits"]
+        lookups = hits + counts["misses"]
+        counts["hits"] = hits
+        counts["hit_ratio"] = hits / lookups if lookups else 0.0
+        counts["memory_entries"] = len(self.memory)
+        counts["remote_enabled"] = self.remote is not None
+        return counts
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+
+def build_response_cache():
+    remote = None
+    if REDIS_URL:
+        try:
+            remote = RedisCache(REDIS_URL)
+        except ImportError:
+            logging.warning("REDIS_URL is set but the redis package is not installed")
+    return ResponseCache(remote=remote)
@@ -0,0 +1,215 @@
+import json
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:
+    RedisError = OSError
+
+from storage import SingleFlight
+from config import REDIS_URL, COALESCE_FRESHNESS_SECONDS, SINGLE_FLIGHT_TIMEOUT, CACHE_KEY_PREFIX, REPORT_WORKERS
+
+# How long a finished result stays in Redis for workers still waiting on it,
+# even with a zero freshness window
+HANDOFF_SECONDS = 60
+
+
+class RedisFlight:
+    # Cross-worker single-flight over Redis. The leader holds
+    # <prefix>:lock:<key> (SET NX with a lease) while it runs and then
+    # publishes {"run_id", "finished_at", "result"} to <prefix>:result:<key>.
+    # Followers poll for a result newer than the one they saw on arrival. If
+    # the lock goes away without one (the leader failed), they take over.
+
+    def __init__(self, client, prefix=f"{CACHE_KEY_PREFIX}:flight", lease_seconds=SINGLE_FLIGHT_TIMEOUT,
+                 poll_interval=0.1):
+        self.client = client
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+
+    def latest(self, key):
+        value = self.client.get(self._key("result", key))
+        return None if value is None else json.loads(value)
+
+    def run(self, key, fn, args, result_ttl):
+        lock_key = self._key("lock", key)
+        seen = (self.latest(key) or {}).get("run_id")
+        deadline = time.monotonic() + self.lease_seconds
+        while True:
+            token = uuid.uuid4().hex
+            if self.client.set(lock_key, token, nx=True, px=int(self.lease_seconds * 1000)):
+                # Past this point fn has run (or is running), so a Redis error
+                # must not propagate: the caller would fall back and run it again
+                try:
+                    result = fn(*args)
+                    record = {
+                        "run_id": token,
+                        "finished_at": datetime.now(timezone.utc).isoformat(),
+                        "result": result,
+                    }
+                    try:
+                        self.client.set(self._key("result", key), json.dumps(record, default=str),
+                                        ex=max(1, int(max(result_ttl, HANDOFF_SECONDS))))
+                    except RedisError as e:
+                        logging.warning(f"Could not publish result of {key} to Redis: {e}")
+                    return record
+                finally:
+                    try:
+                        if self.client.get(lock_key) in (token, token.encode()):
+                            self.client.delete(lock_key)
+                    except RedisError as e:
+                        # The lease expires on its own
+                        logging.warning(f"Could not release Redis lock for {key}: {e}")
+
+            logging.info(f"Joining in-flight run for {key} in another worker")
+            while self.client.get(lock_key) is not None:
+                latest = self.latest(key)
+                if latest is not None and latest["run_id"] != seen:
+                    return latest
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for in-flight run of {key}")
+                time.sleep(self.poll_interval)
+            latest = self.latest(key)
+            if latest is not None and latest["run_id"] != seen:
+                return latest
+
+    def _key(self, kind, key):
+        return f"{self.prefix}:{kind}:{hashlib.sha256(key.encode()).hexdigest()[:32]}"
+
+
+class RequestCoalescer:
+    # Identical requests (same normalized key) share one computation:
+    #   - within a worker, callers attach to the in-flight Future;
+    #   - across workers, the leader is elected through Redis when
+    #     available, otherwise through storage.SingleFlight file locks;
+    #   - after completion the result keeps answering the same key for
+    #     freshness_seconds without running anything.
+    # Background leaders run on the coalescer's own pool. A pool whose
+    # threads may block waiting on a leader (the job pool) must never be
+    # the one that leader is queued on, or it can deadlock.
+
+    def __init__(self, freshness_seconds=COALESCE_FRESHNESS_SECONDS, redis_client=None, flights=None,
+                 max_workers=REPORT_WORKERS):
+        self.freshness_seconds = freshness_seconds
+        self.max_workers = max_workers
+        self._executor = None
+        self.remote = RedisFlight(redis_client) if redis_client is not None else None
+        self.flights = flights if flights is not None else SingleFlight()
+        self._inflight = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+        self._counts = {"runs": 0, "joined": 0, "fresh": 0}
+
+    @property
+    def executor(self):
+        # Created on demand so the coalescer survives an app shutdown/restart
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="genre-pulse-leader"
+                )
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def submit(self, key, fn, *args, background=False):
+        # Returns a Future for key's result. The leader runs on the
+        # coalescer's pool when background is set, otherwise inline on the
+        # calling thread.
+        with self._lock:
+            fresh = self._fresh(key)
+            if fresh is not None:
+                self._counts["fresh"] += 1
+                future = Future()
+                future.set_result(fresh)
+                return future
+            future = self._inflight.get(key)
+            if future is not None:
+                self._counts["joined"] += 1
+                return future
+            future = Future()
+            self._inflight[key] = future
+
+        if background:
+            self.executor.submit(self._lead, key, future, fn, args)
+        else:
+            self._lead(key, future, fn, args)
+        return future
+
+    def run(self, key, fn, *args):
+        return self.submit(key, fn, *args).result()
+
+    def stats(self):
+        with self._lock:
+            return {**self._counts, "in_flight": len(self._inflight), "freshness_seconds": self.freshness_seconds}
+
+    def _lead(self, key, future, fn, args):
+        try:
+            record = self._shared(key, fn, args)
+            with self._lock:
+                self._recent[key] = (record["finished_at"], record["result"])
+                for stale in [k for k, (finished_at, _) in self._recent.items() if self._age(finished_at) > self.freshness_seconds]:
+                    del self._recent[stale]
+            future.set_result(record["result"])
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _shared(self, key, fn, args):
+        # A result another worker finished within the window also counts.
+        # File locks take over only when Redis fails before a leader runs.
+        if self.remote is not None:
+            try:
+                latest = self.remote.latest(key)
+                if latest is not None and self._age(latest["finished_at"]) <= self.freshness_seconds:
+                    return latest
+                return self.remote.run(key, self._counted(fn), args, self.freshness_seconds)
+            except RedisError as e:
+                logging.warning(f"Redis coalescing unavailable, using file locks: {e}")
+        result = self.flights.run(key, self._counted(fn), *args)
+        return {"finished_at": datetime.now(timezone.utc).isoformat(), "result": result}
+
+    def _counted(self, fn):
+        def run(*args):
+            with self._lock:
+                self._counts["runs"] += 1
+            return fn(*args)
+        return run
+
+    def _fresh(self, key):
+        recent = self._recent.get(key)
+        if recent is None:
+            return None
+        finished_at, result = recent
+        if self._age(finished_at) > self.freshness_seconds:
+            del self._recent[key]
+            return None
+        return result
+
+    def _age(self, finished_at):
+        return (datetime.now(timezone.utc) - datetime.fromisoformat(finished_at)).total_seconds()
+
+
+def build_coalescer():
+    client = None
+    if REDIS_URL:
+        try:
+            import redis
+            client = redis.Redis.from_url(REDIS_URL, socket_timeout=0.5, socket_connect_timeout=0.5)
+        except ImportError:
+            logging.warning("REDIS_URL is set but the redis package is not installed")
+    return RequestCoalescer(redis_client=client)
@@ -8,3 +8,79 @@ SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 LASTFM_API_KEY = os.getenv("LASTFM_API_KEY")
 LASTFM_API_SECRET = os.getenv("LASTFM_API_SECRET")
+
+# Maximum number of in-flight requests per provider during async collection
+SPOTIFY_MAX_CONCURRENCY = int(os.getenv("SPOTIFY_MAX_CONCURRENCY", "5"))
+YOUTUBE_MAX_CONCURRENCY = int(os.getenv("YOUTUBE_MAX_CONCURRENCY", "5"))
+LASTFM_MAX_CONCURRENCY = int(os.getenv("LASTFM_MAX_CONCURRENCY", "5"))
+
+# Background job pool used by the API for collection/analysis work
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+MAX_PENDING_JOBS = int(os.getenv("MAX_PENDING_JOBS", "16"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "86400"))
+
+# Provider response cache. REDIS_URL enables the shared tier, e.g. redis://redis:6379/0
+REDIS_URL = os.getenv("REDIS_URL")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+CACHE_DEFAULT_TTL = int(os.getenv("CACHE_DEFAULT_TTL", "3600"))
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "genre_pulse:http")
+
+# Pooled HTTP sessions: timeouts, pool size, retry attempts and per-provider rate limits (req/s)
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_MAX_ATTEMPTS = int(os.getenv("HTTP_MAX_ATTEMPTS", "3"))
+SPOTIFY_RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", "10"))
+YOUTUBE_RATE_LIMIT = float(os.getenv("YOUTUBE_RATE_LIMIT", "5"))
+LASTFM_RATE_LIMIT = float(os.getenv("LASTFM_RATE_LIMIT", "5"))
+
+# Refresh the Spotify access token this many seconds before it expires
+SPOTIFY_TOKEN_REFRESH_MARGIN = int(os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", "60"))
+
+# Forecasting: worker processes (-1 = all cores), horizon in weeks, and how
+# long a selected ARIMA order is reused before AutoARIMA searches again
+FORECAST_N_JOBS = int(os.getenv("FORECAST_N_JOBS", "-1"))
+FORECAST_HORIZON = int(os.getenv("FORECAST_HORIZON", "4"))
+FORECAST_MODEL_MAX_AGE_DAYS = int(os.getenv("FORECAST_MODEL_MAX_AGE_DAYS", "28"))
+
+# Forecast cache budget: entries expire after this many days, and at most
+# this many series are kept
+FORECAST_CACHE_MAX_AGE_DAYS = int(os.getenv("FORECAST_CACHE_MAX_AGE_DAYS", "14"))
+FORECAST_CACHE_MAX_ENTRIES = int(os.getenv("FORECAST_CACHE_MAX_ENTRIES", "50000"))
+
+# Rendered report sections kept in memory, per worker
+REPORT_RENDER_CACHE_ENTRIES = int(os.getenv("REPORT_RENDER_CACHE_ENTRIES", "1024"))
+
+# Published reports/data files keep this many previous versions under
+# .versions/, and a worker waits this long (seconds) to join an identical
+# run already in progress in another worker
+KEEP_VERSIONS = int(os.getenv("KEEP_VERSIONS", "5"))
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "900"))
+
+# Identical report requests share one run; a finished result keeps
+# answering the same request for this many seconds
+COALESCE_FRESHNESS_SECONDS = float(os.getenv("COALESCE_FRESHNESS_SECONDS", "300"))
+
+# Replay mode: send every provider request to a local stand-in (replay.py)
+# at this base URL instead of the live APIs, e.g. http://127.0.0.1:8765
+REPLAY_URL = os.getenv("REPLAY_URL")
+
+# Background warm-up after each worker starts: builds the collector and
+# analyzer, and with WARMUP_FORECASTING runs one tiny fit per model tier
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+WARMUP_FORECASTING = os.getenv("WARMUP_FORECASTING", "1") == "1"
+
+# Precomputed report serving inside the API: a scheduler thread regenerates
+# the weekly report and the REPORT_HOT_ARTISTS most recently requested
+# artist reports every REPORT_REFRESH_SECONDS, and a read of a copy older
+# than REPORT_STALE_SECONDS starts a background refresh
+PRECOMPUTE_REPORTS = os.getenv("PRECOMPUTE_REPORTS", "0") == "1"
+REPORT_REFRESH_SECONDS = float(os.getenv("REPORT_REFRESH_SECONDS", "3600"))
+REPORT_STALE_SECONDS = float(os.getenv("REPORT_STALE_SECONDS", "3600"))
+REPORT_HOT_ARTISTS = int(os.getenv("REPORT_HOT_ARTISTS", "10"))
+
+# Weekly Prefect flow: concurrent task threads, per-task retries, and how
+# long a collection shard's result is reused by reruns with the same inputs
+FLOW_WORKERS = int(os.getenv("FLOW_WORKERS", "8"))
+FLOW_TASK_RETRIES = int(os.getenv("FLOW_TASK_RETRIES", "2"))
+FLOW_RETRY_DELAY_SECONDS = float(os.getenv("FLOW_RETRY_DELAY_SECONDS", "10"))
+FLOW_CACHE_HOURS = float(os.getenv("FLOW_CACHE_HOURS", "12"))
@@ -1,13 +1,31 @@
 import os
+import json
 import time
+import uuid
+import atexit
+import asyncio
 import logging
+import contextlib
+import contextvars
+import threading
+import aiohttp
 import requests
+from cache import build_response_cache, make_cache_key
+from http_client import PooledHttpClient, RetryPolicy, parse_retry_after, provider_for, transport_url
+from spotify_auth import SpotifyTokenManager, SPOTIFY_AUTH_URL
+from metrics import observe_upstream
 from config import (
-    SPOTIFY_CLIENT_ID,
-    SPOTIFY_CLIENT_SECRET,
     YOUTUBE_API_KEY,
     LASTFM_API_KEY,
     LASTFM_API_SECRET,
+    SPOTIFY_MAX_CONCURRENCY,
+    YOUTUBE_MAX_CONCURRENCY,
+    LASTFM_MAX_CONCURRENCY,
+    SPOTIFY_RATE_LIMIT,
+    YOUTUBE_RATE_LIMIT,
+    LASTFM_RATE_LIMIT,
+    HTTP_MAX_ATTEMPTS,
+    HTTP_TIMEOUT,
 )
 
 logging.basicConfig(
@@ -16,37 +34,209 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s: %(message)s"
 )
 
+TARGET_ARTIST = "Nova Sound"
+COMPARISON_ARTISTS = ["Coldplay", "Imagine Dragons", "Maroon 5"]
+
+SPOTIFY_API_URL = "https://api.spotify.com/v1"
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+LASTFM_API_URL = "http://ws.audioscrobbler.com/2.0/"
+
+# Spotify's GET /v1/artists?ids= accepts at most 50 ids per call
+SPOTIFY_MAX_IDS_PER_REQUEST = 50
+
+# Largest page each provider serves to the streaming collectors
+SPOTIFY_PAGE_SIZE = 50
+YOUTUBE_PAGE_SIZE = 50
+LASTFM_PAGE_SIZE = 200
+
+PROVIDER_CONCURRENCY = {
+    "spotify": SPOTIFY_MAX_CONCURRENCY,
+    "youtube": YOUTUBE_MAX_CONCURRENCY,
+    "lastfm": LASTFM_MAX_CONCURRENCY,
+}
+
+# Sustained requests per second allowed against each provider
+PROVIDER_RATE_LIMITS = {
+    "spotify": SPOTIFY_RATE_LIMIT,
+    "youtube": YOUTUBE_RATE_LIMIT,
+    "lastfm": LASTFM_RATE_LIMIT,
+}
+
+# Freshness per endpoint, in seconds. This data moves on a timescale of hours.
+RESPONSE_TTLS = [
+    (f"{SPOTIFY_API_URL}/search", 12 * 3600),
+    (f"{SPOTIFY_API_URL}/artists", 6 * 3600),
+    (YOUTUBE_SEARCH_URL, 3 * 3600),
+    (LASTFM_API_URL, 6 * 3600),
+]
+
+
+def response_ttl(url):
+    for prefix, ttl in RESPONSE_TTLS:
+        if url.startswith(prefix):
+            return ttl
+    return None
+
+# Retry behaviour per endpoint. YouTube search costs 100 quota units per call,
+# so it gets fewer attempts; Last.fm answers 5xx under load more often.
+DEFAULT_RETRY_POLICY = RetryPolicy(max_attempts=HTTP_MAX_ATTEMPTS)
+RETRY_POLICIES = [
+    (SPOTIFY_AUTH_URL, RetryPolicy(max_attempts=HTTP_MAX_ATTEMPTS, backoff_base=1.0)),
+    (SPOTIFY_API_URL, RetryPolicy(max_attempts=HTTP_MAX_ATTEMPTS)),
+    (YOUTUBE_SEARCH_URL, RetryPolicy(max_attempts=min(2, HTTP_MAX_ATTEMPTS), backoff_base=1.0)),
+    (LASTFM_API_URL, RetryPolicy(max_attempts=HTTP_MAX_ATTEMPTS + 1, backoff_base=0.25)),
+]
+
+
+def retry_policy(url):
+    for prefix, policy in RETRY_POLICIES:
+        if url.startswith(prefix):
+            return policy
+    return DEFAULT_RETRY_POLICY
+
+# The provider semaphores of the current run. Runs on the shared collector
+# loop all get the process-wide set; a caller awaiting collection on its own
+# loop gets a private set, since semaphores are bound to one loop.
+_provider_semaphores = contextvars.ContextVar("provider_semaphores")
+
+
+class CollectorLoop:
+    # One long-lived event loop on a daemon thread for all async collection
+    # in this process. The aiohttp session (with its keep-alive connector)
+    # and the per-provider semaphores are bound to that loop, so every run,
+    # from any thread, reuses the same connections and shares the same
+    # concurrency limits. Restarted lazily after a fork.
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._session = None
+        self._semaphores = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def run(self, coro):
+        loop = self._start()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Blocking collection called from the collector loop; await it instead")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def owns_running_loop(self):
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def session(self):
+        # Only called on the loop, so no locking is needed
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=sum(PROVIDER_CONCURRENCY.values())),
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            )
+        return self._session
+
+    def semaphores(self):
+        if self._semaphores is None:
+            self._semaphores = _new_provider_semaphores()
+        return self._semaphores
+
+    def close(self):
+        with self._lock:
+            loop, thread, session = self._loop, self._thread, self._session
+            self._loop = self._thread = self._session = self._semaphores = None
+        if loop is None or self._pid != os.getpid():
+            return
+        if session is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+            except Exception as e:
+                logging.warning(f"Could not close collector session: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+    def _start(self):
+        with self._lock:
+            # A forked child inherits the loop object but not its thread
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="collector-async", daemon=True)
+                thread.start()
+                self._loop, self._thread, self._pid = loop, thread, os.getpid()
+                self._session = self._semaphores = None
+            return self._loop
+
+
+_collector_loop = CollectorLoop()
+
+
+def run_coroutine(coro):
+    # Drives the coroutine on the shared collector loop and blocks for its
+    # result; safe from plain threads and from inside another running loop
+    # (e.g. a FastAPI handler), which asyncio.run() would refuse.
+    return _collector_loop.run(coro)
+
+
 class GenreDataCollector:
-    def __init__(self, data_directory="./data"):
+    def __init__(self, data_directory="./data", cache=None, http=None):
         self.data_directory = data_directory
         os.makedirs(self.data_directory, exist_ok=True)
-        self.spotify_token = None
+        self.cache = cache if cache is not None else build_response_cache()
+        self.http = http if http is not None else PooledHttpClient(rate_limits=PROVIDER_RATE_LIMITS)
+        self.token_manager = SpotifyTokenManager(self.http, policy=retry_policy(SPOTIFY_AUTH_URL))
+        # Optional replay.FixtureRecorder capturing live responses as fixtures
+        self.recorder = None
+
+    @property
+    def spotify_token(self):
+        return self.token_manager.access_token
 
     def get_spotify_token(self):
-        if not self.spotify_token:
-            auth_url = "https://accounts.spotify.com/api/token"
-            auth_data = {
-                "grant_type": "client_credentials",
-                "client_id": SPOTIFY_CLIENT_ID,
-                "client_secret": SPOTIFY_CLIENT_SECRET,
-            }
-            response = requests.post(auth_url, data=auth_data)
-            if response.status_code == 200:
-                self.spotify_token = response.json()["access_token"]
-            else:
-                logging.error("Failed to get Spotify token")
-                return None
-        return self.spotify_token
+        return self.token_manager.get_token()
+
+    def fetch_data(self, url, headers=None, params=None, use_cache=True):
+        cache_key = make_cache_key(url, params)
+        cached = self.cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return cached
 
-    def fetch_data(self, url, headers=None, params=None):
+        started = time.perf_counter()
+        status = "error"
         try:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.http.get(
+                url,
+                headers=headers,
+                params=params,
+                policy=retry_policy(url)
+            )
+            rejected = _bearer_token(headers)
+            if response.status_code == 401 and rejected:
+                # Token revoked or expired early: refresh once and replay
+                token = self.token_manager.handle_unauthorized(rejected)
+                if token:
+                    headers = {**headers, "Authorization": f"Bearer {token}"}
+                    response = self.http.get(
+                        url,
+                        headers=headers,
+                        params=params,
+                        policy=retry_policy(url)
+                    )
+            status = response.status_code
             response.raise_for_status()
-            return response.json()
+            data = response.json()
         except requests.exceptions.RequestException as e:
             logging.error(f"API request failed: {e}")
-            time.sleep(5)
             return None
+        finally:
+            observe_upstream(provider_for(url), url, params, status, time.perf_counter() - started)
+
+        if self.recorder is not None:
+            self.recorder.record(provider_for(url), url, params, data)
+        if use_cache:
+            self.cache.set(cache_key, data, response_ttl(url))
+        return data
 
     def collect_spotify_data(self):
         token = self.get_spotify_token()
@@ -152,7 +342,10 @@ class GenreDataCollector:
             "comparison_artists": artist_data
         }
 
-    def collect_all_data(self, days=7):
+    def collect_all_data(self, days=7, concurrent=True):
+        if concurrent:
+            return run_coroutine(self.collect_all_data_async(days=days))
+
         logging.info(f"Collecting data for the past {days} days")
 
         spotify_data = self.collect_spotify_data()
@@ -165,6 +358,655 @@ class GenreDataCollector:
             "lastfm": lastfm_data
         }
 
+    # Async collection: every provider and per-artist request is in flight at
+    # once, bounded by a per-provider semaphore, so a report costs roughly the
+    # slowest call instead of the sum of all of them.
+
+    async def fetch_data_async(self, session, provider, url, headers=None, params=None):
+        cache_key = make_cache_key(url, params)
+        cached = await self._cache_call(self.cache.get, cache_key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        status, data = await self._request_async(session, provider, url, headers, params)
+        observe_upstream(provider, url, params, status, time.perf_counter() - started)
+        if data is None:
+            return None
+
+        if self.recorder is not None:
+            self.recorder.record(provider, url, params, data)
+        await self._cache_call(self.cache.set, cache_key, data, response_ttl(url))
+        return data
+
+    async def _request_async(self, session, provider, url, headers, params):
+        # Returns (final status or "error", payload or None)
+        policy = retry_policy(url)
+        limiter = self.http.limiter(provider)
+        status = "error"
+        attempt = 0
+        reauthorized = False
+        async with _provider_semaphores.get()[provider]:
+            while True:
+                attempt += 1
+                if limiter is not None:
+                    await asyncio.sleep(limiter.reserve())
+                try:
+                    target = transport_url(url, self.http.replay_base)
+                    async with session.get(target, headers=headers, params=_query_params(params)) as response:
+                        status = response.status
+                        rejected = _bearer_token(headers)
+                        if response.status == 401 and rejected and not reauthorized:
+                            reauthorized = True
+                            token = await asyncio.to_thread(self.token_manager.handle_unauthorized, rejected)
+                            if token:
+                                headers = {**headers, "Authorization": f"Bearer {token}"}
+                                continue
+                        if response.status >= 400 and policy.should_retry(attempt, response.status):
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                            wait = policy.delay(attempt, retry_after)
+                            logging.warning(f"{provider} returned {response.status}; retry {attempt} in {wait:.2f}s")
+                        else:
+                            response.raise_for_status()
+                            return status, await response.json(content_type=None)
+                except aiohttp.ClientResponseError as e:
+                    logging.error(f"API request failed: {e}")
+                    return status, None
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if not policy.should_retry(attempt):
+                        logging.error(f"API request failed: {e}")
+                        return status, None
+                    status = "error"
+                    wait = policy.delay(attempt)
+                    logging.warning(f"{provider} request error ({e}); retry {attempt} in {wait:.2f}s")
+                except ValueError as e:
+                    logging.error(f"API request failed: {e}")
+                    return status, None
+                await asyncio.sleep(wait)
+
+    async def _cache_call(self, fn, *args):
+        # The in-memory tier is cheap enough to hit inline; Redis is network I/O
+        if self.cache.remote is None:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def collect_spotify_data_async(self, session):
+        token = await asyncio.to_thread(self.get_spotify_token)
+        if not token:
+            return None
+
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def search_artist(artist):
+            return await self.fetch_data_async(
+                session, "spotify",
+                f"{SPOTIFY_API_URL}/search",
+                headers=headers,
+                params={"q": artist, "type": "artist", "limit": 1}
+            )
+
+        async def top_tracks(artist):
+            artist_search = await search_artist(artist)
+            if not artist_search or not artist_search.get("artists", {}).get("items"):
+                return None
+            artist_id = artist_search["artists"]["items"][0]["id"]
+            return await self.fetch_data_async(
+                session, "spotify",
+                f"{SPOTIFY_API_URL}/artists/{artist_id}/top-tracks",
+                headers=headers,
+                params={"market": "US"}
+            )
+
+        nova_sound_data, *tracks = await asyncio.gather(
+            search_artist(TARGET_ARTIST),
+            *(top_tracks(artist) for artist in COMPARISON_ARTISTS)
+        )
+        artist_data = {
+            artist: data
+            for artist, data in zip(COMPARISON_ARTISTS, tracks)
+            if data is not None
+        }
+
+        return {
+            "nova_sound": nova_sound_data,
+            "comparison_artists": artist_data
+        }
+
+    async def collect_youtube_data_async(self, session):
+        def search(artist):
+            return self.fetch_data_async(
+                session, "youtube",
+                YOUTUBE_SEARCH_URL,
+                params={
+                    "key": YOUTUBE_API_KEY,
+                    "q": artist,
+                    "part": "snippet",
+                    "type": "video",
+                    "maxResults": 10
+                }
+            )
+
+        nova_sound_data, *results = await asyncio.gather(
+            search(TARGET_ARTIST),
+            *(search(artist) for artist in COMPARISON_ARTISTS)
+        )
+
+        return {
+            "nova_sound": nova_sound_data,
+            "comparison_artists": dict(zip(COMPARISON_ARTISTS, results))
+        }
+
+    async def collect_lastfm_data_async(self, session):
+        def get_info(artist):
+            return self.fetch_data_async(
+                session, "lastfm",
+                LASTFM_API_URL,
+                params={
+                    "method": "artist.getInfo",
+                    "artist": artist,
+                    "api_key": LASTFM_API_KEY,
+                    "format": "json"
+                }
+            )
+
+        nova_sound_data, *results = await asyncio.gather(
+            get_info(TARGET_ARTIST),
+            *(get_info(artist) for artist in COMPARISON_ARTISTS)
+        )
+
+        return {
+            "nova_sound": nova_sound_data,
+            "comparison_artists": dict(zip(COMPARISON_ARTISTS, results))
+        }
+
+    async def collect_all_data_async(self, days=7):
+        logging.info(f"Collecting data for the past {days} days (async)")
+
+        async with _collection_session() as session:
+            spotify_data, youtube_data, lastfm_data = await asyncio.gather(
+                self.collect_spotify_data_async(session),
+                self.collect_youtube_data_async(session),
+                self.collect_lastfm_data_async(session),
+            )
+
+        return {
+            "spotify": spotify_data,
+            "youtube": youtube_data,
+            "lastfm": lastfm_data
+        }
+
+    # Batch collection: many target artists, each with its own comparison
+    # set. Every unique artist across the batch is fetched exactly once and
+    # each per-artist view is assembled from that shared result.
+
+    def collect_batch(self, artists, comparison_sets=None, days=7):
+        return run_coroutine(self.collect_batch_async(artists, comparison_sets, days=days))
+
+    async def collect_batch_async(self, artists, comparison_sets=None, days=7):
+        targets, entities = plan_batch(artists, comparison_sets)
+        lookups = sum(1 + len(comparisons) for comparisons in targets.values())
+        logging.info(
+            f"Collecting batch of {len(targets)} artists for the past {days} days: "
+            f"{len(entities)} unique entities for {lookups} lookups"
+        )
+
+        async with _collection_session() as session:
+            spotify_data, youtube_data, lastfm_data = await asyncio.gather(
+                self._batch_spotify(session, entities),
+                self._batch_youtube(session, entities),
+                self._batch_lastfm(session, entities),
+            )
+
+        shared = {
+            key: {
+                "name": name,
+                "spotify": spotify_data.get(key),
+                "youtube": youtube_data.get(key),
+                "lastfm": lastfm_data.get(key),
+            }
+            for key, name in entities.items()
+        }
+        return {
+            "entities": shared,
+            "reports": {
+                artist: batch_view(shared, artist, comparisons)
+                for artist, comparisons in targets.items()
+            },
+            "stats": {
+                "artists": len(targets),
+                "lookups": lookups,
+                "unique_entities": len(entities),
+            },
+        }
+
+    async def _batch_spotify(self, session, entities):
+        token = await asyncio.to_thread(self.get_spotify_token)
+        if not token:
+            return {}
+
+        headers = {"Authorization": f"Bearer {token}"}
+        keys = list(entities)
+        searches = await asyncio.gather(*(
+            self.fetch_data_async(
+                session, "spotify",
+                f"{SPOTIFY_API_URL}/search",
+                headers=headers,
+                params={"q": entities[key], "type": "artist", "limit": 1}
+            )
+            for key in keys
+        ))
+
+        artist_ids = {}
+        for key, result in zip(keys, searches):
+            items = (result or {}).get("artists", {}).get("items")
+            if items:
+                artist_ids[key] = items[0]["id"]
+
+        # Different names can resolve to the same Spotify artist
+        unique_ids = sorted(set(artist_ids.values()))
+        chunks = [
+            unique_ids[i:i + SPOTIFY_MAX_IDS_PER_REQUEST]
+            for i in range(0, len(unique_ids), SPOTIFY_MAX_IDS_PER_REQUEST)
+        ]
+        artist_pages, top_tracks = await asyncio.gather(
+            asyncio.gather(*(
+                self.fetch_data_async(
+                    session, "spotify",
+                    f"{SPOTIFY_API_URL}/artists",
+                    headers=headers,
+                    params={"ids": ",".join(chunk)}
+                )
+                for chunk in chunks
+            )),
+            asyncio.gather(*(
+                self.fetch_data_async(
+                    session, "spotify",
+                    f"{SPOTIFY_API_URL}/artists/{artist_id}/top-tracks",
+                    headers=headers,
+                    params={"market": "US"}
+                )
+                for artist_id in unique_ids
+            )),
+        )
+
+        artists_by_id = {
+            artist["id"]: artist
+            for page in artist_pages if page
+            for artist in page.get("artists") or [] if artist
+        }
+        tracks_by_id = dict(zip(unique_ids, top_tracks))
+        return {
+            key: {"artist": artists_by_id.get(artist_id), "top_tracks": tracks_by_id.get(artist_id)}
+            for key, artist_id in artist_ids.items()
+        }
+
+    async def _batch_youtube(self, session, entities):
+        results = await asyncio.gather(*(
+            self.fetch_data_async(
+                session, "youtube",
+                YOUTUBE_SEARCH_URL,
+                params={
+                    "key": YOUTUBE_API_KEY,
+                    "q": name,
+                    "part": "snippet",
+                    "type": "video",
+                    "maxResults": 10
+                }
+            )
+            for name in entities.values()
+        ))
+        return dict(zip(entities, results))
+
+    async def _batch_lastfm(self, session, entities):
+        results = await asyncio.gather(*(
+            self.fetch_data_async(
+                session, "lastfm",
+                LASTFM_API_URL,
+                params={
+                    "method": "artist.getInfo",
+                    "artist": name,
+                    "api_key": LASTFM_API_KEY,
+                    "format": "json"
+                }
+            )
+            for name in entities.values()
+        ))
+        return dict(zip(entities, results))
+
+    # Sharded collection: one provider for one artist per call, so an
+    # orchestrator can run, retry and cache every (provider, artist) pair on
+    # its own. Payloads have the batch entity shape, and shard_sources turns
+    # a set of them back into a collect_all_data-shaped payload.
+
+    def collect_source(self, source, artist):
+        collectors = {
+            "spotify": self.collect_spotify_artist,
+            "youtube": self.collect_youtube_artist,
+            "lastfm": self.collect_lastfm_artist,
+        }
+        if source not in collectors:
+            raise ValueError(f"Unknown source: {source}")
+        return collectors[source](artist)
+
+    def collect_spotify_artist(self, artist):
+        token = self.get_spotify_token()
+        if not token:
+            return None
+
+        headers = {"Authorization": f"Bearer {token}"}
+        search = self.fetch_data(
+            f"{SPOTIFY_API_URL}/search",
+            headers=headers,
+            params={"q": artist, "type": "artist", "limit": 1}
+        )
+        items = (search or {}).get("artists", {}).get("items")
+        if not items:
+            return None
+        top_tracks = self.fetch_data(
+            f"{SPOTIFY_API_URL}/artists/{items[0]['id']}/top-tracks",
+            headers=headers,
+            params={"market": "US"}
+        )
+        if top_tracks is None:
+            return None
+        return {"artist": items[0], "top_tracks": top_tracks}
+
+    def collect_youtube_artist(self, artist):
+        return self.fetch_data(
+            YOUTUBE_SEARCH_URL,
+            params={
+                "key": YOUTUBE_API_KEY,
+                "q": artist,
+                "part": "snippet",
+                "type": "video",
+                "maxResults": 10
+            }
+        )
+
+    def collect_lastfm_artist(self, artist):
+        return self.fetch_data(
+            LASTFM_API_URL,
+            params={
+                "method": "artist.getInfo",
+                "artist": artist,
+                "api_key": LASTFM_API_KEY,
+                "format": "json"
+            }
+        )
+
+    # Streaming collection: follow a provider's page cursor (Spotify `next`,
+    # YouTube `nextPageToken`, Last.fm `page`/`totalPages`) and yield records
+    # one at a time as pages arrive. Only the current page is held in memory,
+    # and pages bypass the response cache. With a checkpoint, a stream
+    # resumes from the last record its consumer saved. A page that cannot be
+    # fetched raises RuntimeError instead of ending the stream early.
+
+    def stream_records(self, source, query, max_items=None, checkpoint=None):
+        streams = {
+            "spotify": self.stream_spotify_tracks,
+            "youtube": self.stream_youtube_videos,
+            "lastfm": self.stream_lastfm_tracks,
+        }
+        return streams[source](query, max_items=max_items, checkpoint=checkpoint)
+
+    def stream_spotify_tracks(self, query, max_items=None, checkpoint=None):
+        def fetch(cursor):
+            token = self.get_spotify_token()
+            if not token:
+                return None
+            headers = {"Authorization": f"Bearer {token}"}
+            if cursor is None:
+                return self.fetch_data(
+                    f"{SPOTIFY_API_URL}/search",
+                    headers=headers,
+                    params={"q": query, "type": "track", "limit": SPOTIFY_PAGE_SIZE, "offset": 0},
+                    use_cache=False
+                )
+            # `next` is a complete URL, query string included
+            return self.fetch_data(cursor, headers=headers, use_cache=False)
+
+        def items(page):
+            return (page.get("tracks") or {}).get("items") or []
+
+        def next_cursor(page, cursor):
+            return (page.get("tracks") or {}).get("next")
+
+        return self._paginate(f"spotify:{normalize_artist(query)}", fetch, items, next_cursor, max_items, checkpoint)
+
+    def stream_youtube_videos(self, query, max_items=None, checkpoint=None):
+        def fetch(cursor):
+            params = {
+                "key": YOUTUBE_API_KEY,
+                "q": query,
+                "part": "snippet",
+                "type": "video",
+                "maxResults": YOUTUBE_PAGE_SIZE
+            }
+            if cursor is not None:
+                params["pageToken"] = cursor
+            return self.fetch_data(YOUTUBE_SEARCH_URL, params=params, use_cache=False)
+
+        def items(page):
+            return page.get("items") or []
+
+        def next_cursor(page, cursor):
+            return page.get("nextPageToken")
+
+        return self._paginate(f"youtube:{normalize_artist(query)}", fetch, items, next_cursor, max_items, checkpoint)
+
+    def stream_lastfm_tracks(self, query, max_items=None, checkpoint=None):
+        def fetch(cursor):
+            return self.fetch_data(
+                LASTFM_API_URL,
+                params={
+                    "method": "artist.getTopTracks",
+                    "artist": query,
+                    "api_key": LASTFM_API_KEY,
+                    "format": "json",
+                    "limit": LASTFM_PAGE_SIZE,
+                    "page": cursor or 1
+                },
+                use_cache=False
+            )
+
+        def items(page):
+            tracks = (page.get("toptracks") or {}).get("track") or []
+            return [tracks] if isinstance(tracks, dict) else tracks
+
+        def next_cursor(page, cursor):
+            attr = (page.get("toptracks") or {}).get("@attr") or {}
+            current = int(attr.get("page") or cursor or 1)
+            return current + 1 if current < int(attr.get("totalPages") or 0) else None
+
+        return self._paginate(f"lastfm:{normalize_artist(query)}", fetch, items, next_cursor, max_items, checkpoint)
+
+    def _paginate(self, key, fetch, items, next_cursor, max_items, checkpoint):
+        # State is {"cursor": page to fetch, "offset": records of that page
+        # already yielded, "count": records yielded in total, "done": bool}.
+        # It is updated before each record is yielded. A consumer that saves
+        # the checkpoint after persisting what it has pulled therefore resumes
+        # exactly after the last persisted record.
+        state = dict((checkpoint.get(key) if checkpoint is not None else None)
+                     or {"cursor": None, "offset": 0, "count": 0, "done": False})
+        pages = 0
+        while not state["done"]:
+            if max_items is not None and state["count"] >= max_items:
+                return
+            page = fetch(state["cursor"])
+            if page is None:
+                # Raise rather than end the stream, so a consumer cannot take a
+                # partial pull for a complete one. The cursor stays on this page
+                # and the stream is not marked done, so a resumed run retries it.
+                raise RuntimeError(f"Stream {key} failed at page {state['cursor']!r} after {state['count']} records")
+            pages += 1
+            for record in items(page)[state["offset"]:]:
+                if max_items is not None and state["count"] >= max_items:
+                    return
+                state["offset"] += 1
+                state["count"] += 1
+                if checkpoint is not None:
+                    checkpoint.update(key, state)
+                yield record
+
+            cursor = next_cursor(page, state["cursor"])
+            state.update(cursor=cursor, offset=0, done=cursor is None)
+            if checkpoint is not None:
+                checkpoint.update(key, state)
+        logging.info(f"Stream {key} complete: {state['count']} records, {pages} pages this run")
+
+
+class CollectionCheckpoint:
+    # Cursor state of streaming collections, one entry per stream key
+    # ("<source>:<normalized query>"), persisted as JSON. update() only
+    # changes memory; save() publishes it with an atomic rename, and
+    # ingestion calls it once the records pulled so far are stored.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        # Also discards unsaved updates, e.g. after a failed batch
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        with self._lock:
+            self.state = state
+
+    def get(self, key):
+        with self._lock:
+            return dict(self.state[key]) if key in self.state else None
+
+    def update(self, key, state):
+        with self._lock:
+            self.state[key] = dict(state)
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self.state.clear()
+            else:
+                self.state.pop(key, None)
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(self.state, sort_keys=True)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+
+def normalize_artist(name):
+    return " ".join(name.split()).casefold()
+
+
+def plan_batch(artists, comparison_sets=None):
+    # comparison_sets may be one list shared by every artist or a mapping of
+    # artist -> list; artists missing from the mapping use the defaults.
+    targets = {}
+    entities = {}
+    for artist in artists:
+        if isinstance(comparison_sets, dict):
+            comparisons = comparison_sets.get(artist, COMPARISON_ARTISTS)
+        elif comparison_sets is not None:
+            comparisons = comparison_sets
+        else:
+            comparisons = COMPARISON_ARTISTS
+        comparisons = [c for c in comparisons if normalize_artist(c) != normalize_artist(artist)]
+        targets.setdefault(artist, comparisons)
+        for name in (artist, *comparisons):
+            entities.setdefault(normalize_artist(name), name)
+    return targets, entities
+
+
+def batch_view(shared, artist, comparisons):
+    # Same shape as collect_all_data, keyed by "target" instead of "nova_sound"
+    def source(name):
+        return {
+            "target": shared[normalize_artist(artist)][name],
+            "comparison_artists": {
+                comparison: shared[normalize_artist(comparison)][name]
+                for comparison in comparisons
+            },
+        }
+
+    return {
+        "artist": artist,
+        "spotify": source("spotify"),
+        "youtube": source("youtube"),
+        "lastfm": source("lastfm"),
+    }
+
+
+def batch_sources(batch):
+    # Every unique entity of a batch as one collect_all_data-shaped payload,
+    # so shared comparison artists are stored once rather than per report.
+    return {
+        source: {
+            "comparison_artists": {
+                entity["name"]: entity[source]
+                for entity in batch["entities"].values()
+                if entity[source] is not None
+            }
+        }
+        for source in ("spotify", "youtube", "lastfm")
+    }
+
+
+def shard_sources(shards, artist, comparisons):
+    # {(source, artist): payload} from collect_source as one payload per
+    # source, keyed by "target" like batch_view; missing shards are skipped
+    return {
+        source: {
+            "target": shards.get((source, artist)),
+            "comparison_artists": {
+                comparison: shards[(source, comparison)]
+                for comparison in comparisons
+                if shards.get((source, comparison)) is not None
+            },
+        }
+        for source in ("spotify", "youtube", "lastfm")
+    }
+
+
+def _new_provider_semaphores():
+    return {
+        provider: asyncio.Semaphore(limit)
+        for provider, limit in PROVIDER_CONCURRENCY.items()
+    }
+
+
+@contextlib.asynccontextmanager
+async def _collection_session():
+    # The shared session and limits on the collector loop; a private pair
+    # when a caller awaits collection on a loop of its own
+    if _collector_loop.owns_running_loop():
+        _provider_semaphores.set(_collector_loop.semaphores())
+        yield _collector_loop.session()
+        return
+    _provider_semaphores.set(_new_provider_semaphores())
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT)) as session:
+        yield session
+
+
+def _bearer_token(headers):
+    auth = (headers or {}).get("Authorization", "")
+    if auth.startswith("Bearer "):
+        return auth[len("Bearer "):]
+    return None
+
+
+def _query_params(params):
+    # aiohttp only accepts str/int/float query values; normalize the rest.
+    if not params:
+        return params
+    return {key: str(value) for key, value in params.items() if value is not None}
+
 if __name__ == "__main__":
     collector = GenreDataCollector()
     collector.collect_all_data()
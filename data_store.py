@@ -0,0 +1,322 @@
+import os
+import uuid
+import logging
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Partition columns live in the directory layout (date=.../source=...), not
+# in the files, so they are left out of the per-table schemas below.
+PARTITION_COLUMNS = ["date", "source"]
+
+TIMESTAMP = pa.timestamp("us", tz="UTC")
+
+SCHEMAS = {
+    "artists": pa.schema([
+        ("collected_at", TIMESTAMP),
+        ("query", pa.string()),
+        ("artist_id", pa.string()),
+        ("name", pa.string()),
+        ("popularity", pa.int32()),
+        ("followers", pa.int64()),
+        ("genres", pa.list_(pa.string())),
+    ]),
+    "tracks": pa.schema([
+        ("collected_at", TIMESTAMP),
+        ("query", pa.string()),
+        ("track_id", pa.string()),
+        ("name", pa.string()),
+        ("artist_id", pa.string()),
+        ("artist_name", pa.string()),
+        ("album_id", pa.string()),
+        ("album_name", pa.string()),
+        ("release_date", pa.string()),
+        ("popularity", pa.int32()),
+        ("duration_ms", pa.int64()),
+        ("explicit", pa.bool_()),
+    ]),
+    "videos": pa.schema([
+        ("collected_at", TIMESTAMP),
+        ("query", pa.string()),
+        ("video_id", pa.string()),
+        ("channel_id", pa.string()),
+        ("channel_title", pa.string()),
+        ("title", pa.string()),
+        ("published_at", TIMESTAMP),
+    ]),
+    "listener_stats": pa.schema([
+        ("collected_at", TIMESTAMP),
+        ("query", pa.string()),
+        ("artist_name", pa.string()),
+        ("mbid", pa.string()),
+        ("listeners", pa.int64()),
+        ("playcount", pa.int64()),
+        ("tags", pa.list_(pa.string())),
+    ]),
+    "track_stats": pa.schema([
+        ("collected_at", TIMESTAMP),
+        ("query", pa.string()),
+        ("name", pa.string()),
+        ("mbid", pa.string()),
+        ("artist_name", pa.string()),
+        ("rank", pa.int32()),
+        ("listeners", pa.int64()),
+        ("playcount", pa.int64()),
+    ]),
+}
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _payloads(source_data, target_name):
+    # Yield (query, payload) pairs from a collect_all_data / batch_view source
+    if not source_data:
+        return
+    for role in ("nova_sound", "target"):
+        if source_data.get(role) is not None:
+            yield target_name, source_data[role]
+    for query, payload in (source_data.get("comparison_artists") or {}).items():
+        if payload is not None:
+            yield query, payload
+
+
+def _spotify_artist_row(query, artist):
+    return {
+        "source": "spotify",
+        "query": query,
+        "artist_id": artist.get("id"),
+        "name": artist.get("name"),
+        "popularity": _int(artist.get("popularity")),
+        "followers": _int((artist.get("followers") or {}).get("total")),
+        "genres": list(artist.get("genres") or []),
+    }
+
+
+def _spotify_track_row(query, track):
+    artist = (track.get("artists") or [{}])[0]
+    album = track.get("album") or {}
+    return {
+        "source": "spotify",
+        "query": query,
+        "track_id": track.get("id"),
+        "name": track.get("name"),
+        "artist_id": artist.get("id"),
+        "artist_name": artist.get("name"),
+        "album_id": album.get("id"),
+        "album_name": album.get("name"),
+        "release_date": album.get("release_date"),
+        "popularity": _int(track.get("popularity")),
+        "duration_ms": _int(track.get("duration_ms")),
+        "explicit": track.get("explicit"),
+    }
+
+
+def normalize_spotify(payload, query, tables):
+    # Handles search results, top-tracks, /artists?ids= pages and the
+    # {"artist", "top_tracks"} records produced by batch collection.
+    if "top_tracks" in payload or "artist" in payload:
+        if payload.get("artist"):
+            tables["artists"].append(_spotify_artist_row(query, payload["artist"]))
+        payload = payload.get("top_tracks") or {}
+    artists = payload.get("artists")
+    if isinstance(artists, dict):
+        artists = artists.get("items")
+    for artist in artists or []:
+        if artist:
+            tables["artists"].append(_spotify_artist_row(query, artist))
+    for track in payload.get("tracks") or []:
+        if track:
+            tables["tracks"].append(_spotify_track_row(query, track))
+
+
+def _youtube_video_row(query, item):
+    snippet = item.get("snippet") or {}
+    video_id = item.get("id")
+    if isinstance(video_id, dict):
+        video_id = video_id.get("videoId")
+    return {
+        "source": "youtube",
+        "query": query,
+        "video_id": video_id,
+        "channel_id": snippet.get("channelId"),
+        "channel_title": snippet.get("channelTitle"),
+        "title": snippet.get("title"),
+        "published_at": snippet.get("publishedAt"),
+    }
+
+
+def _lastfm_track_row(query, track):
+    artist = track.get("artist") or {}
+    return {
+        "source": "lastfm",
+        "query": query,
+        "name": track.get("name"),
+        "mbid": track.get("mbid") or None,
+        "artist_name": artist.get("name") if isinstance(artist, dict) else artist,
+        "rank": _int((track.get("@attr") or {}).get("rank")),
+        "listeners": _int(track.get("listeners")),
+        "playcount": _int(track.get("playcount")),
+    }
+
+
+def normalize_youtube(payload, query, tables):
+    for item in payload.get("items") or []:
+        tables["videos"].append(_youtube_video_row(query, item))
+
+
+def normalize_lastfm(payload, query, tables):
+    artist = payload.get("artist")
+    if not artist:
+        return
+    stats = artist.get("stats") or {}
+    tags = (artist.get("tags") or {}).get("tag") or []
+    if isinstance(tags, dict):
+        tags = [tags]
+    tables["listener_stats"].append({
+        "source": "lastfm",
+        "query": query,
+        "artist_name": artist.get("name"),
+        "mbid": artist.get("mbid") or None,
+        "listeners": _int(stats.get("listeners")),
+        "playcount": _int(stats.get("playcount")),
+        "tags": [t.get("name") for t in tags if t.get("name")],
+    })
+
+
+NORMALIZERS = {
+    "spotify": normalize_spotify,
+    "youtube": normalize_youtube,
+    "lastfm": normalize_lastfm,
+}
+
+
+def normalize_payloads(data, collected_at=None, target_name="Nova Sound"):
+    # Flatten {"spotify", "youtube", "lastfm"} provider payloads into typed
+    # tables. Returns {table name: DataFrame} including date/source columns.
+    collected_at = collected_at or datetime.now(timezone.utc)
+    rows = {name: [] for name in SCHEMAS}
+    for source, normalizer in NORMALIZERS.items():
+        for query, payload in _payloads(data.get(source), target_name):
+            if isinstance(payload, dict):
+                normalizer(payload, query, rows)
+
+    return {name: _frame(name, rows[name], collected_at) for name in SCHEMAS}
+
+
+# Target table and row builder for records streamed page by page
+# (GenreDataCollector.stream_records)
+RECORD_NORMALIZERS = {
+    "spotify": ("tracks", _spotify_track_row),
+    "youtube": ("videos", _youtube_video_row),
+    "lastfm": ("track_stats", _lastfm_track_row),
+}
+
+
+def normalize_records(source, query, records, collected_at=None):
+    # One batch of streamed records as (table name, DataFrame)
+    table, row = RECORD_NORMALIZERS[source]
+    rows = [row(query, record) for record in records if record]
+    return table, _frame(table, rows, collected_at or datetime.now(timezone.utc))
+
+
+def _frame(name, rows, collected_at):
+    schema = SCHEMAS[name]
+    df = pd.DataFrame(rows, columns=["source", *[f.name for f in schema if f.name != "collected_at"]])
+    df["collected_at"] = pd.Timestamp(collected_at)
+    df["date"] = pd.Timestamp(collected_at).strftime("%Y-%m-%d")
+    return df
+
+
+def write_part(table, directory, compression="zstd"):
+    # Written under a dot-prefixed name, which dataset readers skip, and
+    # renamed into place once complete, so a reader in another worker never
+    # loads a half-written part file
+    tmp_path = os.path.join(directory, f".part-{uuid.uuid4().hex}.tmp")
+    try:
+        pq.write_table(table, tmp_path, compression=compression)
+        os.replace(tmp_path, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ParquetStore:
+    # Append-only Parquet warehouse, one dataset per table, hive-partitioned
+    # by collection date and source: <root>/<table>/date=.../source=.../*.parquet
+
+    def __init__(self, root, compression="zstd"):
+        self.root = root
+        self.compression = compression
+        os.makedirs(self.root, exist_ok=True)
+        self.marker_path = os.path.join(self.root, "_last_write")
+
+    def last_modified(self):
+        # Changes whenever any process appends to any table
+        try:
+            return os.path.getmtime(self.marker_path)
+        except OSError:
+            return None
+
+    def table_path(self, table):
+        return os.path.join(self.root, table)
+
+    def write_tables(self, tables):
+        written = {}
+        for table, df in tables.items():
+            written[table] = self.write(table, df)
+        return written
+
+    def write(self, table, df):
+        if df.empty:
+            return 0
+        schema = SCHEMAS[table]
+        for (date, source), part in df.groupby(PARTITION_COLUMNS, sort=False):
+            directory = os.path.join(self.table_path(table), f"date={date}", f"source={source}")
+            os.makedirs(directory, exist_ok=True)
+            frame = part[[f.name for f in schema]].copy()
+            for field in schema:
+                if pa.types.is_timestamp(field.type):
+                    frame[field.name] = pd.to_datetime(frame[field.name], utc=True, errors="coerce")
+            arrow_table = pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+            write_part(arrow_table, directory, self.compression)
+        with open(self.marker_path, "a"):
+            os.utime(self.marker_path)
+        logging.info(f"Stored {len(df)} rows in {table}")
+        return len(df)
+
+    def read(self, table, columns=None, filters=None):
+        # columns prunes what is decoded; filters (pyarrow DNF tuples such as
+        # [("source", "=", "spotify"), ("date", ">=", "2025-01-01")]) are
+        # pushed down to partition pruning and row-group statistics.
+        path = self.table_path(table)
+        if not os.path.isdir(path) or not os.listdir(path):
+            names = list(columns) if columns else [*PARTITION_COLUMNS, *SCHEMAS[table].names]
+            return pd.DataFrame(columns=names)
+        arrow_table = pq.read_table(
+            path,
+            columns=columns,
+            filters=filters,
+            partitioning="hive",
+            schema=self._dataset_schema(table),
+        )
+        return arrow_table.to_pandas()
+
+    def dates(self, table):
+        path = self.table_path(table)
+        if not os.path.isdir(path):
+            return []
+        return sorted(d.split("=", 1)[1] for d in os.listdir(path) if d.startswith("date="))
+
+    def _dataset_schema(self, table):
+        schema = SCHEMAS[table]
+        for column in PARTITION_COLUMNS:
+            schema = schema.append(pa.field(column, pa.string()))
+        return schema
@@ -0,0 +1,121 @@
+import os
+import json
+import uuid
+import hashlib
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import record_cache_lookup
+from storage import FileLock
+from config import FORECAST_CACHE_MAX_AGE_DAYS, FORECAST_CACHE_MAX_ENTRIES
+
+CACHE_COLUMNS = ["fingerprint", "unique_id", "ds", "forecast", "model", "created_at"]
+
+
+def series_fingerprints(df, config):
+    # Content hash per unique_id over its (ds, y) values plus the model
+    # configuration, so any new point, revised value or config change misses.
+    salt = json.dumps(config, sort_keys=True, default=str).encode()
+    row_hashes = pd.util.hash_pandas_object(df[["ds", "y"]], index=False).to_numpy()
+    fingerprints = {}
+    for uid, positions in df.groupby("unique_id", sort=False).indices.items():
+        digest = hashlib.sha256(salt)
+        digest.update(str(uid).encode())
+        digest.update(row_hashes[np.sort(positions)].tobytes())
+        fingerprints[uid] = digest.hexdigest()
+    return pd.Series(fingerprints, name="fingerprint", dtype=object)
+
+
+class ForecastCache:
+    # Forecast rows keyed by series fingerprint, kept in one Parquet file next
+    # to genre_forecast.csv. Entries older than max_age_days are dropped and
+    # the oldest series are evicted once more than max_entries are held.
+
+    def __init__(self, path, max_age_days=FORECAST_CACHE_MAX_AGE_DAYS, max_entries=FORECAST_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_age = pd.Timedelta(days=max_age_days)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = None
+        self._mtime = None
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, fingerprints):
+        with self._lock:
+            entries = self._load()
+            fresh = entries["created_at"] >= pd.Timestamp.now(tz="UTC") - self.max_age
+            hits = entries[fresh & entries["fingerprint"].isin(fingerprints.values)]
+            # A fingerprint already embeds the unique_id; keep only matching pairs
+            hits = hits[hits["fingerprint"].values == fingerprints.reindex(hits["unique_id"]).values]
+            n_hits = hits["unique_id"].nunique()
+            self.hits += n_hits
+            self.misses += len(fingerprints) - n_hits
+        record_cache_lookup("forecast", True, n_hits)
+        record_cache_lookup("forecast", False, len(fingerprints) - n_hits)
+        return hits[["unique_id", "ds", "forecast", "model"]].reset_index(drop=True)
+
+    def store(self, forecast, fingerprints):
+        if forecast.empty:
+            return
+        with self._lock, FileLock(f"{self.path}.lock"):
+            entries = self._load()
+            new = forecast.assign(
+                fingerprint=forecast["unique_id"].map(fingerprints),
+                created_at=pd.Timestamp.now(tz="UTC"),
+            )[CACHE_COLUMNS]
+            # A series only ever needs its latest forecast
+            entries = entries[~entries["unique_id"].isin(new["unique_id"])]
+            self._entries = self._evict(pd.concat([entries, new], ignore_index=True))
+            self._save()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": 0 if self._entries is None else self._entries["fingerprint"].nunique(),
+        }
+
+    def _evict(self, entries):
+        if entries.empty:
+            return entries
+        cutoff = pd.Timestamp.now(tz="UTC") - self.max_age
+        entries = entries[entries["created_at"] >= cutoff]
+        newest = entries.groupby("fingerprint")["created_at"].max().sort_values(ascending=False)
+        if len(newest) > self.max_entries:
+            entries = entries[entries["fingerprint"].isin(newest.index[:self.max_entries])]
+        return entries.reset_index(drop=True)
+
+    def _load(self):
+        # Re-read when another worker has rewritten the file since our load
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if self._entries is None or mtime != self._mtime:
+            self._mtime = mtime
+            try:
+                self._entries = pd.read_parquet(self.path)
+            except (OSError, ValueError) as e:
+                if os.path.exists(self.path):
+                    logging.warning(f"Discarding unreadable forecast cache: {e}")
+                self._entries = pd.DataFrame({
+                    "fingerprint": pd.Series(dtype=object),
+                    "unique_id": pd.Series(dtype=object),
+                    "ds": pd.Series(dtype="datetime64[ns]"),
+                    "forecast": pd.Series(dtype=float),
+                    "model": pd.Series(dtype=object),
+                    "created_at": pd.Series(dtype="datetime64[ns, UTC]"),
+                })
+        return self._entries
+
+    def _save(self):
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        self._entries.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
@@ -0,0 +1,210 @@
+import json
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+
+import pandas as pd
+from statsforecast.core import StatsForecast
+from statsforecast.models import AutoARIMA, ARIMA, SimpleExponentialSmoothingOptimized, Naive
+
+from forecast_cache import series_fingerprints
+from storage import FileLock, atomic_write
+from config import FORECAST_N_JOBS, FORECAST_HORIZON, FORECAST_MODEL_MAX_AGE_DAYS
+
+# Series length thresholds (weekly points) for each model tier
+ARIMA_MIN_POINTS = 12
+SES_MIN_POINTS = 3
+
+# Below this many series a process pool costs more than it saves
+PARALLEL_MIN_SERIES = 32
+
+
+class _TimedFit:
+    # Records how long fit() took on each series. The fitted instances come
+    # back from StatsForecast's worker processes intact, timings included.
+    # Classes stay module-level so they pickle into those workers.
+
+    def fit(self, y, X=None):
+        started = time.perf_counter()
+        fitted = super().fit(y, X)
+        self.fit_seconds_ = time.perf_counter() - started
+        return fitted
+
+
+class TimedAutoARIMA(_TimedFit, AutoARIMA):
+    pass
+
+
+class TimedARIMA(_TimedFit, ARIMA):
+    pass
+
+
+class TimedSES(_TimedFit, SimpleExponentialSmoothingOptimized):
+    pass
+
+
+class TimedNaive(_TimedFit, Naive):
+    pass
+
+
+def warm_up_models(points=ARIMA_MIN_POINTS + 4):
+    # One single-series fit per model tier. On statsforecast releases that
+    # JIT-compile their kernels with numba this triggers the compilation
+    # (kept on disk when NIXTLA_NUMBA_CACHE is set); on releases with
+    # compiled kernels it loads them and the model code paths.
+    df = pd.DataFrame({
+        "unique_id": "warm_up",
+        "ds": pd.date_range("2024-01-07", periods=points, freq="W"),
+        "y": [10 + 0.5 * i + (i % 3) for i in range(points)],
+    })
+    for model in (TimedAutoARIMA(), TimedARIMA(order=(1, 1, 0)), TimedSES(), TimedNaive()):
+        StatsForecast(models=[model], freq="W", n_jobs=1).fit(df).predict(h=1)
+
+
+def _arima_spec(model):
+    # Orders AutoARIMA selected, so later runs can refit without the search
+    fitted = model.model_
+    p, q, _, _, _, d, _ = fitted["arma"]
+    coef = fitted.get("coef") or {}
+    return {
+        "order": [int(p), int(d), int(q)],
+        "include_mean": "intercept" in coef,
+        "include_drift": "drift" in coef,
+    }
+
+
+class SeriesForecaster:
+    # Forecasts many unique_id series per call. Each series goes to a model
+    # tier by length; long series reuse the ARIMA order selected on an
+    # earlier run (persisted in state_path) and only rerun the AutoARIMA
+    # search once that selection is older than max_age.
+
+    def __init__(self, state_path, n_jobs=FORECAST_N_JOBS, horizon=FORECAST_HORIZON,
+                 max_age_days=FORECAST_MODEL_MAX_AGE_DAYS, freq="W", cache=None):
+        self.state_path = state_path
+        self.cache = cache
+        self.n_jobs = n_jobs
+        self.horizon = horizon
+        self.max_age = timedelta(days=max_age_days)
+        self.freq = freq
+        self.state = self._load_state()
+        self.last_timings = None
+
+    def config(self):
+        return {
+            "horizon": self.horizon,
+            "freq": self.freq,
+            "arima_min_points": ARIMA_MIN_POINTS,
+            "ses_min_points": SES_MIN_POINTS,
+        }
+
+    def forecast(self, df):
+        # Series whose content and config are unchanged skip fitting entirely
+        cached = None
+        if self.cache is not None:
+            fingerprints = series_fingerprints(df, self.config())
+            cached = self.cache.lookup(fingerprints)
+            if not cached.empty:
+                df = df[~df["unique_id"].isin(cached["unique_id"])]
+                logging.info(f"Forecast cache: {cached['unique_id'].nunique()} series served, {df['unique_id'].nunique()} to fit")
+            if df.empty:
+                self.last_timings = pd.DataFrame(columns=["unique_id", "model", "n_obs", "fit_seconds"])
+                return cached
+
+        forecast = self._forecast_uncached(df)
+        if self.cache is not None:
+            self.cache.store(forecast, fingerprints)
+            forecast = pd.concat([cached, forecast], ignore_index=True)
+        return forecast
+
+    def _forecast_uncached(self, df):
+        lengths = df.groupby("unique_id")["ds"].size()
+        now = datetime.now(timezone.utc)
+        # Picks up orders other workers selected since this one started
+        self.state = self._load_state()
+
+        groups = {}
+        for uid, n in lengths.items():
+            if n >= ARIMA_MIN_POINTS:
+                spec = self.state.get(uid)
+                if spec and now - datetime.fromisoformat(spec["selected_at"]) < self.max_age:
+                    key = ("ARIMA", tuple(spec["order"]), spec["include_mean"], spec["include_drift"])
+                else:
+                    key = ("AutoARIMA",)
+            elif n >= SES_MIN_POINTS:
+                key = ("SES",)
+            else:
+                key = ("Naive",)
+            groups.setdefault(key, []).append(uid)
+
+        forecasts = []
+        timings = []
+        selected = {}
+        for key, uids in groups.items():
+            started = time.perf_counter()
+            forecast, fitted = self._run_group(key, df[df["unique_id"].isin(uids)])
+            elapsed = time.perf_counter() - started
+            forecasts.append(forecast)
+            timings.append(pd.DataFrame({
+                "unique_id": fitted.index,
+                "model": key[0],
+                "n_obs": lengths.loc[fitted.index].values,
+                "fit_seconds": [getattr(m, "fit_seconds_", float("nan")) for m in fitted.values],
+            }))
+            logging.info(f"Forecast group {key[0]}{key[1:] or ''}: {len(uids)} series in {elapsed:.2f}s")
+            if key[0] == "AutoARIMA":
+                selected_at = now.isoformat()
+                for uid, model in fitted.items():
+                    # Series that fell back to Naive have no order to keep
+                    if "arma" in (getattr(model, "model_", None) or {}):
+                        selected[uid] = {**_arima_spec(model), "selected_at": selected_at}
+
+        if selected:
+            self._save_state(selected)
+        self.last_timings = pd.concat(timings, ignore_index=True).sort_values("fit_seconds", ascending=False)
+        self._log_timings(self.last_timings)
+        return pd.concat(forecasts, ignore_index=True)
+
+    def _run_group(self, key, df):
+        if key[0] == "AutoARIMA":
+            model = TimedAutoARIMA()
+        elif key[0] == "ARIMA":
+            _, order, include_mean, include_drift = key
+            model = TimedARIMA(order=order, include_mean=include_mean, include_drift=include_drift)
+        elif key[0] == "SES":
+            model = TimedSES()
+        else:
+            model = TimedNaive()
+
+        n_series = df["unique_id"].nunique()
+        n_jobs = self.n_jobs if n_series >= PARALLEL_MIN_SERIES else 1
+        sf = StatsForecast(models=[model], freq=self.freq, n_jobs=n_jobs, fallback_model=TimedNaive())
+        sf.fit(df)
+        forecast = sf.predict(h=self.horizon)
+        alias = forecast.columns[-1]
+        forecast = forecast.rename(columns={alias: "forecast"}).assign(model=key[0])
+        fitted = pd.Series(sf.fitted_[:, 0], index=pd.Index(sf.uids, name="unique_id"))
+        return forecast[["unique_id", "ds", "forecast", "model"]], fitted
+
+    def _log_timings(self, timings, top=10):
+        total = timings["fit_seconds"].sum()
+        logging.info(f"Fitted {len(timings)} series, {total:.2f}s total fit time")
+        for row in timings.head(top).itertuples():
+            logging.info(f"  {row.unique_id}: {row.model} on {row.n_obs} points in {row.fit_seconds:.3f}s")
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, selected):
+        # Merged into the file's current contents under its lock, so
+        # concurrent workers add to each other's selections, not overwrite them
+        with FileLock(f"{self.state_path}.lock"):
+            state = self._load_state()
+            state.update(selected)
+            with atomic_write(self.state_path) as f:
+                json.dump(state, f)
+        self.state = state
@@ -0,0 +1,198 @@
+import os
+import uuid
+import heapq
+import logging
+import threading
+
+import networkx as nx
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage import FileLock
+
+EDGE_SCHEMA = pa.schema([
+    ("u", pa.string()),
+    ("v", pa.string()),
+    ("weight", pa.float64()),
+    ("week", pa.int64()),
+    ("current", pa.float64()),
+    ("previous", pa.float64()),
+])
+
+
+def _tag_rows(tables):
+    # (artist, collected_at, tag) rows merged from Spotify genres and Last.fm tags
+    frames = []
+    artists = tables.get("artists")
+    if artists is not None and not artists.empty:
+        # Within a run the first row per query is the top search match
+        first = artists.drop_duplicates(["query", "collected_at"])
+        frames.append(first[["query", "collected_at", "genres"]].rename(columns={"genres": "tag"}))
+    stats = tables.get("listener_stats")
+    if stats is not None and not stats.empty:
+        frames.append(stats[["query", "collected_at", "tags"]].rename(columns={"tags": "tag"}))
+    if not frames:
+        return pd.DataFrame(columns=["query", "collected_at", "tag"])
+    rows = pd.concat(frames, ignore_index=True).explode("tag").dropna(subset=["tag"])
+    rows["tag"] = rows["tag"].astype(str).str.lower()
+    rows["collected_at"] = pd.to_datetime(rows["collected_at"], utc=True)
+    return rows
+
+
+def weekly_cooccurrence(rows):
+    # Per ISO week, the number of distinct artists tagged with both genres of
+    # each pair. Returns week, u, v, weight with u < v.
+    if rows.empty:
+        return pd.DataFrame(columns=["week", "u", "v", "weight"])
+    rows = rows.assign(week=rows["collected_at"].dt.tz_localize(None).dt.to_period("W").array.asi8)
+    rows = rows.drop_duplicates(["query", "week", "tag"])[["query", "week", "tag"]]
+    pairs = rows.merge(rows, on=["query", "week"], suffixes=("_u", "_v"))
+    pairs = pairs[pairs["tag_u"] < pairs["tag_v"]]
+    counts = pairs.groupby(["week", "tag_u", "tag_v"]).size().reset_index(name="weight")
+    return counts.rename(columns={"tag_u": "u", "tag_v": "v"}).astype({"weight": float})
+
+
+class GenreFlowGraph:
+    # Undirected genre co-occurrence graph. Edge attributes:
+    #   weight   - sum of weekly co-occurrence counts over all weeks seen
+    #   week     - week ordinal that `current` belongs to
+    #   current  - co-occurrence count in that week
+    #   previous - count in the week before it
+    # Each update applies only observations newer than the stored watermark
+    # and only touches the edges they mention; rolling a week over is done
+    # lazily per edge, so no pass over the whole graph is needed.
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.graph = nx.Graph()
+        self.watermark = None
+        self.latest_week = None
+        self._communities = None
+        self._version = None
+        self._load()
+
+    def update(self, tables):
+        rows = _tag_rows(tables)
+        with self._lock, FileLock(f"{self.path}.lock"):
+            if self._version != self._file_version():
+                # Another worker has applied updates since we loaded
+                self.graph = nx.Graph()
+                self.watermark = self.latest_week = None
+                self._load()
+            if self.watermark is not None:
+                rows = rows[rows["collected_at"] > self.watermark]
+            if rows.empty:
+                return 0
+            counts = weekly_cooccurrence(rows)
+            for row in counts.itertuples(index=False):
+                self._apply(row.u, row.v, int(row.week), float(row.weight))
+            self.watermark = rows["collected_at"].max()
+            if not counts.empty:
+                week = int(counts["week"].max())
+                self.latest_week = week if self.latest_week is None else max(self.latest_week, week)
+            self._communities = None
+            self._save()
+        logging.info(f"Genre flow graph: applied {len(counts)} edge deltas, {self.graph.number_of_edges()} edges total")
+        return len(counts)
+
+    def _apply(self, u, v, week, count):
+        data = self.graph.get_edge_data(u, v)
+        if data is None:
+            self.graph.add_edge(u, v, weight=count, week=week, current=count, previous=0.0)
+        elif data["week"] == week:
+            # Another run in the same week: a week counts its largest snapshot
+            if count > data["current"]:
+                data["weight"] += count - data["current"]
+                data["current"] = count
+        elif week > data["week"]:
+            data["previous"] = data["current"] if data["week"] == week - 1 else 0.0
+            data["week"] = week
+            data["current"] = count
+            data["weight"] += count
+        else:
+            # Late observations for an earlier week only add to the total
+            data["weight"] += count
+
+    def rising_edges(self, k=5):
+        # Largest week-over-week increase as of the latest week. Reads hold the
+        # lock so a concurrent update cannot resize the graph mid-iteration.
+        with self._lock:
+            if self.latest_week is None:
+                return pd.DataFrame(columns=["u", "v", "current", "previous", "delta", "weight"])
+            week = self.latest_week
+            rows = []
+            for u, v, data in self.graph.edges(data=True):
+                if data["week"] == week:
+                    current, previous = data["current"], data["previous"]
+                elif data["week"] == week - 1:
+                    current, previous = 0.0, data["current"]
+                else:
+                    continue
+                if current > previous:
+                    rows.append((current - previous, data["weight"], u, v, current, previous))
+        top = heapq.nlargest(k, rows)
+        return pd.DataFrame(
+            [(u, v, current, previous, delta, weight) for delta, weight, u, v, current, previous in top],
+            columns=["u", "v", "current", "previous", "delta", "weight"],
+        )
+
+    def communities(self, min_size=2):
+        # Louvain communities on cumulative weights, cached until the next update
+        with self._lock:
+            if self._communities is None:
+                if self.graph.number_of_edges() == 0:
+                    self._communities = []
+                else:
+                    found = nx.community.louvain_communities(self.graph, weight="weight", seed=0)
+                    strength = dict(self.graph.degree(weight="weight"))
+                    self._communities = sorted(
+                        (sorted(c, key=lambda g: -strength[g]) for c in found),
+                        key=lambda c: -sum(strength[g] for g in c),
+                    )
+            found = self._communities
+        return [c for c in found if len(c) >= min_size]
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        self._communities = None
+        self._version = self._file_version()
+        try:
+            table = pq.read_table(self.path)
+        except (OSError, ValueError, pa.ArrowInvalid) as e:
+            if os.path.exists(self.path):
+                logging.warning(f"Discarding unreadable genre graph: {e}")
+            return
+        metadata = table.schema.metadata or {}
+        if b"watermark" in metadata:
+            self.watermark = pd.Timestamp(metadata[b"watermark"].decode())
+        if b"latest_week" in metadata:
+            self.latest_week = int(metadata[b"latest_week"])
+        edges = table.to_pandas()
+        self.graph.add_edges_from(
+            (row.u, row.v, {"weight": row.weight, "week": row.week, "current": row.current, "previous": row.previous})
+            for row in edges.itertuples(index=False)
+        )
+
+    def _save(self):
+        edges = [(u, v, d["weight"], d["week"], d["current"], d["previous"]) for u, v, d in self.graph.edges(data=True)]
+        table = pa.Table.from_pandas(
+            pd.DataFrame(edges, columns=EDGE_SCHEMA.names),
+            schema=EDGE_SCHEMA,
+            preserve_index=False,
+        )
+        metadata = {"watermark": self.watermark.isoformat()}
+        if self.latest_week is not None:
+            metadata["latest_week"] = str(self.latest_week)
+        table = table.replace_schema_metadata(metadata)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, self.path)
+        self._version = self._file_version()
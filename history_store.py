@@ -0,0 +1,247 @@
+import os
+import json
+import logging
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from storage import FileLock
+from data_store import write_part
+
+HISTORY_SCHEMA = pa.schema([
+    ("source", pa.string()),
+    ("entity", pa.string()),
+    ("ds", pa.timestamp("us", tz="UTC")),
+    ("y", pa.float64()),
+])
+
+KEY_SEPARATOR = "|"
+
+
+def series_id(source, entity, metric):
+    return KEY_SEPARATOR.join((source, entity, metric))
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def extract_observations(tables):
+    # Turn one run's normalized tables (see data_store.normalize_payloads)
+    # into long-format (source, entity, metric, ds, y) observations, both per
+    # artist and rolled up per genre tag.
+    frames = []
+
+    artists = tables.get("artists")
+    if artists is not None and not artists.empty:
+        artists = artists.dropna(subset=["name"]).drop_duplicates(["name", "collected_at"])
+        for metric in ("popularity", "followers"):
+            frames.append(pd.DataFrame({
+                "source": "spotify",
+                "entity": artists["name"],
+                "metric": metric,
+                "ds": artists["collected_at"],
+                "y": artists[metric],
+            }))
+        genres = artists[["genres", "popularity", "collected_at"]].explode("genres").dropna(subset=["genres"])
+        if not genres.empty:
+            by_genre = genres.groupby(["genres", "collected_at"], as_index=False)["popularity"].mean()
+            frames.append(pd.DataFrame({
+                "source": "genre",
+                "entity": by_genre["genres"],
+                "metric": "popularity",
+                "ds": by_genre["collected_at"],
+                "y": by_genre["popularity"],
+            }))
+
+    tracks = tables.get("tracks")
+    if tracks is not None and not tracks.empty:
+        by_artist = tracks.dropna(subset=["artist_name"]).groupby(
+            ["artist_name", "collected_at"], as_index=False
+        )["popularity"].mean()
+        frames.append(pd.DataFrame({
+            "source": "spotify",
+            "entity": by_artist["artist_name"],
+            "metric": "top_track_popularity",
+            "ds": by_artist["collected_at"],
+            "y": by_artist["popularity"],
+        }))
+
+    stats = tables.get("listener_stats")
+    if stats is not None and not stats.empty:
+        stats = stats.dropna(subset=["artist_name"])
+        for metric in ("listeners", "playcount"):
+            frames.append(pd.DataFrame({
+                "source": "lastfm",
+                "entity": stats["artist_name"],
+                "metric": metric,
+                "ds": stats["collected_at"],
+                "y": stats[metric],
+            }))
+        tags = stats[["tags", "listeners", "collected_at"]].explode("tags").dropna(subset=["tags"])
+        if not tags.empty:
+            by_tag = tags.groupby(["tags", "collected_at"], as_index=False)["listeners"].sum()
+            frames.append(pd.DataFrame({
+                "source": "genre",
+                "entity": by_tag["tags"].str.lower(),
+                "metric": "listeners",
+                "ds": by_tag["collected_at"],
+                "y": by_tag["listeners"],
+            }))
+
+    videos = tables.get("videos")
+    if videos is not None and not videos.empty:
+        counts = videos.groupby(["query", "collected_at"], as_index=False)["video_id"].count()
+        frames.append(pd.DataFrame({
+            "source": "youtube",
+            "entity": counts["query"],
+            "metric": "videos_found",
+            "ds": counts["collected_at"],
+            "y": counts["video_id"],
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["source", "entity", "metric", "ds", "y"])
+    observations = pd.concat(frames, ignore_index=True)
+    observations["y"] = pd.to_numeric(observations["y"], errors="coerce")
+    observations["ds"] = pd.to_datetime(observations["ds"], utc=True)
+    return observations.dropna(subset=["y"])
+
+
+class MetricHistoryStore:
+    # Append-only history of (source, entity, metric) observations stored as
+    # Parquet under <root>/metric=<metric>/year=<yyyy>/part-*.parquet.
+    #
+    # A small watermark index (latest ds per series) makes appends idempotent
+    # without reading history back, and reads push metric/year/time/entity
+    # filters down to Parquet so memory scales with the requested range, not
+    # with total history. compact() merges a partition's small per-run files.
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+        self.watermark_path = os.path.join(self.root, "_watermarks.json")
+        self._lock = threading.Lock()
+        # Serializes appends from every uvicorn worker sharing this root
+        self._file_lock_path = os.path.join(self.root, "_append.lock")
+        self._watermarks = self._load_watermarks()
+
+    def append(self, observations):
+        if observations is None or observations.empty:
+            return 0
+        with self._lock, FileLock(self._file_lock_path):
+            # Another worker may have appended since our last look
+            self._watermarks = self._load_watermarks()
+            observations = observations.copy()
+            observations["ds"] = pd.to_datetime(observations["ds"], utc=True)
+            observations["unique_id"] = (
+                observations["source"] + KEY_SEPARATOR
+                + observations["entity"].astype(str) + KEY_SEPARATOR
+                + observations["metric"]
+            )
+            watermark = pd.to_datetime(observations["unique_id"].map(self._watermarks), utc=True)
+            new = observations[watermark.isna() | (observations["ds"] > watermark)]
+            new = new.drop_duplicates(["unique_id", "ds"], keep="last")
+            if new.empty:
+                return 0
+
+            for (metric, year), part in new.groupby(["metric", new["ds"].dt.year]):
+                directory = os.path.join(self.root, f"metric={metric}", f"year={year}")
+                os.makedirs(directory, exist_ok=True)
+                table = pa.Table.from_pandas(
+                    part[HISTORY_SCHEMA.names].sort_values(["source", "entity", "ds"]),
+                    schema=HISTORY_SCHEMA,
+                    preserve_index=False,
+                )
+                write_part(table, directory)
+
+            latest = new.groupby("unique_id")["ds"].max()
+            self._watermarks.update({key: ts.isoformat() for key, ts in latest.items()})
+            self._save_watermarks()
+        logging.info(f"Appended {len(new)} observations across {len(latest)} series")
+        return len(new)
+
+    def read(self, metrics=None, sources=None, entities=None, start=None, end=None):
+        # Returns the long format StatsForecast expects: unique_id, ds, y
+        empty = pd.DataFrame({
+            "unique_id": pd.Series(dtype=str),
+            "ds": pd.Series(dtype="datetime64[ns]"),
+            "y": pd.Series(dtype=float),
+        })
+        if not self.metrics():
+            return empty
+
+        dataset = ds.dataset(self.root, format="parquet", partitioning="hive", schema=self._dataset_schema())
+        expression = None
+
+        def both(a, b):
+            return b if a is None else a & b
+
+        if metrics is not None:
+            expression = both(expression, ds.field("metric").isin(list(metrics)))
+        if sources is not None:
+            expression = both(expression, ds.field("source").isin(list(sources)))
+        if entities is not None:
+            expression = both(expression, ds.field("entity").isin(list(entities)))
+        if start is not None:
+            start = _utc(start)
+            expression = both(expression, (ds.field("year") >= start.year) & (ds.field("ds") >= start.to_pydatetime()))
+        if end is not None:
+            end = _utc(end)
+            expression = both(expression, (ds.field("year") <= end.year) & (ds.field("ds") <= end.to_pydatetime()))
+
+        table = dataset.to_table(columns=["source", "entity", "metric", "ds", "y"], filter=expression)
+        if table.num_rows == 0:
+            return empty
+        df = table.to_pandas()
+        df["unique_id"] = df["source"] + KEY_SEPARATOR + df["entity"] + KEY_SEPARATOR + df["metric"].astype(str)
+        df["ds"] = df["ds"].dt.tz_localize(None)
+        return df[["unique_id", "ds", "y"]].sort_values(["unique_id", "ds"], ignore_index=True)
+
+    def metrics(self):
+        return sorted(
+            d.split("=", 1)[1] for d in os.listdir(self.root)
+            if d.startswith("metric=") and os.path.isdir(os.path.join(self.root, d))
+        )
+
+    def series_count(self):
+        return len(self._watermarks)
+
+    def compact(self):
+        # Merge each metric/year partition into a single file, one at a time
+        merged = 0
+        with self._lock, FileLock(self._file_lock_path):
+            for metric in self.metrics():
+                metric_dir = os.path.join(self.root, f"metric={metric}")
+                for year_dir in os.listdir(metric_dir):
+                    directory = os.path.join(metric_dir, year_dir)
+                    parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet"))
+                    if len(parts) < 2:
+                        continue
+                    table = pa.concat_tables(pq.read_table(os.path.join(directory, f), schema=HISTORY_SCHEMA) for f in parts)
+                    table = table.sort_by([("source", "ascending"), ("entity", "ascending"), ("ds", "ascending")])
+                    write_part(table, directory)
+                    for f in parts:
+                        os.remove(os.path.join(directory, f))
+                    merged += len(parts)
+        return merged
+
+    def _dataset_schema(self):
+        return HISTORY_SCHEMA.append(pa.field("metric", pa.string())).append(pa.field("year", pa.int32()))
+
+    def _load_watermarks(self):
+        try:
+            with open(self.watermark_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_watermarks(self):
+        tmp_path = f"{self.watermark_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._watermarks, f)
+        os.replace(tmp_path, self.watermark_path)
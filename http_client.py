@@ -0,0 +1,178 @@
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import HTTP_TIMEOUT, HTTP_POOL_SIZE, REPLAY_URL
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+PROVIDER_HOSTS = {
+    "api.spotify.com": "spotify",
+    "accounts.spotify.com": "spotify",
+    "www.googleapis.com": "youtube",
+    "ws.audioscrobbler.com": "lastfm",
+}
+
+
+def provider_for(url):
+    return PROVIDER_HOSTS.get(urlparse(url).hostname, "default")
+
+
+def transport_url(url, replay_base=None):
+    # In replay mode requests go to <replay_base>/<host><path>?<query> on the
+    # local stand-in (see replay.py). Callers keep the real URL for provider
+    # selection, cache keys and metrics labels.
+    if not replay_base:
+        return url
+    parsed = urlparse(url)
+    query = f"?{parsed.query}" if parsed.query else ""
+    return f"{replay_base.rstrip('/')}/{parsed.hostname}{parsed.path}{query}"
+
+
+def parse_retry_after(value):
+    # Retry-After is either delta-seconds or an HTTP-date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, backoff_base=0.5, backoff_max=30.0,
+                 retry_statuses=RETRY_STATUSES, max_retry_after=60.0):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = set(retry_statuses)
+        self.max_retry_after = max_retry_after
+
+    def should_retry(self, attempt, status=None):
+        if attempt >= self.max_attempts:
+            return False
+        return status is None or status in self.retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        # A server-provided Retry-After wins (capped); otherwise full-jitter
+        # exponential backoff so synchronized clients spread out.
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Take one token and return how long the caller must wait before
+        # using it. Callers sleep with time.sleep or asyncio.sleep as suits.
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class PooledHttpClient:
+    # One keep-alive requests.Session per provider, each with its own rate
+    # limiter, so connections are reused across calls and threads.
+
+    def __init__(self, rate_limits=None, timeout=HTTP_TIMEOUT, pool_size=HTTP_POOL_SIZE, replay_base=REPLAY_URL):
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.replay_base = replay_base
+        self.limiters = {
+            provider: TokenBucket(rate)
+            for provider, rate in (rate_limits or {}).items()
+        }
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, provider):
+        with self._lock:
+            session = self._sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[provider] = session
+            return session
+
+    def limiter(self, provider):
+        return self.limiters.get(provider)
+
+    def request(self, method, url, policy=None, **kwargs):
+        # Returns the final response (which may still be an error status) or
+        # raises the last transport error once retries are exhausted.
+        policy = policy or RetryPolicy()
+        provider = provider_for(url)
+        session = self.session(provider)
+        limiter = self.limiter(provider)
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                response = session.request(method, transport_url(url, self.replay_base), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not policy.should_retry(attempt):
+                    raise
+                wait = policy.delay(attempt)
+                logging.warning(f"{provider} request error ({e}); retry {attempt} in {wait:.2f}s")
+                time.sleep(wait)
+                continue
+
+            if response.status_code < 400 or not policy.should_retry(attempt, response.status_code):
+                return response
+
+            wait = policy.delay(attempt, parse_retry_after(response.headers.get("Retry-After")))
+            logging.warning(f"{provider} returned {response.status_code}; retry {attempt} in {wait:.2f}s")
+            response.close()
+            time.sleep(wait)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
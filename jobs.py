@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import functools
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from config import REPORT_WORKERS, MAX_PENDING_JOBS, JOB_TTL_SECONDS
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class JobManager:
+    # Runs blocking collection/analysis work on a bounded thread pool so the
+    # event loop stays free for /health, /download_report, etc. Job state is
+    # mirrored to disk so any uvicorn worker can answer a status poll.
+
+    def __init__(self, jobs_directory="./data/jobs", max_workers=REPORT_WORKERS,
+                 max_pending=MAX_PENDING_JOBS, ttl_seconds=JOB_TTL_SECONDS):
+        self.jobs_directory = jobs_directory
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max_workers
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Created on demand so the manager survives an app shutdown/restart
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="genre-pulse-job"
+                )
+            return self._executor
+
+    def run(self, fn, *args, **kwargs):
+        # Awaitable wrapper for endpoints that still answer synchronously
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def submit(self, kind, fn, *args, **kwargs):
+        with self._lock:
+            self._evict_expired()
+            pending = sum(1 for job in self._jobs.values() if job["status"] in ACTIVE_STATES)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} jobs already pending")
+
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "kind": kind,
+                "status": "queued",
+                "submitted_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["job_id"]] = job
+            self._persist(job)
+
+        self.executor.submit(self._execute, job["job_id"], fn, args, kwargs)
+        return dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+        return self._load(job_id)
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _execute(self, job_id, fn, args, kwargs):
+        self._update(job_id, status="running", started_at=_now())
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {e}")
+            self._update(job_id, status="failed", finished_at=_now(), error=str(e))
+        else:
+            logging.info(f"Job {job_id} finished in {time.perf_counter() - started:.2f}s")
+            self._update(job_id, status="succeeded", finished_at=_now(), result=result)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            self._persist(job)
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job["status"] in ACTIVE_STATES or job["finished_at"] is None:
+                continue
+            if datetime.fromisoformat(job["finished_at"]).timestamp() < cutoff:
+                del self._jobs[job_id]
+                try:
+                    os.remove(self._job_path(job_id))
+                except FileNotFoundError:
+                    pass
+
+    def _job_path(self, job_id):
+        return os.path.join(self.jobs_directory, f"{job_id}.json")
+
+    def _persist(self, job):
+        path = self._job_path(job["job_id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            # Created with the first job, not when the app is imported
+            os.makedirs(self.jobs_directory, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(job, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Failed to persist job {job['job_id']}: {e}")
+
+    def _load(self, job_id):
+        # Only accept our own hex ids so the path can't escape jobs_directory
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._job_path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
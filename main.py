@@ -1,90 +1,375 @@
 import os
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-from genre_analysis import GenrePulseAnalyzer
-from data_collector import GenreDataCollector
+import re
+import json
+import time
+import asyncio
+import hashlib
+import unicodedata
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, Field, field_validator
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from reporting import FORMATS, report_etag, etag_matches
+from services import get_analyzer, get_collector, get_renderer, start_warm_up
+from jobs import JobManager, JobQueueFull
+from coalesce import build_coalescer
+from precompute import PrecomputedReports
+from config import YOUTUBE_API_KEY, LASTFM_API_KEY, WARMUP_ON_STARTUP, WARMUP_FORECASTING
+from metrics import REQUEST_LATENCY, render_latest, mark_worker_dead
+
+REPORTS_DIRECTORY = "./reports"
+WEEKLY_REPORT_PATH = "./reports/weekly_genre_pulse.md"
+
+# The collector and analyzer (and with them pandas, pyarrow and
+# statsforecast) are built on first use or by the warm-up, not at import
+jobs = JobManager()
+coalescer = build_coalescer()
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ON_STARTUP:
+        # Runs in the background; /health answers while it is in progress
+        start_warm_up(forecasting=WARMUP_FORECASTING)
+    # Regenerates the weekly and hot artist reports when PRECOMPUTE_REPORTS is set
+    reports.start()
+    yield
+    reports.stop()
+    jobs.shutdown()
+    coalescer.shutdown()
+    mark_worker_dead()
 
 app = FastAPI(
     title="Genre Pulse API",
     description="API for generating music genre trend reports and artist analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-analyzer = GenrePulseAnalyzer()
-collector = GenreDataCollector()
-
-@app.get("/generate_report")
-async def get_report():
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
     try:
-        # Collect data from all sources
-        data = collector.collect_all_data()
-
-        # Process the data
-        analyzer.process_api_data(
-            data["spotify"],
-            data["youtube"],
-            data["lastfm"]
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template, not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            request.method,
+            route.path if route is not None else "unmatched",
+            str(status)
+        ).observe(time.perf_counter() - started)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
+# Blocking pipeline steps. These never run on the event loop: jobs run them
+# on the job pool, and synchronous endpoints and background refreshes on
+# the coalescer's own leader pool, so a job blocked on a leader can never
+# hold the thread that leader needs. Each is keyed on its normalized
+# request: concurrent identical requests, in this or any other worker,
+# share one run (see coalesce.py).
+
+WEEKLY_REPORT_KEY = "weekly_report"
+
+def coalesced(key, fn, *args):
+    # Joins the in-flight run as soon as the request arrives, rather than
+    # queueing one more run behind queued jobs
+    return asyncio.wrap_future(coalescer.submit(key, fn, *args, background=True))
+
+def build_weekly_report():
+    return coalescer.run(WEEKLY_REPORT_KEY, run_weekly_report)
+
+def run_weekly_report():
+    from data_collector import TARGET_ARTIST, COMPARISON_ARTISTS
+
+    collector = get_collector()
+    analyzer = get_analyzer()
+
+    # Collect data from all sources
+    data = collector.collect_all_data()
+
+    # Process the data
+    analyzer.process_api_data(
+        data["spotify"],
+        data["youtube"],
+        data["lastfm"]
+    )
+
+    # Analyze trends and generate report
+    analyzer.analyze_trends()
+    trends = analyzer.detect_trends()
+    genre_flow = analyzer.update_genre_flow()
+    similarity = analyzer.compare_artists(TARGET_ARTIST, COMPARISON_ARTISTS)
+    analyzer.save_report(filename=WEEKLY_REPORT_PATH, similarity=similarity, genre_flow=genre_flow, trends=trends)
+    return {"report_path": WEEKLY_REPORT_PATH}
+
+def check_artist_name(artist_name):
+    # Real names may contain "/" or "..", e.g. AC/DC; file names come from
+    # artist_slug, which cannot address another directory
+    if not artist_name.strip() or "\0" in artist_name:
+        raise ValueError(f"Invalid artist name: {artist_name!r}")
+    return artist_name
+
+def artist_slug(artist_name):
+    # [a-z0-9_-] only; names with no ASCII letters or digits get a hash
+    from data_collector import normalize_artist
+
+    name = normalize_artist(artist_name)
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^a-z0-9_-]+", "_", ascii_name).strip("_")
+    return slug or f"artist-{hashlib.sha256(name.encode()).hexdigest()[:12]}"
+
+def artist_report_path(artist_name):
+    check_artist_name(artist_name)
+    return os.path.join(REPORTS_DIRECTORY, f"{artist_slug(artist_name)}_analysis.md")
+
+def batch_key(artists, comparison_sets=None):
+    from data_collector import normalize_artist
+
+    if isinstance(comparison_sets, dict):
+        comparison_sets = {normalize_artist(a): sorted(map(normalize_artist, c)) for a, c in comparison_sets.items()}
+    elif comparison_sets is not None:
+        comparison_sets = sorted(map(normalize_artist, comparison_sets))
+    request = {"artists": sorted({normalize_artist(a) for a in artists}), "comparison_sets": comparison_sets}
+    return "artists:" + json.dumps(request, sort_keys=True)
+
+def artist_key(artist_name):
+    from data_collector import normalize_artist
+
+    return f"artist:{normalize_artist(artist_name)}"
+
+def build_batch_reports(artists, comparison_sets=None):
+    return coalescer.run(batch_key(artists, comparison_sets), run_batch_reports, artists, comparison_sets)
+
+def run_batch_reports(artists, comparison_sets=None):
+    from data_collector import batch_sources
+
+    collector = get_collector()
+    analyzer = get_analyzer()
+
+    # One deduplicated collection for the whole batch, then a report per artist
+    batch = collector.collect_batch(artists, comparison_sets)
+    sources = batch_sources(batch)
+    analyzer.process_api_data(sources["spotify"], sources["youtube"], sources["lastfm"])
+    genre_flow = analyzer.update_genre_flow()
+    trends = analyzer.detect_trends()
+
+    reports = {}
+    for artist_name, artist_data in batch["reports"].items():
+        report_path = artist_report_path(artist_name)
+        comparisons = artist_data["spotify"]["comparison_artists"]
+        similarity = analyzer.compare_artists(artist_name, comparisons)
+        analyzer.save_report(
+            filename=report_path,
+            artist_name=artist_name,
+            artist_data=artist_data,
+            similarity=similarity,
+            genre_flow=genre_flow,
+            trends=trends
         )
+        reports[artist_name] = report_path
+    return {"reports": reports, "stats": batch["stats"]}
+
+def run_artist_report(artist_name):
+    result = run_batch_reports([artist_name])
+    return {"report_path": result["reports"][artist_name]}
+
+def build_artist_report(artist_name):
+    return coalescer.run(artist_key(artist_name), run_artist_report, artist_name)
+
+# Background refreshes for precomputed serving join any identical request
+# already in flight, in this worker or another one
+
+def report_path_for(artist_name=None):
+    return WEEKLY_REPORT_PATH if artist_name is None else artist_report_path(artist_name)
+
+def within_reports_directory(path):
+    reports_directory = os.path.realpath(REPORTS_DIRECTORY)
+    return os.path.commonpath([reports_directory, os.path.realpath(path)]) == reports_directory
+
+def refresh_weekly_report():
+    return coalescer.submit(WEEKLY_REPORT_KEY, run_weekly_report, background=True)
+
+def refresh_artist_reports(artists):
+    if len(artists) == 1:
+        return coalescer.submit(artist_key(artists[0]), run_artist_report, artists[0], background=True)
+    return coalescer.submit(batch_key(artists), run_batch_reports, artists, background=True)
 
-        # Analyze trends and generate report
-        analyzer.analyze_trends()
-        analyzer.save_report()
+reports = PrecomputedReports(report_path_for, refresh_weekly_report, refresh_artist_reports)
 
+def age_headers(generated_at):
+    return {
+        "Age": str(max(0, int(time.time() - generated_at))),
+        "X-Report-Generated-At": datetime.fromtimestamp(generated_at, timezone.utc).isoformat(),
+    }
+
+def valid_artist_name(artist_name):
+    try:
+        return check_artist_name(artist_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+class BatchAnalysisRequest(BaseModel):
+    artists: List[str] = Field(..., min_length=1, max_length=500)
+    # Either one comparison list for every artist, or artist -> list
+    comparison_sets: Optional[Union[List[str], Dict[str, List[str]]]] = None
+
+    @field_validator("artists")
+    @classmethod
+    def artist_names_are_safe(cls, artists):
+        for artist in artists:
+            check_artist_name(artist)
+        return artists
+
+@app.get("/generate_report")
+async def get_report(refresh: bool = False):
+    if reports.enabled and not refresh:
+        # Answer with the precomputed copy; a stale one is refreshed in the background
+        report, _, generated_at = reports.get()
+        if report is not None:
+            return {
+                "status": "success",
+                "message": "✅ Weekly Genre Pulse Report Available",
+                "report_path": WEEKLY_REPORT_PATH,
+                "generated_at": datetime.fromtimestamp(generated_at, timezone.utc).isoformat(),
+                "age_seconds": int(time.time() - generated_at)
+            }
+    try:
+        result = await coalesced(WEEKLY_REPORT_KEY, run_weekly_report)
         return {
             "status": "success",
             "message": "✅ Weekly Genre Pulse Report Generated",
-            "report_path": "./reports/weekly_genre_pulse.md"
+            "report_path": result["report_path"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/download_report")
-async def download_report():
-    report_path = "./reports/weekly_genre_pulse.md"
-    if not os.path.exists(report_path):
+def download_report(request: Request, format: str = "markdown", artist: Optional[str] = None):
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(FORMATS)}")
+    try:
+        report_path = report_path_for(artist)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if artist is not None and not within_reports_directory(report_path):
+        raise HTTPException(status_code=404, detail="Report not found")
+    # Served from memory without waiting on any refresh it starts
+    report, digest, generated_at = reports.get(artist)
+    if report is None:
+        # Reports written before structured output only exist as markdown
+        if format == "markdown" and os.path.exists(report_path):
+            return FileResponse(report_path, media_type="text/markdown", filename=os.path.basename(report_path))
+        if artist is None and reports.enabled:
+            raise HTTPException(status_code=503, detail="Report is being generated", headers={"Retry-After": "30"})
         raise HTTPException(status_code=404, detail="Report not found")
-    return FileResponse(
-        report_path,
-        media_type="text/markdown",
-        filename="weekly_genre_pulse.md"
+
+    etag = report_etag(digest, format)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", **age_headers(generated_at)}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    filename = os.path.splitext(os.path.basename(report_path))[0] + FORMATS[format]["extension"]
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    # No Content-Length, so the rendered chunks go out with chunked transfer
+    return StreamingResponse(
+        get_renderer().render(report, format),
+        media_type=FORMATS[format]["media_type"],
+        headers=headers
     )
 
 @app.get("/analyze_artist/{artist_name}")
 async def analyze_artist(artist_name: str):
+    valid_artist_name(artist_name)
     try:
-        # Collect data for the specific artist
-        data = collector.collect_all_data()
-
-        # Process and analyze the data
-        analyzer.process_api_data(
-            data["spotify"],
-            data["youtube"],
-            data["lastfm"]
-        )
-
-        # Generate artist-specific report
-        report_path = f"./reports/{artist_name.lower().replace(' ', '_')}_analysis.md"
-        analyzer.save_report(filename=report_path)
-
+        result = await coalesced(artist_key(artist_name), run_artist_report, artist_name)
+        reports.touch(artist_name)
         return {
             "status": "success",
             "message": f"✅ {artist_name} Analysis Report Generated",
-            "report_path": report_path
+            "report_path": result["report_path"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/analyze_artists")
+async def analyze_artists(request: BatchAnalysisRequest):
+    try:
+        result = await coalesced(
+            batch_key(request.artists, request.comparison_sets),
+            run_batch_reports,
+            request.artists,
+            request.comparison_sets
+        )
+        for artist_name in result["reports"]:
+            reports.touch(artist_name)
+        return {
+            "status": "success",
+            "message": f"✅ {len(result['reports'])} Artist Analysis Reports Generated",
+            **result
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Async job API: submit returns immediately with a job id, then poll /jobs/{id}
+
+def submit_job(kind, fn, *args):
+    try:
+        job = jobs.submit(kind, fn, *args)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=f"Too many pending jobs: {e}")
+    return {
+        "status": job["status"],
+        "job_id": job["job_id"],
+        "status_url": f"/jobs/{job['job_id']}"
+    }
+
+@app.post("/jobs/generate_report", status_code=202)
+async def submit_report_job():
+    return submit_job("generate_report", build_weekly_report)
+
+@app.post("/jobs/analyze_artist/{artist_name}", status_code=202)
+async def submit_artist_job(artist_name: str):
+    valid_artist_name(artist_name)
+    return submit_job("analyze_artist", build_artist_report, artist_name)
+
+@app.post("/jobs/analyze_artists", status_code=202)
+async def submit_batch_job(request: BatchAnalysisRequest):
+    return submit_job("analyze_artists", build_batch_reports, request.artists, request.comparison_sets)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/cache/stats")
+def cache_stats():
+    return get_collector().cache.stats()
+
 @app.get("/health")
 def health_check():
+    collector = get_collector()
     return {
         "status": "✅ API is running",
         "data_directory_exists": os.path.exists('./data'),
         "report_directory_exists": os.path.exists('./reports'),
         "services": {
-            "spotify": collector.get_spotify_token() is not None,
+            "spotify": collector.token_manager.status()["configured"],
             "youtube": YOUTUBE_API_KEY is not None,
             "lastfm": LASTFM_API_KEY is not None
-        }
+        },
+        # Cached token state only; the health probe never calls Spotify
+        "spotify_token": collector.token_manager.status(),
+        "coalescing": coalescer.stats(),
+        "precomputed_reports": reports.stats()
     }
 
 if __name__ == "__main__":
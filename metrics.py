@@ -0,0 +1,95 @@
+import os
+import re
+import time
+import functools
+from urllib.parse import urlparse
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Under uvicorn --workers N each worker is its own process. With
+# PROMETHEUS_MULTIPROC_DIR set, every worker writes its samples to that
+# directory and /metrics aggregates all of them, whichever worker answers.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REQUEST_LATENCY = Histogram(
+    "genre_pulse_http_request_duration_seconds",
+    "FastAPI request latency by route",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+UPSTREAM_LATENCY = Histogram(
+    "genre_pulse_upstream_request_duration_seconds",
+    "Provider API call latency, including retries",
+    ["provider", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CACHE_LOOKUPS = Counter(
+    "genre_pulse_cache_lookups_total",
+    "Cache lookups by cache and result; hit ratio = hit / (hit + miss)",
+    ["cache", "result"],
+)
+
+STAGE_DURATION = Histogram(
+    "genre_pulse_stage_duration_seconds",
+    "Pipeline stage duration",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SPOTIFY_ID = re.compile(r"/(artists|tracks|albums)/[^/]+")
+
+
+def endpoint_label(url, params=None):
+    # Bounded-cardinality endpoint name: ids are templated out and Last.fm,
+    # which serves every method from one URL, is labelled by method.
+    parsed = urlparse(url)
+    if params and "method" in params:
+        return params["method"]
+    return SPOTIFY_ID.sub(lambda m: f"/{m.group(1)}/{{id}}", parsed.path)
+
+
+def observe_upstream(provider, url, params, status, seconds):
+    UPSTREAM_LATENCY.labels(provider, endpoint_label(url, params), str(status)).observe(seconds)
+
+
+def record_cache_lookup(cache, hit, count=1):
+    if count:
+        CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc(count)
+
+
+def timed_stage(stage):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_DURATION.labels(stage).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def render_latest():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead():
+    # Lets the multiprocess collector drop this worker's live gauges
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
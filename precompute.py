@@ -0,0 +1,160 @@
+import os
+import time
+import logging
+import threading
+import functools
+from collections import OrderedDict
+
+from reporting import report_data_path
+from services import get_renderer
+from config import PRECOMPUTE_REPORTS, REPORT_REFRESH_SECONDS, REPORT_STALE_SECONDS, REPORT_HOT_ARTISTS
+
+
+class PrecomputedReports:
+    # Stale-while-revalidate serving of stored reports:
+    #   - get() answers from the in-memory copy (the renderer re-reads the
+    #     file only after a run has replaced it) together with its
+    #     generation time, so a read never waits on collection or forecasting;
+    #   - a copy older than stale_seconds also starts a background refresh;
+    #   - the scheduler thread regenerates the weekly report and the
+    #     hot_artists most recently requested artist reports once they are
+    #     refresh_seconds old.
+    # Generation time is the stored file's mtime, so every worker sees the
+    # same age and a report one worker refreshed is not redone by the rest.
+    # refresh_weekly() and refresh_artists(artists) start the runs and
+    # return Futures; main.py routes them through the request coalescer.
+
+    def __init__(self, path_for, refresh_weekly, refresh_artists, enabled=PRECOMPUTE_REPORTS,
+                 refresh_seconds=REPORT_REFRESH_SECONDS, stale_seconds=REPORT_STALE_SECONDS,
+                 hot_artists=REPORT_HOT_ARTISTS):
+        self.path_for = path_for
+        self.refresh_weekly = refresh_weekly
+        self.refresh_artists = refresh_artists
+        self.enabled = enabled
+        self.refresh_seconds = refresh_seconds
+        self.stale_seconds = stale_seconds
+        self.hot_artists = hot_artists
+        self.poll_seconds = min(60.0, refresh_seconds)
+        self._hot = OrderedDict()
+        self._refreshing = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._counts = {"served": 0, "stale": 0, "refreshes": 0, "failures": 0}
+
+    def get(self, artist=None):
+        # (report, digest, generated_at) for the weekly report (artist None)
+        # or an artist report; report is None when nothing is stored yet
+        path = self.path_for(artist)
+        report, digest = get_renderer().load(report_data_path(path))
+        if report is None:
+            # Only the weekly report is generated on a read; artist reports
+            # are created by /analyze_artist
+            if artist is None and self.enabled:
+                self.refresh()
+            return None, None, None
+
+        generated_at = self.generated_at(artist)
+        stale = generated_at is None or time.time() - generated_at > self.stale_seconds
+        with self._lock:
+            self._counts["served"] += 1
+            if stale:
+                self._counts["stale"] += 1
+        if artist is not None:
+            self.touch(artist)
+        if stale and self.enabled:
+            self.refresh(None if artist is None else [artist])
+        return report, digest, generated_at
+
+    def generated_at(self, artist=None):
+        try:
+            return os.path.getmtime(report_data_path(self.path_for(artist)))
+        except OSError:
+            return None
+
+    def touch(self, artist):
+        # Marks an artist report as hot, evicting the least recently requested
+        with self._lock:
+            self._hot[self.path_for(artist)] = artist
+            self._hot.move_to_end(self.path_for(artist))
+            while len(self._hot) > self.hot_artists:
+                self._hot.popitem(last=False)
+
+    def refresh(self, artists=None):
+        # One background run for the weekly report (artists None) or one
+        # batch for the given artists, skipping reports already refreshing
+        if artists is None:
+            targets = {self.path_for(None): None}
+        else:
+            targets = {self.path_for(artist): artist for artist in artists}
+        with self._lock:
+            targets = {path: artist for path, artist in targets.items() if path not in self._refreshing}
+            if not targets:
+                return None
+            if artists is None:
+                future = self.refresh_weekly()
+            else:
+                future = self.refresh_artists(list(targets.values()))
+            self._refreshing.update(dict.fromkeys(targets, future))
+            self._counts["refreshes"] += 1
+        future.add_done_callback(functools.partial(self._refreshed, list(targets)))
+        return future
+
+    def refresh_due(self):
+        # Regenerates every tracked report at least refresh_seconds old
+        now = time.time()
+
+        def due(artist):
+            generated_at = self.generated_at(artist)
+            return generated_at is None or now - generated_at >= self.refresh_seconds
+
+        if due(None):
+            self.refresh()
+        with self._lock:
+            hot = list(self._hot.values())
+        artists = [artist for artist in hot if due(artist)]
+        if artists:
+            self.refresh(artists)
+
+    def start(self):
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="report-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counts,
+                "enabled": self.enabled,
+                "refreshing": len(self._refreshing),
+                "hot_artists": list(self._hot.values()),
+                "stale_seconds": self.stale_seconds,
+                "refresh_seconds": self.refresh_seconds,
+            }
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh_due()
+            except Exception as e:
+                logging.error(f"Scheduled report refresh failed: {e}")
+            if self._stop.wait(self.poll_seconds):
+                return
+
+    def _refreshed(self, paths, future):
+        error = future.exception()
+        with self._lock:
+            for path in paths:
+                self._refreshing.pop(path, None)
+            if error is not None:
+                self._counts["failures"] += 1
+        if error is not None:
+            logging.error(f"Background report refresh failed: {error}")
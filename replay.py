@@ -0,0 +1,329 @@
+import os
+import json
+import random
+import socket
+import asyncio
+import hashlib
+import logging
+import threading
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+from cache import make_cache_key
+
+GENRE_POOL = [
+    "pop", "dance pop", "indie pop", "synthpop", "electropop", "art pop", "k-pop", "hyperpop",
+    "rock", "indie rock", "alternative rock", "modern rock", "pop rock", "garage rock", "post-punk",
+    "hip hop", "trap", "rap", "drill", "lo-fi hip hop", "r&b", "neo soul", "soul", "funk",
+    "edm", "house", "deep house", "techno", "trance", "drum and bass", "dubstep", "ambient",
+    "synthwave", "electronic", "downtempo", "jazz", "jazz fusion", "afrobeat", "afrobeats", "amapiano",
+    "reggaeton", "latin pop", "country", "folk", "indie folk", "americana", "metal", "metalcore",
+    "classical", "soundtrack", "singer-songwriter", "britpop", "shoegaze", "dream pop", "emo", "grunge",
+]
+
+
+def synthetic_roster(n, seed=0):
+    # Deterministic, unique artist names for benchmarks
+    rng = random.Random(seed)
+    syllables = ["no", "va", "lu", "mi", "ra", "so", "ke", "zen", "ta", "ri", "el", "on", "ix", "ae"]
+    names = []
+    for i in range(n):
+        word = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).title()
+        names.append(f"{word} {i:05d}")
+    return names
+
+
+def fixture_path(directory, provider, url, params):
+    key = make_cache_key(url, params).rsplit(":", 1)[-1]
+    return os.path.join(directory, provider, f"{key}.json")
+
+
+class FixtureRecorder:
+    # Attach as GenreDataCollector.recorder during a live run; every
+    # successful provider response is saved where ReplayServer looks it up.
+    # Credentials never reach the file names (make_cache_key drops them).
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def record(self, provider, url, params, data):
+        path = fixture_path(self.directory, provider, url, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(data, f)
+        with self._lock:
+            self.recorded += 1
+
+
+def _seed(*parts):
+    return int(hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()[:16], 16)
+
+
+def _artist_id(name):
+    # Stateless: the id carries the name, so top-tracks and /artists?ids=
+    # need no lookup table
+    return name.encode().hex()
+
+
+def _artist_name(artist_id):
+    try:
+        return bytes.fromhex(artist_id).decode()
+    except ValueError:
+        return artist_id
+
+
+def synthetic_artist(name):
+    rng = random.Random(_seed("artist", name))
+    return {
+        "id": _artist_id(name),
+        "name": name,
+        "popularity": rng.randint(5, 95),
+        "followers": {"total": int(10 ** rng.uniform(3, 7.5))},
+        "genres": rng.sample(GENRE_POOL, rng.randint(1, 4)),
+        "type": "artist",
+    }
+
+
+def catalogue_size(kind, query):
+    # How many tracks/videos a query pages through, 100 to 499
+    return 100 + _seed("catalogue", kind, query) % 400
+
+
+def synthetic_track(name, i):
+    rng = random.Random(_seed("track", name, i))
+    return {
+        "id": f"{_artist_id(name)}t{i}",
+        "name": f"{name} Track {i + 1}",
+        "popularity": rng.randint(5, 95),
+        "duration_ms": rng.randint(120_000, 330_000),
+        "explicit": rng.random() < 0.2,
+        "artists": [{"id": _artist_id(name), "name": name}],
+        "album": {"id": f"{_artist_id(name)}a{i // 3}", "name": f"{name} Album {i // 3 + 1}",
+                  "release_date": f"20{rng.randint(10, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"},
+    }
+
+
+def synthetic_top_tracks(name, count=10):
+    return {"tracks": [synthetic_track(name, i) for i in range(count)]}
+
+
+def synthetic_track_search(query, offset=0, limit=20):
+    # One page of a Spotify track search, with the `next` URL of the real API
+    total = catalogue_size("tracks", query)
+    next_url = None
+    if offset + limit < total:
+        next_url = f"https://api.spotify.com/v1/search?{urlencode({'q': query, 'type': 'track', 'limit': limit, 'offset': offset + limit})}"
+    return {"tracks": {
+        "items": [synthetic_track(query, i) for i in range(offset, min(offset + limit, total))],
+        "total": total, "offset": offset, "limit": limit, "next": next_url,
+    }}
+
+
+def synthetic_video(query, i):
+    rng = random.Random(_seed("video", query, i))
+    return {
+        "id": {"videoId": hashlib.sha1(f"{query}{i}".encode()).hexdigest()[:11]},
+        "snippet": {
+            "channelId": f"UC{_seed('channel', query) % 10 ** 12}",
+            "channelTitle": query,
+            "title": f"{query} - {rng.choice(['Official Video', 'Live', 'Lyric Video', 'Session'])} {i + 1}",
+            "publishedAt": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+        },
+    }
+
+
+def synthetic_videos(query, count=10, page_token=None):
+    # Page tokens are opaque to clients; here they encode the offset
+    offset = int(page_token[1:]) if page_token and page_token.startswith("p") else 0
+    total = catalogue_size("videos", query)
+    page = {"items": [synthetic_video(query, i) for i in range(offset, min(offset + count, total))],
+            "pageInfo": {"totalResults": total, "resultsPerPage": count}}
+    if offset + count < total:
+        page["nextPageToken"] = f"p{offset + count}"
+    return page
+
+
+def synthetic_lastfm_top_tracks(name, page=1, limit=50):
+    total = catalogue_size("lastfm", name)
+    pages = -(-total // limit)
+    start = (page - 1) * limit
+    tracks = []
+    for i in range(start, min(start + limit, total)):
+        rng = random.Random(_seed("lastfm-track", name, i))
+        listeners = int(10 ** rng.uniform(2, 6))
+        tracks.append({
+            "name": f"{name} Track {i + 1}",
+            "mbid": hashlib.md5(f"{name}{i}".encode()).hexdigest(),
+            "listeners": str(listeners),
+            "playcount": str(listeners * rng.randint(2, 40)),
+            "artist": {"name": name, "mbid": hashlib.md5(name.encode()).hexdigest()},
+            "@attr": {"rank": str(i + 1)},
+        })
+    return {"toptracks": {"track": tracks, "@attr": {
+        "artist": name, "page": str(page), "perPage": str(limit), "totalPages": str(pages), "total": str(total),
+    }}}
+
+
+def synthetic_lastfm(name):
+    rng = random.Random(_seed("lastfm", name))
+    listeners = int(10 ** rng.uniform(3, 7))
+    genres = synthetic_artist(name)["genres"]
+    return {"artist": {
+        "name": name,
+        "mbid": hashlib.md5(name.encode()).hexdigest(),
+        "stats": {"listeners": str(listeners), "playcount": str(listeners * rng.randint(5, 80))},
+        "tags": {"tag": [{"name": g} for g in genres + rng.sample(GENRE_POOL, 1)]},
+    }}
+
+
+class ReplayServer:
+    # Local stand-in for the Spotify, YouTube and Last.fm endpoints the
+    # collector calls. Responses come from recorded fixtures when present
+    # (fixtures_dir/<provider>/<cache key>.json), otherwise from deterministic
+    # synthetic payloads. latency/jitter (seconds) delay every response, and
+    # error_rate injects 500s and 429s (with Retry-After) from a seeded RNG.
+    # Track and video searches and Last.fm top tracks page through a
+    # deterministic catalogue per query, with each provider's own cursor.
+    #
+    # Runs its own event loop on a background thread:
+    #     with ReplayServer(latency=0.01) as server:
+    #         collector = GenreDataCollector(http=PooledHttpClient(replay_base=server.url))
+
+    def __init__(self, fixtures_dir=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, host="127.0.0.1"):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.host = host
+        self._rng = random.Random(seed)
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self.url = None
+        self.counts = {"requests": 0, "errors": 0, "fixtures": 0}
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/accounts.spotify.com/api/token", self._token)
+        app.router.add_get("/api.spotify.com/v1/search", self._spotify_search)
+        app.router.add_get("/api.spotify.com/v1/artists", self._spotify_artists)
+        app.router.add_get("/api.spotify.com/v1/artists/{artist_id}/top-tracks", self._spotify_top_tracks)
+        app.router.add_get("/www.googleapis.com/youtube/v3/search", self._youtube_search)
+        app.router.add_get("/ws.audioscrobbler.com/2.0/", self._lastfm)
+        return app
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind((self.host, 0))
+        self.url = f"http://{self.host}:{sock.getsockname()[1]}"
+        started = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self.app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            self._loop.run_until_complete(web.SockSite(self._runner, sock).start())
+            started.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="replay-server", daemon=True)
+        self._thread.start()
+        started.wait(timeout=10)
+        logging.info(f"Replay server listening on {self.url}")
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._loop.close()
+        self._loop = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    async def _respond(self, request, provider, real_url, synthesize):
+        self.counts["requests"] += 1
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.counts["errors"] += 1
+            if self._rng.random() < 0.5:
+                return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "0"})
+            return web.json_response({"error": "injected failure"}, status=500)
+
+        params = dict(request.query)
+        if self.fixtures_dir:
+            path = fixture_path(self.fixtures_dir, provider, real_url, params)
+            if os.path.exists(path):
+                self.counts["fixtures"] += 1
+                with open(path) as f:
+                    return web.json_response(json.load(f))
+        return web.json_response(synthesize(params))
+
+    async def _token(self, request):
+        return web.json_response({"access_token": "replay-token", "token_type": "Bearer", "expires_in": 3600})
+
+    async def _spotify_search(self, request):
+        def search(params):
+            if params.get("type") == "track":
+                return synthetic_track_search(params.get("q", ""), int(params.get("offset", 0)), int(params.get("limit", 20)))
+            return {"artists": {"items": [synthetic_artist(params.get("q", ""))]}}
+
+        return await self._respond(request, "spotify", "https://api.spotify.com/v1/search", search)
+
+    async def _spotify_artists(self, request):
+        return await self._respond(
+            request, "spotify", "https://api.spotify.com/v1/artists",
+            lambda params: {"artists": [
+                synthetic_artist(_artist_name(artist_id))
+                for artist_id in params.get("ids", "").split(",") if artist_id
+            ]}
+        )
+
+    async def _spotify_top_tracks(self, request):
+        artist_id = request.match_info["artist_id"]
+        return await self._respond(
+            request, "spotify", f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks",
+            lambda params: synthetic_top_tracks(_artist_name(artist_id))
+        )
+
+    async def _youtube_search(self, request):
+        return await self._respond(
+            request, "youtube", "https://www.googleapis.com/youtube/v3/search",
+            lambda params: synthetic_videos(params.get("q", ""), int(params.get("maxResults", 5)), params.get("pageToken"))
+        )
+
+    async def _lastfm(self, request):
+        def method(params):
+            if params.get("method") == "artist.getTopTracks":
+                return synthetic_lastfm_top_tracks(params.get("artist", ""), int(params.get("page", 1)), int(params.get("limit", 50)))
+            return synthetic_lastfm(params.get("artist", ""))
+
+        return await self._respond(request, "lastfm", "http://ws.audioscrobbler.com/2.0/", method)
+
+
+def replay_collector(replay_base, data_directory="./data", rate_limits=None, cache=None):
+    # A GenreDataCollector wired to the stand-in, with dummy credentials and
+    # (by default) no client-side rate limits or shared cache tier
+    from cache import ResponseCache
+    from http_client import PooledHttpClient
+    from spotify_auth import SpotifyTokenManager, SPOTIFY_AUTH_URL
+    from data_collector import GenreDataCollector, retry_policy
+
+    http = PooledHttpClient(rate_limits=rate_limits, replay_base=replay_base)
+    collector = GenreDataCollector(data_directory, cache=cache or ResponseCache(), http=http)
+    collector.token_manager = SpotifyTokenManager(
+        http, client_id="replay", client_secret="replay", policy=retry_policy(SPOTIFY_AUTH_URL)
+    )
+    return collector
@@ -0,0 +1,187 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from jinja2 import Environment
+
+from metrics import record_cache_lookup
+from storage import atomic_write
+from config import REPORT_RENDER_CACHE_ENTRIES
+
+# Bump when a template changes so cached sections and ETags turn over
+TEMPLATE_VERSION = "1"
+
+# A report is {"title": str, "sections": [section, ...]} where a section is
+# {"heading": str, "level": int, "paragraphs": [str], "bullets": [bullet]}
+# and a bullet is either a string or {"text": str, "bullets": [str]}.
+
+MARKDOWN_SECTION = """\
+{{ "#" * section.level }} {{ section.heading }}
+{% for paragraph in section.paragraphs %}
+{{ paragraph }}
+{% if not loop.last %}
+
+{% endif %}
+{% endfor %}
+{% for bullet in section.bullets %}
+{% if bullet is mapping %}
+- {{ bullet.text }}
+{% for child in bullet.bullets %}
+  - {{ child }}
+{% endfor %}
+{% else %}
+- {{ bullet }}
+{% endif %}
+{% endfor %}
+
+"""
+
+HTML_SECTION = """\
+<h{{ section.level }}>{{ section.heading }}</h{{ section.level }}>
+{% for paragraph in section.paragraphs %}
+<p>{{ paragraph }}</p>
+{% endfor %}
+{% if section.bullets %}
+<ul>
+{% for bullet in section.bullets %}
+{% if bullet is mapping %}
+<li>{{ bullet.text }}<ul>{% for child in bullet.bullets %}<li>{{ child }}</li>{% endfor %}</ul></li>
+{% else %}
+<li>{{ bullet }}</li>
+{% endif %}
+{% endfor %}
+</ul>
+{% endif %}
+"""
+
+HTML_HEADER = """\
+<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{{ title }}</title></head>
+<body>
+<h1>{{ title }}</h1>
+"""
+
+# Compiled once at import; rendering only evaluates them
+_markdown = Environment(trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True)
+_html = Environment(trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True, autoescape=True)
+
+TEMPLATES = {
+    "markdown": {
+        "header": _markdown.from_string("# {{ title }}\n\n"),
+        "section": _markdown.from_string(MARKDOWN_SECTION),
+        "footer": None,
+    },
+    "html": {
+        "header": _html.from_string(HTML_HEADER),
+        "section": _html.from_string(HTML_SECTION),
+        "footer": _html.from_string("</body>\n</html>\n"),
+    },
+}
+
+FORMATS = {
+    "markdown": {"media_type": "text/markdown; charset=utf-8", "extension": ".md"},
+    "html": {"media_type": "text/html; charset=utf-8", "extension": ".html"},
+    "json": {"media_type": "application/json", "extension": ".json"},
+}
+
+
+def report_data_path(report_path):
+    # Structured report stored next to its markdown copy
+    return os.path.splitext(report_path)[0] + ".json"
+
+
+def section(heading, level=2, paragraphs=None, bullets=None):
+    return {"heading": heading, "level": level, "paragraphs": paragraphs or [], "bullets": bullets or []}
+
+
+def content_hash(value):
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(f"{TEMPLATE_VERSION}:{payload}".encode()).hexdigest()
+
+
+def report_etag(digest, fmt):
+    return f'"{digest[:32]}-{fmt}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ReportRenderer:
+    # Renders a report section by section as a stream of text chunks.
+    # Rendered sections are kept in an LRU keyed by format + section content
+    # hash, so sections shared by many reports (the weekly genre sections of
+    # a batch of artist reports) are rendered once.
+
+    def __init__(self, max_entries=REPORT_RENDER_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._sections = OrderedDict()
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def load(self, path):
+        # Stored report and its content hash, re-read only when the file changes
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, None
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._loaded.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+        digest = content_hash(report)
+        self._loaded[path] = (version, report, digest)
+        return report, digest
+
+    def render(self, report, fmt="markdown"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported report format: {fmt}")
+        if fmt == "json":
+            yield from self._render_json(report)
+            return
+        templates = TEMPLATES[fmt]
+        yield templates["header"].render(title=report["title"])
+        for item in report["sections"]:
+            yield self._render_section(fmt, item)
+        if templates["footer"] is not None:
+            yield templates["footer"].render()
+
+    def render_to_file(self, report, path, fmt="markdown"):
+        # Published atomically; readers never see a partially written report
+        with atomic_write(path) as f:
+            for chunk in self.render(report, fmt):
+                f.write(chunk)
+
+    def _render_json(self, report):
+        yield f'{{"title": {json.dumps(report["title"], ensure_ascii=False)}, "sections": ['
+        for i, item in enumerate(report["sections"]):
+            yield ("" if i == 0 else ", ") + self._render_section("json", item)
+        yield "]}\n"
+
+    def _render_section(self, fmt, item):
+        key = (fmt, content_hash(item))
+        with self._lock:
+            rendered = self._sections.get(key)
+            if rendered is not None:
+                self._sections.move_to_end(key)
+        record_cache_lookup("report_section", rendered is not None)
+        if rendered is not None:
+            return rendered
+
+        if fmt == "json":
+            rendered = json.dumps(item, ensure_ascii=False)
+        else:
+            rendered = TEMPLATES[fmt]["section"].render(section=item)
+        with self._lock:
+            self._sections[key] = rendered
+            while len(self._sections) > self.max_entries:
+                self._sections.popitem(last=False)
+        return rendered
@@ -0,0 +1,72 @@
+import time
+import logging
+import threading
+
+# Pipeline singletons shared by main.py and automation.py. They are built on
+# first use instead of at import, so importing the app (and answering
+# /health) loads neither pandas nor statsforecast and creates no data
+# directories. warm_up() builds them ahead of the first request.
+
+_instances = {}
+_lock = threading.RLock()
+
+
+def _get(name, factory):
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def provide(name, instance):
+    # Replace a singleton, e.g. with a replay-backed collector in benchmarks
+    with _lock:
+        _instances[name] = instance
+
+
+def built(name):
+    return name in _instances
+
+
+def get_renderer():
+    from reporting import ReportRenderer
+    return _get("renderer", ReportRenderer)
+
+
+def get_collector():
+    from data_collector import GenreDataCollector
+    return _get("collector", GenreDataCollector)
+
+
+def get_analyzer():
+    from genre_analysis import GenrePulseAnalyzer
+    # Shares the renderer so /download_report hits sections cached by save_report
+    return _get("analyzer", lambda: GenrePulseAnalyzer(renderer=get_renderer()))
+
+
+def warm_up(forecasting=True):
+    # Build the singletons and, optionally, run one tiny fit per forecasting
+    # model tier so the first real analyze_trends call skips the one-off
+    # import and kernel compilation cost
+    started = time.perf_counter()
+    try:
+        get_collector()
+        get_analyzer()
+        if forecasting:
+            from forecasting import warm_up_models
+            warm_up_models()
+    except Exception as e:
+        logging.error(f"Warm-up failed: {e}")
+        return None
+    elapsed = time.perf_counter() - started
+    logging.info(f"Warm-up finished in {elapsed:.2f}s")
+    return elapsed
+
+
+def start_warm_up(forecasting=True):
+    thread = threading.Thread(target=warm_up, kwargs={"forecasting": forecasting}, name="warm-up", daemon=True)
+    thread.start()
+    return thread
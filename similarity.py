@@ -0,0 +1,185 @@
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+NUMERIC_FEATURES = [
+    "log_followers",
+    "popularity",
+    "log_listeners",
+    "track_popularity",
+    "duration_min",
+    "explicit_share",
+]
+
+# Relative weight of the numeric block against the genre/tag block
+NUMERIC_WEIGHT = 0.5
+
+# Index sizes at which the SVD + tree index pays off over a brute-force scan
+ANN_MIN_ARTISTS = 256
+ANN_COMPONENTS = 32
+
+
+def build_artist_profiles(tables):
+    # One row per artist from normalized tables (data_store.normalize_payloads
+    # or ParquetStore reads): merged Spotify genres + Last.fm tags, audience
+    # size and top-track statistics. Keyed by the requested artist name.
+    artists = tables.get("artists", pd.DataFrame())
+    stats = tables.get("listener_stats", pd.DataFrame())
+    tracks = tables.get("tracks", pd.DataFrame())
+    frames = []
+
+    if not artists.empty:
+        # Latest run per query; within it the first row is the top search match
+        latest_run = artists["collected_at"] == artists.groupby("query")["collected_at"].transform("max")
+        latest = artists[latest_run].groupby("query").first()
+        frames.append(pd.DataFrame({
+            "spotify_genres": latest["genres"].map(lambda g: list(g) if g is not None else []),
+            "popularity": latest["popularity"].astype(float),
+            "log_followers": np.log1p(latest["followers"].astype(float)),
+        }))
+    if not stats.empty:
+        latest = stats.sort_values("collected_at").groupby("query").last()
+        frames.append(pd.DataFrame({
+            "lastfm_tags": latest["tags"].map(lambda t: list(t) if t is not None else []),
+            "log_listeners": np.log1p(latest["listeners"].astype(float)),
+        }))
+    if not tracks.empty:
+        latest_run = tracks["collected_at"] == tracks.groupby("query")["collected_at"].transform("max")
+        by_query = tracks[latest_run].groupby("query")
+        frames.append(pd.DataFrame({
+            "track_popularity": by_query["popularity"].mean().astype(float),
+            "duration_min": by_query["duration_ms"].mean().astype(float) / 60000,
+            "explicit_share": by_query["explicit"].mean().astype(float),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=["tags", *NUMERIC_FEATURES])
+    profiles = pd.concat(frames, axis=1)
+    empty = pd.Series([[]] * len(profiles), index=profiles.index)
+    genres = profiles.get("spotify_genres", empty).map(lambda g: g if isinstance(g, list) else [])
+    tags = profiles.get("lastfm_tags", empty).map(lambda t: t if isinstance(t, list) else [])
+    profiles["tags"] = [sorted({x.lower() for x in g + t}) for g, t in zip(genres, tags)]
+    for column in NUMERIC_FEATURES:
+        if column not in profiles:
+            profiles[column] = np.nan
+    profiles.index.name = "artist"
+    return profiles[["tags", *NUMERIC_FEATURES]]
+
+
+class SimilarityEngine:
+    # Feature matrix per artist: binary genre/tag block plus standardized
+    # numeric block, rows L2-normalized so cosine similarity for every pair
+    # is a single matrix product. Audience overlap is the Jaccard index of
+    # the (audience-applied) tag sets, also computed for all pairs at once.
+
+    def __init__(self, n_components=ANN_COMPONENTS, ann_min_artists=ANN_MIN_ARTISTS):
+        self.n_components = n_components
+        self.ann_min_artists = ann_min_artists
+        self.names = []
+        self.index = None
+
+    def fit(self, profiles):
+        self.names = list(profiles.index)
+        self.positions = {name.casefold(): i for i, name in enumerate(self.names)}
+
+        vocabulary = sorted({tag for tags in profiles["tags"] for tag in tags})
+        self.vocabulary = vocabulary
+        column = {tag: j for j, tag in enumerate(vocabulary)}
+        tag_matrix = np.zeros((len(profiles), len(vocabulary)), dtype=np.float32)
+        for i, tags in enumerate(profiles["tags"]):
+            tag_matrix[i, [column[t] for t in tags]] = 1.0
+        self.tag_matrix = tag_matrix
+        self.tag_counts = tag_matrix.sum(axis=1)
+
+        numeric = profiles[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+        with warnings.catch_warnings():
+            # Columns no provider filled in are all-NaN; they standardize to 0
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mean = np.nanmean(numeric, axis=0) if len(numeric) else np.zeros(len(NUMERIC_FEATURES))
+            std = np.nanstd(numeric, axis=0) if len(numeric) else np.ones(len(NUMERIC_FEATURES))
+        mean = np.nan_to_num(mean)
+        std = np.where(np.nan_to_num(std) > 0, std, 1.0)
+        numeric = np.nan_to_num((numeric - mean) / std) * NUMERIC_WEIGHT
+
+        features = np.hstack([tag_matrix, numeric.astype(np.float32)])
+        norms = np.linalg.norm(features, axis=1, keepdims=True)
+        self.features = features / np.where(norms > 0, norms, 1.0)
+        self._build_index()
+        return self
+
+    def pairwise_similarity(self):
+        return self.features @ self.features.T
+
+    def pairwise_overlap(self):
+        shared = self.tag_matrix @ self.tag_matrix.T
+        union = self.tag_counts[:, None] + self.tag_counts[None, :] - shared
+        return np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+
+    def score(self, target, others):
+        # Exact similarity/overlap of target against a named comparison set
+        i = self._position(target)
+        rows = [self._position(name) for name in others]
+        known = [(name, j) for name, j in zip(others, rows) if j is not None]
+        if i is None or not known:
+            return pd.DataFrame(columns=["artist", "similarity", "audience_overlap", "shared_tags"])
+        idx = np.array([j for _, j in known])
+        return self._frame(i, idx, [name for name, _ in known])
+
+    def rank(self, target, k=10):
+        # Nearest artists to target across the whole index
+        i = self._position(target)
+        if i is None or len(self.names) < 2:
+            return pd.DataFrame(columns=["artist", "similarity", "audience_overlap", "shared_tags"])
+        k = min(k, len(self.names) - 1)
+        if self.index is not None:
+            # Over-fetch from the reduced-dimension index, then rerank exactly
+            n_candidates = min(len(self.names), max(4 * k, k + 1))
+            _, candidates = self.index.kneighbors(self.reduced[i:i + 1], n_neighbors=n_candidates)
+            candidates = candidates[0]
+        else:
+            candidates = np.arange(len(self.names))
+        candidates = candidates[candidates != i]
+        similarity = self.features[candidates] @ self.features[i]
+        top = candidates[np.argsort(-similarity, kind="stable")[:k]]
+        return self._frame(i, top, [self.names[j] for j in top])
+
+    def _frame(self, i, idx, names):
+        similarity = self.features[idx] @ self.features[i]
+        shared = self.tag_matrix[idx] @ self.tag_matrix[i]
+        union = self.tag_counts[idx] + self.tag_counts[i] - shared
+        overlap = np.divide(shared, union, out=np.zeros_like(shared), where=union > 0)
+        target_tags = self.tag_matrix[i] > 0
+        shared_tags = [
+            [self.vocabulary[t] for t in np.flatnonzero(target_tags & (self.tag_matrix[j] > 0))]
+            for j in idx
+        ]
+        return pd.DataFrame({
+            "artist": names,
+            "similarity": np.clip(similarity, 0, 1),
+            "audience_overlap": overlap,
+            "shared_tags": shared_tags,
+        })
+
+    def _position(self, name):
+        return self.positions.get(name.casefold())
+
+    def _build_index(self):
+        self.index = None
+        n, d = self.features.shape
+        if n < self.ann_min_artists:
+            return
+        # Project onto a few SVD components so the tree index stays
+        # effective, then search unit vectors with euclidean distance
+        # (monotone in cosine distance).
+        # scikit-learn is only loaded once a catalogue is big enough to need it
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.neighbors import NearestNeighbors
+
+        components = min(self.n_components, d - 1, n - 1)
+        reduced = TruncatedSVD(n_components=components, random_state=0).fit_transform(self.features)
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        self.reduced = reduced / np.where(norms > 0, norms, 1.0)
+        self.index = NearestNeighbors(algorithm="ball_tree").fit(self.reduced)
+        logging.info(f"Built similarity index over {n} artists ({components} components)")
@@ -0,0 +1,92 @@
+import time
+import logging
+import threading
+import requests
+
+from config import SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET, SPOTIFY_TOKEN_REFRESH_MARGIN
+
+SPOTIFY_AUTH_URL = "https://accounts.spotify.com/api/token"
+
+
+class SpotifyTokenManager:
+    # Client-credentials token with expiry tracking. Tokens are refreshed
+    # refresh_margin seconds before they lapse, and concurrent callers wait
+    # on the one in-flight refresh instead of each POSTing to Spotify.
+
+    def __init__(self, http, client_id=SPOTIFY_CLIENT_ID, client_secret=SPOTIFY_CLIENT_SECRET,
+                 refresh_margin=SPOTIFY_TOKEN_REFRESH_MARGIN, policy=None):
+        self.http = http
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.policy = policy
+        self.access_token = None
+        self.expires_at = 0.0
+        self.last_error = None
+        self._refresh_lock = threading.Lock()
+
+    def is_valid(self):
+        return self.access_token is not None and time.time() < self.expires_at - self.refresh_margin
+
+    def get_token(self):
+        if self.is_valid():
+            return self.access_token
+        with self._refresh_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self.is_valid():
+                return self.access_token
+            return self._refresh()
+
+    def handle_unauthorized(self, rejected_token):
+        # Called after a 401. Only the first caller holding the rejected
+        # token forces a refresh; the rest pick up the new one.
+        with self._refresh_lock:
+            if self.access_token is not None and self.access_token != rejected_token:
+                return self.access_token
+            self.access_token = None
+            self.expires_at = 0.0
+            return self._refresh()
+
+    def status(self):
+        # Cache-only view for health checks; never touches the network
+        remaining = self.expires_at - time.time() if self.access_token else 0
+        return {
+            "configured": bool(self.client_id and self.client_secret),
+            "has_token": self.access_token is not None,
+            "valid": self.is_valid(),
+            "expires_in": max(0, int(remaining)),
+            "last_error": self.last_error,
+        }
+
+    def _refresh(self):
+        auth_data = {
+            "grant_type": "client_credentials",
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+        }
+        try:
+            response = self.http.post(SPOTIFY_AUTH_URL, data=auth_data, policy=self.policy)
+        except requests.exceptions.RequestException as e:
+            self.last_error = str(e)
+            logging.error(f"Failed to get Spotify token: {e}")
+            return self._fallback()
+
+        if response.status_code != 200:
+            self.last_error = f"HTTP {response.status_code}"
+            logging.error(f"Failed to get Spotify token: HTTP {response.status_code}")
+            return self._fallback()
+
+        payload = response.json()
+        self.access_token = payload["access_token"]
+        self.expires_at = time.time() + int(payload.get("expires_in", 3600))
+        self.last_error = None
+        logging.info("Refreshed Spotify access token")
+        return self.access_token
+
+    def _fallback(self):
+        # A token inside its refresh margin is still accepted by Spotify, so
+        # keep serving it if the early refresh fails.
+        if self.access_token is not None and time.time() < self.expires_at:
+            return self.access_token
+        self.access_token = None
+        return None
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import hashlib
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import KEEP_VERSIONS, SINGLE_FLIGHT_TIMEOUT
+
+VERSIONS_DIRECTORY = ".versions"
+
+
+def version_directory(path):
+    # One subdirectory per published file, so pruning lists only its own versions
+    return os.path.join(os.path.dirname(path) or ".", VERSIONS_DIRECTORY, os.path.basename(path))
+
+
+def _publish(version_path, path):
+    # Readers only ever see the old file or the complete new one
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        os.link(version_path, tmp_path)
+    except OSError:
+        shutil.copyfile(version_path, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _prune(path, keep):
+    ext = os.path.splitext(path)[1]
+    directory = version_directory(path)
+    versions = sorted(f for f in os.listdir(directory) if f.endswith(ext))
+    for name in versions[:-keep] if keep else versions:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+@contextmanager
+def atomic_write(path, mode="w", keep_versions=KEEP_VERSIONS):
+    # Each write goes to its own file under <dir>/.versions/<name>/, named
+    # <stem>.<utc timestamp>-<id><ext>, and is published to `path` by an
+    # atomic rename once complete. The newest keep_versions are retained.
+    stem, ext = os.path.splitext(os.path.basename(path))
+    directory = version_directory(path)
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    version_path = os.path.join(directory, f"{stem}.{stamp}-{uuid.uuid4().hex[:8]}{ext}")
+    tmp_path = f"{version_path}.tmp"
+
+    encoding = None if "b" in mode else "utf-8"
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, version_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _publish(version_path, path)
+    _prune(path, keep_versions)
+
+
+class FileLock:
+    # Exclusive flock() on a lock file. Holds across processes (uvicorn
+    # workers) and across threads, since each acquire opens its own handle.
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self, blocking=True, timeout=None, poll_interval=0.05):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._fd = fd
+                return True
+            except BlockingIOError:
+                if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                    os.close(fd)
+                    return False
+                time.sleep(poll_interval)
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class SingleFlight:
+    # At most one run per key at a time across every worker. A caller that
+    # finds the key's lock held waits for it, then returns the result the
+    # holder published instead of running the same work again. If the holder
+    # failed there is no new result, and the waiter runs the work itself.
+
+    def __init__(self, directory="./data/locks", timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.directory = directory
+        self.timeout = timeout
+
+    def run(self, key, fn, *args, **kwargs):
+        # Created on first run, so building one (e.g. at app import) touches no disk
+        os.makedirs(self.directory, exist_ok=True)
+        name = hashlib.sha256(key.encode()).hexdigest()[:32]
+        lock = FileLock(os.path.join(self.directory, f"{name}.lock"))
+        result_path = os.path.join(self.directory, f"{name}.result.json")
+        seen = self._read(result_path)
+
+        if not lock.acquire(blocking=False):
+            logging.info(f"Joining in-flight run for {key}")
+            if not lock.acquire(timeout=self.timeout):
+                raise TimeoutError(f"Timed out waiting for in-flight run of {key}")
+            try:
+                latest = self._read(result_path)
+                if latest is not None and latest["run_id"] != (seen or {}).get("run_id"):
+                    return latest["result"]
+                return self._execute(key, result_path, fn, args, kwargs)
+            finally:
+                lock.release()
+
+        try:
+            return self._execute(key, result_path, fn, args, kwargs)
+        finally:
+            lock.release()
+
+    def _execute(self, key, result_path, fn, args, kwargs):
+        result = fn(*args, **kwargs)
+        record = {
+            "run_id": uuid.uuid4().hex,
+            "key": key,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "result": result,
+        }
+        tmp_path = f"{result_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp_path, result_path)
+        return result
+
+    def _read(self, result_path):
+        try:
+            with open(result_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
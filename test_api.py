@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+import pytest
+from pydantic import ValidationError
+from fastapi.testclient import TestClient
+import main
+from jobs import JobManager
+from coalesce import RequestCoalescer
+from storage import SingleFlight
+
+
+def test_report_job_does_not_block_health(tmp_path, monkeypatch):
+    # Job records and reports go to a scratch directory, not the checkout
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "jobs", JobManager(jobs_directory=str(tmp_path / "jobs")))
+    release = threading.Event()
+
+    def slow_report():
+        release.wait(timeout=5)
+        return {"report_path": main.WEEKLY_REPORT_PATH}
+
+    monkeypatch.setattr(main, "build_weekly_report", slow_report)
+
+    with TestClient(main.app) as client:
+        response = client.post("/jobs/generate_report")
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        # The job is still running, yet other routes answer immediately
+        assert client.get(f"/jobs/{job_id}").json()["status"] in ("queued", "running")
+        assert client.get("/download_report").status_code in (200, 404)
+
+        release.set()
+        for _ in range(50):
+            job = client.get(f"/jobs/{job_id}").json()
+            if job["status"] == "succeeded":
+                break
+            time.sleep(0.05)
+
+        assert job["status"] == "succeeded", "❌ Report job did not finish"
+        assert job["result"]["report_path"] == main.WEEKLY_REPORT_PATH
+        assert client.get("/jobs/doesnotexist").status_code == 404
+    print("✅ Job API successful.")
+
+
+def test_startup_defers_heavy_imports():
+    from benchmark import measure_startup
+
+    startup = measure_startup("main", health=True, repeats=1)
+    assert startup["heavy_modules"] == [], f"❌ Importing main loaded {startup['heavy_modules']}"
+
+
+def test_import_creates_no_data_directories(tmp_path):
+    env = {**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+    subprocess.run([sys.executable, "-c", "import main"], cwd=tmp_path, env=env, check=True)
+    assert list(tmp_path.iterdir()) == [], f"❌ Importing main created {[p.name for p in tmp_path.iterdir()]}"
+
+
+def test_artist_names_cannot_escape_reports_directory():
+    assert main.artist_report_path("Sigur Rós") == "./reports/sigur_ros_analysis.md"
+    assert main.artist_report_path("AC/DC") == "./reports/ac_dc_analysis.md"
+    assert main.artist_report_path("../../outside/pwned") == "./reports/outside_pwned_analysis.md"
+    assert main.artist_report_path("...And You Will Know Us by the Trail of Dead").startswith("./reports/and_you_will")
+
+    # Only empty names and NUL are refused
+    assert main.BatchAnalysisRequest(artists=["AC/DC"]).artists == ["AC/DC"]
+    with pytest.raises(ValidationError):
+        main.BatchAnalysisRequest(artists=["nova\0sound"])
+    assert TestClient(main.app).get("/analyze_artist/%20").status_code == 400
+
+
+def test_download_report_stays_inside_reports_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "pwned_analysis.md").write_text("secret")
+    (outside / "pwned_analysis.json").write_text('{"title": "secret", "sections": []}')
+    client = TestClient(main.app)
+
+    for format in ("markdown", "html"):
+        response = client.get("/download_report", params={"artist": "../outside/pwned", "format": format})
+        assert response.status_code == 404, f"❌ Read a {format} report outside ./reports"
+
+
+def test_sync_report_does_not_deadlock_behind_queued_jobs(tmp_path, monkeypatch):
+    # One job thread, busy; a report job queued behind it; then a synchronous
+    # /generate_report. Its leader must not queue behind the job that will
+    # end up waiting for it.
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "jobs", JobManager(jobs_directory=str(tmp_path / "jobs"), max_workers=1))
+    monkeypatch.setattr(main, "coalescer", RequestCoalescer(freshness_seconds=0, flights=SingleFlight(str(tmp_path / "locks"))))
+    monkeypatch.setattr(main, "run_weekly_report", lambda: (time.sleep(0.2), {"report_path": main.WEEKLY_REPORT_PATH})[1])
+    client = TestClient(main.app)
+
+    busy = threading.Event()
+    main.jobs.submit("busy", busy.wait, 5)
+    job_id = client.post("/jobs/generate_report").json()["job_id"]
+
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(client.get("/generate_report")), daemon=True)
+    request.start()
+    time.sleep(0.05)
+    busy.set()
+    request.join(timeout=5)
+
+    assert responses and responses[0].status_code == 200, "❌ /generate_report deadlocked behind the job pool"
+    for _ in range(100):
+        if client.get(f"/jobs/{job_id}").json()["status"] == "succeeded":
+            break
+        time.sleep(0.05)
+    assert client.get(f"/jobs/{job_id}").json()["status"] == "succeeded", "❌ Queued report job never finished"
@@ -0,0 +1,78 @@
+import os
+import pytest
+import services
+import automation
+from prefect.settings import PREFECT_LOCAL_STORAGE_PATH, temporary_settings
+from prefect.testing.utilities import prefect_test_harness
+from genre_analysis import GenrePulseAnalyzer
+from replay import ReplayServer, replay_collector
+
+COMPARISONS = ["Coldplay", "Imagine Dragons"]
+
+
+@pytest.fixture(scope="module")
+def prefect_server():
+    # One throwaway Prefect API for the module; starting it dominates runtime
+    with prefect_test_harness():
+        yield
+
+
+@pytest.fixture
+def flow_env(prefect_server, tmp_path, monkeypatch):
+    # Scratch data, reports and task result cache per test
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(services, "_instances", {})
+    analyzer = GenrePulseAnalyzer(data_directory=str(tmp_path / "data"))
+    services.provide("analyzer", analyzer)
+    with temporary_settings({PREFECT_LOCAL_STORAGE_PATH: tmp_path / "results"}):
+        with ReplayServer() as server:
+            yield server, analyzer
+
+
+def use_collector(server, tmp_path):
+    # A fresh collector per run, so its response cache cannot hide refetches
+    collector = replay_collector(server.url, str(tmp_path / "data"))
+    services.provide("collector", collector)
+    return collector
+
+
+def test_weekly_flow_reuses_cached_shards(flow_env, tmp_path):
+    server, _ = flow_env
+    for run in (COMPARISONS, [*COMPARISONS, "Maroon 5"]):
+        collector = use_collector(server, tmp_path)
+        before = server.counts["requests"]
+        automation.weekly_flow("Nova Sound", run)
+        collector.http.close()
+    # Only the new artist's shards ran: token, Spotify search and top
+    # tracks, YouTube search, Last.fm info
+    refetched = server.counts["requests"] - before
+
+    assert 0 < refetched <= 5, f"❌ Rerun made {refetched} requests instead of only the new artist's"
+    assert os.path.exists("./reports/weekly_genre_pulse.md"), "❌ Report was not generated"
+
+
+def test_rerun_after_partial_failure_redoes_only_failed_shard(flow_env, tmp_path, monkeypatch):
+    server, analyzer = flow_env
+    monkeypatch.setattr(automation, "collect_shard", automation.collect_shard.with_options(retries=0))
+
+    # First run: Coldplay's Last.fm lookup fails, everything else succeeds
+    collector = use_collector(server, tmp_path)
+    collector.collect_lastfm_artist = lambda artist: None if artist == "Coldplay" else type(collector).collect_lastfm_artist(collector, artist)
+    with pytest.raises(RuntimeError, match="lastfm/Coldplay"):
+        automation.weekly_flow("Nova Sound", COMPARISONS)
+    collector.http.close()
+    videos = len(analyzer.store.read("videos"))
+    listeners = analyzer.store.read("listener_stats")["query"].tolist()
+    assert "Coldplay" not in listeners and len(listeners) == 2
+
+    # Rerun with the provider healthy again
+    collector = use_collector(server, tmp_path)
+    executed = []
+    collect_source = collector.collect_source
+    collector.collect_source = lambda source, artist: executed.append((source, artist)) or collect_source(source, artist)
+    automation.weekly_flow("Nova Sound", COMPARISONS)
+    collector.http.close()
+
+    assert executed == [("lastfm", "Coldplay")], f"❌ Rerun executed {executed}"
+    assert len(analyzer.store.read("videos")) == videos, "❌ Completed shards were stored twice"
+    assert sorted(analyzer.store.read("listener_stats")["query"]) == ["Coldplay", "Imagine Dragons", "Nova Sound"]
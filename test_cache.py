@@ -0,0 +1,82 @@
+import time
+from cache import MemoryCache, RedisCache, ResponseCache, make_cache_key
+from data_collector import GenreDataCollector
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+def test_cache_key_normalization():
+    a = make_cache_key("https://x/search", {"q": "Coldplay", "limit": 1, "key": "secret-a"})
+    b = make_cache_key("https://x/search", {"limit": "1", "key": "secret-b", "q": "Coldplay"})
+    assert a == b, "❌ Param order, types or credentials changed the key"
+    assert "secret" not in a
+    assert a != make_cache_key("https://x/search", {"q": "Maroon 5", "limit": 1})
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    cache.get("a")
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None, "❌ Least recently used entry was not evicted"
+    assert cache.get("a") == 1
+
+    cache.set("d", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("d") is None, "❌ Expired entry was served"
+
+
+def test_remote_tier_shared_between_workers():
+    redis = FakeRedis()
+    worker_a = ResponseCache(remote=RedisCache(client=redis))
+    worker_b = ResponseCache(remote=RedisCache(client=redis))
+
+    worker_a.set("k", {"artists": []}, ttl=60)
+    assert worker_b.get("k") == {"artists": []}
+    assert worker_b.get("k") == {"artists": []}
+
+    stats = worker_b.stats()
+    assert stats["remote_hits"] == 1 and stats["memory_hits"] == 1
+    assert worker_b.get("missing") is None
+    assert worker_b.stats()["misses"] == 1
+
+
+def test_fetch_data_served_from_cache(monkeypatch, tmp_path):
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"calls": len(calls)}
+
+    def fake_get(url, headers=None, params=None, policy=None):
+        calls.append(url)
+        return Response()
+
+    collector = GenreDataCollector(data_directory=str(tmp_path), cache=ResponseCache())
+    monkeypatch.setattr(collector.http, "get", fake_get)
+
+    url = "http://ws.audioscrobbler.com/2.0/"
+    params = {"method": "artist.getInfo", "artist": "Coldplay"}
+    first = collector.fetch_data(url, params=params)
+    second = collector.fetch_data(url, params=dict(params))
+
+    assert first == second and len(calls) == 1, "❌ Repeat request went upstream"
+    assert collector.cache.stats()["hits"] == 1
@@ -0,0 +1,98 @@
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from coalesce import RequestCoalescer, RedisError
+from storage import SingleFlight
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        with self.lock:
+            if nx and key in self.store:
+                return False
+            self.store[key] = value
+            return True
+
+    def delete(self, key):
+        self.store.pop(key, None)
+
+
+def slow_pipeline(calls, seconds=0.3):
+    def run(name):
+        calls.append(name)
+        time.sleep(seconds)
+        return {"report_path": f"{name}.md"}
+    return run
+
+
+def test_burst_in_one_worker_runs_once(tmp_path):
+    coalescer = RequestCoalescer(freshness_seconds=0, flights=SingleFlight(str(tmp_path)))
+    calls = []
+    pipeline = slow_pipeline(calls)
+
+    async def burst():
+        futures = [coalescer.submit("weekly_report", pipeline, "weekly", background=True) for _ in range(50)]
+        return await asyncio.gather(*map(asyncio.wrap_future, futures))
+
+    results = asyncio.run(burst())
+    assert len(calls) == 1, f"❌ {len(calls)} pipelines for 50 identical requests"
+    assert all(r == {"report_path": "weekly.md"} for r in results)
+    assert coalescer.stats()["joined"] == 49
+
+    # With no freshness window the next request runs again
+    coalescer.run("weekly_report", pipeline, "weekly")
+    assert len(calls) == 2
+
+
+def test_workers_share_runs_and_fresh_results_through_redis(tmp_path):
+    redis = FakeRedis()
+    workers = [RequestCoalescer(freshness_seconds=60, redis_client=redis, flights=SingleFlight(str(tmp_path))) for _ in range(3)]
+    calls = []
+    pipeline = slow_pipeline(calls)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(worker.run, "artist:nova sound", pipeline, "nova") for worker in workers]
+        results = [f.result() for f in futures]
+    assert len(calls) == 1, "❌ Workers ran the same request separately"
+    assert all(r == {"report_path": "nova.md"} for r in results)
+
+    # Within the freshness window a new worker is answered without running
+    late = RequestCoalescer(freshness_seconds=60, redis_client=redis, flights=SingleFlight(str(tmp_path)))
+    assert late.run("artist:nova sound", pipeline, "nova") == {"report_path": "nova.md"}
+    assert len(calls) == 1
+    assert late.run("artist:echo vale", pipeline, "echo") == {"report_path": "echo.md"}
+    assert len(calls) == 2
+
+
+def test_failures_reach_every_waiter(tmp_path):
+    coalescer = RequestCoalescer(freshness_seconds=60, flights=SingleFlight(str(tmp_path)))
+
+    def failing():
+        time.sleep(0.1)
+        raise RuntimeError("upstream down")
+
+    futures = [coalescer.submit("weekly_report", failing, background=True) for _ in range(5)]
+    assert all(isinstance(f.exception(), RuntimeError) for f in futures)
+    assert coalescer.run("weekly_report", lambda: "recovered") == "recovered", "❌ A failure was cached"
+
+
+def test_redis_error_after_run_does_not_rerun(tmp_path):
+    class FlakyRedis(FakeRedis):
+        # Elects the leader, then fails to publish its result
+        def set(self, key, value, ex=None, px=None, nx=False):
+            if ":result:" in key:
+                raise RedisError("connection reset")
+            return super().set(key, value, ex=ex, px=px, nx=nx)
+
+    coalescer = RequestCoalescer(freshness_seconds=0, redis_client=FlakyRedis(), flights=SingleFlight(str(tmp_path)))
+    calls = []
+    assert coalescer.run("weekly_report", slow_pipeline(calls, 0), "weekly") == {"report_path": "weekly.md"}
+    assert len(calls) == 1, "❌ The pipeline ran again after Redis failed to store its result"
@@ -0,0 +1,174 @@
+import time
+import asyncio
+import threading
+from data_collector import GenreDataCollector, COMPARISON_ARTISTS, _provider_semaphores
+
+CALL_LATENCY = 0.1
+
+
+class FakeCollector(GenreDataCollector):
+    latency = CALL_LATENCY
+
+    def get_spotify_token(self):
+        return "token"
+
+    async def fetch_data_async(self, session, provider, url, headers=None, params=None):
+        self.calls = getattr(self, "calls", [])
+        self.calls.append((provider, url, dict(params or {})))
+        await asyncio.sleep(self.latency)
+        if url.endswith("/search") and provider == "spotify":
+            return {"artists": {"items": [{"id": params["q"].casefold()}]}}
+        if url.endswith("/artists"):
+            return {"artists": [{"id": i, "popularity": 50} for i in params["ids"].split(",")]}
+        return {"provider": provider, "url": url}
+
+
+def test_concurrent_collection(tmp_path):
+    collector = FakeCollector(data_directory=str(tmp_path))
+
+    start = time.perf_counter()
+    data = collector.collect_all_data(days=1)
+    elapsed = time.perf_counter() - start
+
+    assert set(data) == {"spotify", "youtube", "lastfm"}
+    for source in data.values():
+        assert set(source["comparison_artists"]) == set(COMPARISON_ARTISTS)
+    # Spotify needs search -> top-tracks, so two round-trips is the floor
+    assert elapsed < CALL_LATENCY * 5, f"❌ Collection was serialized ({elapsed:.2f}s)"
+    print("✅ Concurrent collection successful.")
+
+
+def test_collection_inside_running_loop(tmp_path):
+    collector = FakeCollector(data_directory=str(tmp_path))
+
+    async def handler():
+        return collector.collect_all_data(days=1)
+
+    data = asyncio.run(handler())
+    assert data["youtube"]["nova_sound"]["provider"] == "youtube"
+
+
+def test_runs_share_session_and_provider_limits(tmp_path):
+    seen = set()
+
+    class Recording(FakeCollector):
+        async def fetch_data_async(self, session, provider, url, headers=None, params=None):
+            seen.add((id(session), id(_provider_semaphores.get())))
+            return await super().fetch_data_async(session, provider, url, headers, params)
+
+    collector = Recording(data_directory=str(tmp_path))
+    collector.latency = 0.01
+    runs = [threading.Thread(target=collector.collect_all_data, kwargs={"days": 1}) for _ in range(3)]
+    for run in runs:
+        run.start()
+    for run in runs:
+        run.join()
+    collector.collect_batch(["Nova Sound"])
+
+    assert len(seen) == 1, f"❌ {len(seen)} sessions/limit sets for concurrent runs"
+
+
+def test_batch_collection_dedupes_entities(tmp_path):
+    collector = FakeCollector(data_directory=str(tmp_path))
+    collector.latency = 0
+
+    batch = collector.collect_batch(
+        ["Nova Sound", "Echo Vale", "nova  sound"],
+        comparison_sets={"Echo Vale": ["Coldplay", "Nova Sound"]}
+    )
+
+    # Nova Sound, Echo Vale, Coldplay, Imagine Dragons, Maroon 5
+    assert batch["stats"]["unique_entities"] == 5
+    searches = [c for c in collector.calls if c[0] == "spotify" and c[1].endswith("/search")]
+    assert len(searches) == 5, "❌ An artist was searched more than once"
+    multi = [c for c in collector.calls if c[1].endswith("/artists")]
+    assert len(multi) == 1 and len(multi[0][2]["ids"].split(",")) == 5
+    assert len([c for c in collector.calls if c[0] == "lastfm"]) == 5
+
+    view = batch["reports"]["Echo Vale"]
+    assert set(view["spotify"]["comparison_artists"]) == {"Coldplay", "Nova Sound"}
+    assert view["spotify"]["target"]["artist"]["id"] == "echo vale"
+
+
+def test_streaming_ingest_resumes_from_checkpoint(tmp_path):
+    from genre_analysis import GenrePulseAnalyzer
+    from data_collector import CollectionCheckpoint
+    from replay import ReplayServer, replay_collector, catalogue_size
+
+    analyzer = GenrePulseAnalyzer(str(tmp_path / "data"))
+    checkpoint_path = str(tmp_path / "checkpoints.json")
+    query = "Nova Sound"
+
+    def interrupted(records, after):
+        for i, record in enumerate(records):
+            if i == after:
+                raise KeyboardInterrupt
+            yield record
+
+    with ReplayServer() as server:
+        collector = replay_collector(server.url, str(tmp_path / "data"))
+        checkpoint = CollectionCheckpoint(checkpoint_path)
+        try:
+            analyzer.ingest_stream("youtube", query, interrupted(collector.stream_records("youtube", query, checkpoint=checkpoint), 130),
+                                   checkpoint=checkpoint, batch_size=40)
+        except KeyboardInterrupt:
+            pass
+        assert analyzer.store.read("videos")["video_id"].nunique() == 120
+
+        # A fresh process picks up the saved cursor
+        checkpoint = CollectionCheckpoint(checkpoint_path)
+        analyzer.ingest_stream("youtube", query, collector.stream_records("youtube", query, checkpoint=checkpoint),
+                               checkpoint=checkpoint, batch_size=40)
+        # Nothing left once the stream is exhausted
+        assert list(collector.stream_records("youtube", query, checkpoint=CollectionCheckpoint(checkpoint_path))) == []
+
+        tracks = list(collector.stream_records("spotify", query, max_items=120))
+        lastfm = list(collector.stream_records("lastfm", query))
+        collector.http.close()
+
+    videos = analyzer.store.read("videos")
+    total = catalogue_size("videos", query)
+    assert len(videos) == total, f"❌ Expected {total} rows, got {len(videos)} (gap or duplicates on resume)"
+    assert videos["video_id"].nunique() == total
+    assert len(tracks) == 120 and len({t["id"] for t in tracks}) == 120
+    assert len(lastfm) == catalogue_size("lastfm", query), "❌ Last.fm pages were not all followed"
+
+
+def test_stream_page_failure_is_not_completion(tmp_path):
+    import pytest
+    from genre_analysis import GenrePulseAnalyzer
+    from data_collector import CollectionCheckpoint
+    from replay import ReplayServer, replay_collector, catalogue_size
+
+    analyzer = GenrePulseAnalyzer(str(tmp_path / "data"))
+    checkpoint_path = str(tmp_path / "checkpoints.json")
+    query = "Nova Sound"
+
+    with ReplayServer() as server:
+        collector = replay_collector(server.url, str(tmp_path / "data"))
+        fetch_data = collector.fetch_data
+        pages = []
+
+        def flaky(url, headers=None, params=None, **kwargs):
+            # The third page fails as if the provider were down
+            pages.append(url)
+            return None if len(pages) == 3 else fetch_data(url, headers=headers, params=params, **kwargs)
+
+        collector.fetch_data = flaky
+        checkpoint = CollectionCheckpoint(checkpoint_path)
+        with pytest.raises(RuntimeError, match="youtube:nova sound"):
+            analyzer.ingest_stream("youtube", query, collector.stream_records("youtube", query, checkpoint=checkpoint),
+                                   checkpoint=checkpoint, batch_size=40)
+        state = CollectionCheckpoint(checkpoint_path).get("youtube:nova sound")
+        assert state is not None and not state["done"], "❌ A failed page marked the stream complete"
+
+        # The provider recovers and the next run pulls the rest
+        collector.fetch_data = fetch_data
+        checkpoint = CollectionCheckpoint(checkpoint_path)
+        analyzer.ingest_stream("youtube", query, collector.stream_records("youtube", query, checkpoint=checkpoint),
+                               checkpoint=checkpoint, batch_size=40)
+        collector.http.close()
+
+    videos = analyzer.store.read("videos")
+    total = catalogue_size("videos", query)
+    assert len(videos) == total and videos["video_id"].nunique() == total, "❌ Resume after a failed page left a gap"
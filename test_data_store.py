@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+from data_store import ParquetStore, normalize_payloads
+
+SAMPLE = {
+    "spotify": {
+        "nova_sound": {"artists": {"items": [
+            {"id": "nova", "name": "Nova Sound", "popularity": 41, "followers": {"total": 1200}, "genres": ["indie pop"]}
+        ]}},
+        "comparison_artists": {"Coldplay": {"tracks": [
+            {"id": "t1", "name": "Yellow", "popularity": 88, "duration_ms": 266773, "explicit": False,
+             "artists": [{"id": "cp", "name": "Coldplay"}], "album": {"id": "a1", "name": "Parachutes", "release_date": "2000-07-10"}}
+        ]}},
+    },
+    "youtube": {
+        "nova_sound": {"items": [
+            {"id": {"videoId": "v1"}, "snippet": {"channelId": "c1", "channelTitle": "Nova", "title": "Live", "publishedAt": "2024-05-01T12:00:00Z"}}
+        ]},
+        "comparison_artists": {},
+    },
+    "lastfm": {
+        "nova_sound": None,
+        "comparison_artists": {"Coldplay": {"artist": {
+            "name": "Coldplay", "mbid": "m1", "stats": {"listeners": "6000000", "playcount": "900000000"},
+            "tags": {"tag": [{"name": "rock"}, {"name": "britpop"}]}
+        }}},
+    },
+}
+
+
+def test_normalize_and_roundtrip(tmp_path):
+    collected_at = datetime(2025, 3, 3, tzinfo=timezone.utc)
+    tables = normalize_payloads(SAMPLE, collected_at=collected_at)
+    assert {name: len(df) for name, df in tables.items()} == {
+        "artists": 1, "tracks": 1, "videos": 1, "listener_stats": 1, "track_stats": 0
+    }
+
+    store = ParquetStore(str(tmp_path))
+    store.write_tables(tables)
+    store.write_tables(normalize_payloads(SAMPLE, collected_at=datetime(2025, 3, 10, tzinfo=timezone.utc)))
+    assert store.dates("tracks") == ["2025-03-03", "2025-03-10"]
+
+    stats = store.read("listener_stats")
+    assert str(stats["listeners"].dtype) == "int64", "❌ Listener counts were stored as text"
+    assert list(stats["tags"].iloc[0]) == ["rock", "britpop"]
+
+    pruned = store.read("tracks", columns=["track_id", "popularity"], filters=[("date", "=", "2025-03-10")])
+    assert list(pruned.columns) == ["track_id", "popularity"] and len(pruned) == 1
+
+    assert store.read("videos", filters=[("source", "=", "spotify")]).empty
+    assert store.read("artists", columns=["name"]).iloc[0]["name"] == "Nova Sound"
+
+
+def test_reads_skip_part_files_still_being_written(tmp_path):
+    store = ParquetStore(str(tmp_path))
+    store.write_tables(normalize_payloads(SAMPLE, collected_at=datetime(2025, 3, 3, tzinfo=timezone.utc)))
+    partition = tmp_path / "tracks" / "date=2025-03-03" / "source=spotify"
+    assert [p.name for p in partition.iterdir() if not p.name.startswith("part-")] == [], "❌ Temp file left behind"
+
+    # What another worker's in-progress write looks like to a reader
+    (partition / ".part-inprogress.tmp").write_bytes(b"PAR1 truncated")
+    assert len(store.read("tracks")) == 1
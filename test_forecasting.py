@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+from forecasting import SeriesForecaster, PARALLEL_MIN_SERIES
+
+
+def synthetic_history(n_series, length, seed=0):
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2023-01-01", periods=length, freq="W")
+    return pd.concat([
+        pd.DataFrame({"unique_id": f"genre|g{i}|listeners", "ds": ds, "y": 1000 + rng.normal(size=length).cumsum()})
+        for i in range(n_series)
+    ], ignore_index=True)
+
+
+def test_tiers_parallelism_and_model_reuse(tmp_path):
+    state_path = str(tmp_path / "models.json")
+    long_series = synthetic_history(PARALLEL_MIN_SERIES, 30)
+    short = synthetic_history(1, 5, seed=1).assign(unique_id="spotify|Nova Sound|popularity")
+    tiny = synthetic_history(1, 2, seed=2).assign(unique_id="youtube|Nova Sound|videos_found")
+    df = pd.concat([long_series, short, tiny], ignore_index=True)
+
+    forecaster = SeriesForecaster(state_path, n_jobs=2, horizon=4)
+    forecast = forecaster.forecast(df)
+
+    assert forecast["unique_id"].nunique() == PARALLEL_MIN_SERIES + 2
+    assert (forecast.groupby("unique_id").size() == 4).all()
+    models = forecast.groupby("unique_id")["model"].first()
+    assert models["spotify|Nova Sound|popularity"] == "SES"
+    assert models["youtube|Nova Sound|videos_found"] == "Naive"
+    assert len(forecaster.last_timings) == PARALLEL_MIN_SERIES + 2
+    assert forecaster.last_timings["fit_seconds"].notna().all(), "❌ Per-series timings missing"
+
+    # A fresh forecaster picks up the persisted orders and skips the search
+    rerun = SeriesForecaster(state_path, n_jobs=1, horizon=4).forecast(long_series)
+    assert set(rerun["model"]) == {"ARIMA"}, "❌ Stored ARIMA orders were not reused"
+
+
+def test_unchanged_series_skip_fitting(tmp_path, monkeypatch):
+    from forecast_cache import ForecastCache
+
+    df = synthetic_history(3, 20)
+    cache_path = str(tmp_path / "forecast_cache.parquet")
+    forecaster = SeriesForecaster(str(tmp_path / "models.json"), n_jobs=1, cache=ForecastCache(cache_path))
+    first = forecaster.forecast(df)
+
+    fitted = []
+    original = SeriesForecaster._forecast_uncached
+
+    def spy(self, frame):
+        fitted.append(sorted(frame["unique_id"].unique()))
+        return original(self, frame)
+
+    monkeypatch.setattr(SeriesForecaster, "_forecast_uncached", spy)
+
+    # A new process with a cold in-memory cache still hits on disk
+    rerun = SeriesForecaster(str(tmp_path / "models.json"), n_jobs=1, cache=ForecastCache(cache_path))
+    again = rerun.forecast(df)
+    assert fitted == [], "❌ Unchanged series were refit"
+    pd.testing.assert_frame_equal(
+        first.sort_values(["unique_id", "ds"]).reset_index(drop=True),
+        again.sort_values(["unique_id", "ds"]).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+    changed = df.copy()
+    changed.loc[changed.index[-1], "y"] += 50
+    rerun.forecast(changed)
+    assert fitted == [[changed["unique_id"].iloc[-1]]], "❌ Only the changed series should refit"
+    assert rerun.cache.stats()["hits"] == 5
+
+
+def test_cache_eviction_budget(tmp_path):
+    from forecast_cache import ForecastCache, series_fingerprints
+
+    cache = ForecastCache(str(tmp_path / "c.parquet"), max_entries=2)
+    df = synthetic_history(3, 5)
+    fingerprints = series_fingerprints(df, {})
+    forecast = df.groupby("unique_id", as_index=False).last().assign(forecast=1.0, model="SES")[
+        ["unique_id", "ds", "forecast", "model"]
+    ]
+    cache.store(forecast, fingerprints)
+    assert cache.stats()["entries"] == 2
+
+
+def test_workers_merge_selected_orders(tmp_path):
+    # Two workers sharing one state file, both started before either fit
+    state_path = str(tmp_path / "models.json")
+    first = SeriesForecaster(state_path, n_jobs=1, horizon=2)
+    second = SeriesForecaster(state_path, n_jobs=1, horizon=2)
+    history = synthetic_history(2, 20, seed=3)
+    first.forecast(history)
+    second.forecast(history.assign(unique_id=history["unique_id"] + "-b"))
+
+    stored = SeriesForecaster(state_path).state
+    assert len(stored) == 4, f"❌ Workers overwrote each other's selections: {sorted(stored)}"
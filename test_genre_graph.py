@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+
+import pandas as pd
+from genre_graph import GenreFlowGraph
+
+
+def week_tables(collected_at, artist_tags):
+    collected_at = pd.Timestamp(collected_at)
+    return {
+        "artists": pd.DataFrame({
+            "query": list(artist_tags),
+            "genres": [tags for tags in artist_tags.values()],
+            "collected_at": collected_at,
+        }),
+        "listener_stats": pd.DataFrame(columns=["query", "tags", "collected_at"]),
+    }
+
+
+def test_incremental_deltas_and_persistence(tmp_path):
+    path = str(tmp_path / "graph.parquet")
+    graph = GenreFlowGraph(path)
+
+    week1 = week_tables(datetime(2025, 3, 3, tzinfo=timezone.utc), {
+        "A": ["Pop", "R&B"], "B": ["pop", "edm"], "C": ["jazz", "electronic"],
+    })
+    assert graph.update(week1) == 3
+    assert graph.update(week1) == 0, "❌ Already-applied observations were counted again"
+
+    week2 = week_tables(datetime(2025, 3, 10, tzinfo=timezone.utc), {
+        "A": ["pop", "r&b"], "B": ["pop", "r&b", "edm"], "D": ["pop", "r&b"],
+    })
+    graph.update(week2)
+    assert graph.graph["pop"]["r&b"]["weight"] == 4
+
+    rising = graph.rising_edges(k=2)
+    assert (rising.iloc[0]["u"], rising.iloc[0]["v"]) == ("pop", "r&b")
+    assert rising.iloc[0]["delta"] == 2
+
+    # State reloads from disk and keeps applying only newer observations
+    reopened = GenreFlowGraph(path)
+    assert reopened.graph.number_of_edges() == graph.graph.number_of_edges()
+    assert reopened.update(week2) == 0
+    assert reopened.rising_edges(k=2).equals(rising)
+    assert any({"pop", "r&b"} <= set(c) for c in reopened.communities())
+
+
+def test_reads_during_updates(tmp_path):
+    import threading
+
+    graph = GenreFlowGraph(str(tmp_path / "graph.parquet"))
+    start = pd.Timestamp(datetime(2025, 1, 6, tzinfo=timezone.utc))
+    done = threading.Event()
+    errors = []
+
+    def read():
+        while not done.is_set():
+            try:
+                graph.rising_edges(k=3)
+                graph.communities()
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    # Every week brings new genres, so updates keep growing the edge set
+    for week in range(30):
+        tags = [f"genre{week}-{i}" for i in range(20)] + ["pop"]
+        graph.update(week_tables(start + pd.Timedelta(weeks=week), {"A": tags}))
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert not errors, f"❌ Reads raced with updates: {errors[0]!r}"
@@ -0,0 +1,46 @@
+import os
+import numpy as np
+import pandas as pd
+from history_store import MetricHistoryStore, series_id
+from genre_analysis import GenrePulseAnalyzer
+
+
+def weekly_observations(weeks, entities=("Coldplay", "Maroon 5"), start="2024-01-07"):
+    dates = pd.date_range(start, periods=weeks, freq="W", tz="UTC")
+    return pd.DataFrame([
+        {"source": "lastfm", "entity": entity, "metric": "listeners", "ds": ds, "y": 1000.0 + i * 10 + n}
+        for n, entity in enumerate(entities)
+        for i, ds in enumerate(dates)
+    ])
+
+
+def test_append_only_new_observations(tmp_path):
+    store = MetricHistoryStore(str(tmp_path))
+    assert store.append(weekly_observations(10)) == 20
+    # Re-running an overlapping window only adds the two new weeks
+    assert store.append(weekly_observations(12)) == 4
+    assert store.series_count() == 2
+
+    # Watermarks survive a restart
+    reopened = MetricHistoryStore(str(tmp_path))
+    assert reopened.append(weekly_observations(12)) == 0
+
+    df = reopened.read(entities=["Coldplay"], start="2024-02-01", end="2024-02-29")
+    assert list(df.columns) == ["unique_id", "ds", "y"]
+    assert set(df["unique_id"]) == {series_id("lastfm", "Coldplay", "listeners")}
+    assert len(df) == 4 and df["ds"].is_monotonic_increasing
+
+    assert reopened.compact() > 0
+    assert len(reopened.read()) == 24, "❌ Compaction lost or duplicated rows"
+
+
+def test_analyze_trends_fits_stored_history(tmp_path):
+    analyzer = GenrePulseAnalyzer(data_directory=str(tmp_path))
+    end = pd.Timestamp.now(tz="UTC").normalize()
+    analyzer.history.append(weekly_observations(20, start=end - pd.Timedelta(weeks=20)))
+
+    analyzer.analyze_trends()
+
+    forecast = pd.read_csv(os.path.join(str(tmp_path), "genre_forecast.csv"))
+    assert forecast["unique_id"].nunique() == 2, "❌ Forecast did not cover every series"
+    assert np.isfinite(forecast["forecast"]).all()
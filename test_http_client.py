@@ -0,0 +1,75 @@
+import requests
+from http_client import PooledHttpClient, RetryPolicy, TokenBucket, parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_client(session):
+    client = PooledHttpClient()
+    client._sessions["spotify"] = session
+    return client
+
+
+def test_retry_after_is_honored(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("http_client.time.sleep", sleeps.append)
+    session = FakeSession([FakeResponse(429, {"Retry-After": "2"}), FakeResponse(503), FakeResponse(200)])
+
+    response = make_client(session).get("https://api.spotify.com/v1/search", policy=RetryPolicy(max_attempts=3))
+
+    assert response.status_code == 200 and session.calls == 3
+    assert sleeps[0] == 2.0, "❌ Retry-After was ignored"
+    assert 0 <= sleeps[1] <= 1.0
+
+
+def test_non_retryable_status_returns_immediately(monkeypatch):
+    monkeypatch.setattr("http_client.time.sleep", lambda s: None)
+    session = FakeSession([FakeResponse(404)])
+    response = make_client(session).get("https://api.spotify.com/v1/artists/x")
+    assert response.status_code == 404 and session.calls == 1
+
+
+def test_transport_errors_exhaust_attempts(monkeypatch):
+    monkeypatch.setattr("http_client.time.sleep", lambda s: None)
+    session = FakeSession([requests.exceptions.ConnectionError("down")] * 2)
+    try:
+        make_client(session).get("https://api.spotify.com/v1/search", policy=RetryPolicy(max_attempts=2))
+    except requests.exceptions.ConnectionError:
+        pass
+    else:
+        raise AssertionError("❌ Error was swallowed")
+    assert session.calls == 2
+
+
+def test_token_bucket_paces_bursts():
+    bucket = TokenBucket(rate=100, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0.0, 0.0]
+    assert 0.005 < waits[2] < waits[3] <= 0.02 + 1e-6
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
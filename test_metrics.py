@@ -0,0 +1,38 @@
+import os
+import sys
+import subprocess
+from fastapi.testclient import TestClient
+import main
+from jobs import JobManager
+from metrics import endpoint_label
+
+
+def test_metrics_endpoint_reports_route_latency(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "jobs", JobManager(jobs_directory=str(tmp_path / "jobs")))
+    with TestClient(main.app) as client:
+        client.get("/health")
+        body = client.get("/metrics").text
+
+    assert 'genre_pulse_http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in body
+    assert "genre_pulse_stage_duration_seconds" in body
+
+
+def test_endpoint_labels_are_bounded():
+    assert endpoint_label("https://api.spotify.com/v1/artists/4gzpq5DPGxSnKTe4SA8HAU/top-tracks") == "/v1/artists/{id}/top-tracks"
+    assert endpoint_label("https://api.spotify.com/v1/artists", {"ids": "a,b"}) == "/v1/artists"
+    assert endpoint_label("http://ws.audioscrobbler.com/2.0/", {"method": "artist.getInfo"}) == "artist.getInfo"
+
+
+def test_multiprocess_aggregation(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = "import metrics; metrics.STAGE_DURATION.labels('analyze_trends').observe(1.0)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True, cwd=os.path.dirname(__file__))
+
+    scrape = "import metrics; print(metrics.render_latest()[0].decode())"
+    body = subprocess.run(
+        [sys.executable, "-c", scrape], env=env, check=True, capture_output=True, text=True,
+        cwd=os.path.dirname(__file__)
+    ).stdout
+    assert 'genre_pulse_stage_duration_seconds_count{stage="analyze_trends"} 2.0' in body, "❌ Workers were not aggregated"
@@ -0,0 +1,53 @@
+import os
+import time
+import threading
+from concurrent.futures import Future
+from fastapi.testclient import TestClient
+import main
+from genre_analysis import build_report
+from precompute import PrecomputedReports
+from reporting import report_data_path
+from services import get_renderer
+
+
+def test_stale_report_served_while_refreshing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data_path = report_data_path(main.WEEKLY_REPORT_PATH)
+    os.makedirs(os.path.dirname(data_path))
+    get_renderer().render_to_file(build_report("Nova Sound"), data_path, "json")
+    hour_ago = time.time() - 3600
+    os.utime(data_path, (hour_ago, hour_ago))
+
+    release = threading.Event()
+    refreshes = []
+
+    def slow_refresh():
+        # Stands in for a full collection and forecasting run
+        future = Future()
+        refreshes.append(future)
+
+        def run():
+            release.wait(timeout=5)
+            get_renderer().render_to_file(build_report("Nova Sound"), data_path, "json")
+            future.set_result({"report_path": main.WEEKLY_REPORT_PATH})
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    reports = PrecomputedReports(main.report_path_for, slow_refresh, None, enabled=True, stale_seconds=60)
+    monkeypatch.setattr(main, "reports", reports)
+    client = TestClient(main.app)
+
+    started = time.perf_counter()
+    for _ in range(3):
+        response = client.get("/download_report")
+        assert response.status_code == 200
+        assert int(response.headers["Age"]) >= 3600, "❌ Stale copy was not served with its age"
+    assert time.perf_counter() - started < 2, "❌ Reads waited on the refresh"
+    assert len(refreshes) == 1, f"❌ {len(refreshes)} refreshes started for one stale report"
+
+    release.set()
+    refreshes[0].result(timeout=5)
+    response = client.get("/download_report")
+    assert int(response.headers["Age"]) < 60, "❌ Refreshed report was not picked up"
+    assert reports.stats()["refreshing"] == 0
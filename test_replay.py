@@ -0,0 +1,65 @@
+import os
+import json
+from http_client import transport_url
+from replay import ReplayServer, FixtureRecorder, replay_collector, synthetic_roster
+import benchmark
+
+
+def test_transport_url_rewrites_to_replay_base():
+    url = "https://api.spotify.com/v1/artists/abc/top-tracks?market=US"
+    assert transport_url(url) == url
+    assert transport_url(url, "http://127.0.0.1:9000/") == "http://127.0.0.1:9000/api.spotify.com/v1/artists/abc/top-tracks?market=US"
+
+
+def test_replay_collection_survives_injected_errors(tmp_path):
+    with ReplayServer(error_rate=0.1, seed=1) as server:
+        collector = replay_collector(server.url, str(tmp_path / "data"))
+        roster = synthetic_roster(20)
+        batch = collector.collect_batch(roster)
+        collector.http.close()
+
+    assert server.counts["errors"] > 0, "❌ No errors were injected"
+    assert set(batch["reports"]) == set(roster)
+    # Retries recover almost everything; an exhausted one degrades to None
+    collected = [
+        name for name in roster
+        if ((batch["reports"][name]["spotify"]["target"] or {}).get("artist") or {}).get("name") == name
+    ]
+    assert len(collected) >= len(roster) - 2, f"❌ Only {len(collected)}/{len(roster)} artists survived retries"
+
+
+def test_recorded_fixtures_are_replayed(tmp_path):
+    fixtures = tmp_path / "fixtures"
+    with ReplayServer() as server:
+        collector = replay_collector(server.url, str(tmp_path / "live"))
+        collector.recorder = FixtureRecorder(str(fixtures))
+        collector.collect_all_data(days=1)
+        collector.http.close()
+    assert collector.recorder.recorded > 0
+
+    # Edit one recorded Last.fm payload; replay must serve the file, not synthesize
+    path = next((fixtures / "lastfm").glob("*.json"))
+    payload = json.loads(path.read_text())
+    payload["artist"]["stats"]["listeners"] = "424242"
+    path.write_text(json.dumps(payload))
+
+    with ReplayServer(fixtures_dir=str(fixtures)) as server:
+        collector = replay_collector(server.url, str(tmp_path / "replay"))
+        data = collector.collect_all_data(days=1)
+        collector.http.close()
+
+    assert server.counts["fixtures"] == server.counts["requests"], "❌ A request fell through to synthetic data"
+    assert "424242" in json.dumps(data["lastfm"]), "❌ Edited fixture was not served"
+
+
+def test_benchmark_results_compare(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    results = benchmark.run([5], latency=0, history_weeks=4, max_reports=2, api=False, startup=False, workdir=str(tmp_path / "bench"))
+    assert os.getcwd() == str(tmp_path), "❌ The benchmark left the process in its workdir"
+    stages = {r["stage"] for r in results["results"]}
+    assert {"collect_all_data", "collect_batch", "process_api_data", "analyze_trends", "save_report"} <= stages
+
+    slower = {"results": [dict(r, seconds=r["seconds"] * 3 + 1) for r in results["results"]]}
+    rows = benchmark.compare(slower, results)
+    assert all(row["regressed"] for row in rows), "❌ A 3x slowdown was not flagged"
+    assert not any(row["regressed"] for row in benchmark.compare(results, results))
@@ -1,13 +1,33 @@
 import os
+import sys
+import pytest
+from data_collector import batch_sources
 from genre_analysis import GenrePulseAnalyzer
+from replay import ReplayServer, replay_collector
 
-def test_report_generation():
+def test_report_generation(tmp_path, monkeypatch):
+    # Runs against the replay stand-in in a scratch directory, so the result
+    # does not depend on whatever data is on disk
+    monkeypatch.chdir(tmp_path)
+    with ReplayServer() as server:
+        collector = replay_collector(server.url)
+        batch = collector.collect_batch(["Nova Sound"], days=1)
+        collector.http.close()
+
+    # Same steps as the API's report runs: store every entity, then report on
+    # the target's batch view
+    sources = batch_sources(batch)
     analyzer = GenrePulseAnalyzer()
+    analyzer.process_api_data(sources["spotify"], sources["youtube"], sources["lastfm"])
     analyzer.analyze_trends()
-    analyzer.save_report()
+    analyzer.save_report(artist_data=batch["reports"]["Nova Sound"])
 
     assert os.path.exists("./reports/weekly_genre_pulse.md"), "❌ Report was not generated"
+    report = open("./reports/weekly_genre_pulse.md", encoding="utf-8").read()
+    assert "Spotify Popularity:" in report, "❌ Report is missing the artist snapshot"
+    assert "No provider data available" not in report
     print("✅ Report successfully generated.")
 
 if __name__ == "__main__":
-    test_report_generation()
+    # Run through pytest, which supplies the tmp_path and monkeypatch fixtures
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,51 @@
+import json
+from fastapi.testclient import TestClient
+import main
+import services
+from genre_analysis import build_report
+from reporting import ReportRenderer
+
+
+def test_formats_share_sections_and_cache_them():
+    renderer = ReportRenderer()
+    first = build_report("Nova Sound")
+    second = build_report("Echo Vale")
+
+    markdown = "".join(renderer.render(first, "markdown"))
+    assert markdown.startswith("# Weekly Genre Pulse Report\n\n## Breakout Genres\n- Not enough weekly history yet")
+    assert "  - Cinematic/Uplifting Scenes: 85/100" in markdown
+    assert json.loads("".join(renderer.render(first, "json"))) == first
+    assert "<h1>Emerging Artist Analysis: Nova Sound</h1>" in "".join(renderer.render(first, "html"))
+
+    # Only sections that mention the artist are rendered again
+    cached = len(renderer._sections)
+    "".join(renderer.render(second, "markdown"))
+    assert len(renderer._sections) - cached == 2, "❌ Shared sections were re-rendered"
+
+
+def test_download_report_formats_and_etag(tmp_path, monkeypatch):
+    # A fresh analyzer rooted in tmp_path, so ./data is never created in the repo
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(services, "_instances", {})
+    report_path = str(tmp_path / "weekly_genre_pulse.md")
+    monkeypatch.setattr(main, "WEEKLY_REPORT_PATH", report_path)
+    main.get_analyzer().save_report(filename=report_path)
+
+    with TestClient(main.app) as client:
+        response = client.get("/download_report")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/markdown")
+        assert response.text == open(report_path, encoding="utf-8").read()
+        etag = response.headers["etag"]
+
+        cached = client.get("/download_report", headers={"If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b"", "❌ Unchanged report was sent again"
+
+        html = client.get("/download_report", params={"format": "html"}, headers={"If-None-Match": etag})
+        assert html.status_code == 200 and html.headers["etag"] != etag
+        assert client.get("/download_report", params={"format": "json"}).json()["title"] == "Weekly Genre Pulse Report"
+        assert client.get("/download_report", params={"format": "pdf"}).status_code == 400
+
+        main.get_analyzer().save_report(filename=report_path, artist_name="Echo Vale")
+        changed = client.get("/download_report", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and "Echo Vale" in changed.text
@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from data_store import normalize_payloads
+from similarity import SimilarityEngine, build_artist_profiles, NUMERIC_FEATURES
+from test_data_store import SAMPLE
+
+
+def synthetic_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    genres = [f"genre{g}" for g in range(40)]
+    rows = {}
+    for i in range(n):
+        base = (i % 8) * 5
+        rows[f"Artist {i}"] = {
+            "tags": sorted({genres[base + j] for j in rng.choice(5, size=3, replace=False)}),
+            **{column: rng.normal() for column in NUMERIC_FEATURES},
+        }
+    return pd.DataFrame.from_dict(rows, orient="index")
+
+
+def test_scores_match_brute_force():
+    profiles = synthetic_profiles(20)
+    engine = SimilarityEngine().fit(profiles)
+
+    similarity = engine.pairwise_similarity()
+    assert np.allclose(np.diag(similarity), 1.0, atol=1e-5)
+
+    overlap = engine.pairwise_overlap()
+    a, b = set(profiles["tags"].iloc[0]), set(profiles["tags"].iloc[8])
+    assert np.isclose(overlap[0, 8], len(a & b) / len(a | b)), "❌ Overlap is not the tag Jaccard index"
+
+    scores = engine.score("artist 0", ["Artist 8", "Unknown"])
+    assert list(scores["artist"]) == ["Artist 8"], "❌ Unknown comparison artists should be skipped"
+    assert np.isclose(scores["similarity"].iloc[0], max(similarity[0, 8], 0), atol=1e-5)
+    assert scores["shared_tags"].iloc[0] == sorted(a & b)
+
+
+def test_approximate_rank_matches_exact():
+    profiles = synthetic_profiles(400)
+    exact = SimilarityEngine(ann_min_artists=10_000).fit(profiles)
+    indexed = SimilarityEngine(ann_min_artists=256).fit(profiles)
+    assert exact.index is None and indexed.index is not None
+
+    for target in ("Artist 0", "Artist 123", "Artist 399"):
+        expected = exact.rank(target, k=5)
+        found = indexed.rank(target, k=5)
+        assert target not in set(found["artist"])
+        recall = len(set(expected["artist"]) & set(found["artist"])) / 5
+        assert recall >= 0.8, f"❌ Indexed search recall too low for {target}: {recall:.0%}"
+
+
+def test_profiles_from_normalized_tables():
+    tables = normalize_payloads(SAMPLE, collected_at=datetime(2025, 3, 3, tzinfo=timezone.utc))
+    profiles = build_artist_profiles(tables)
+    assert set(profiles.index) == {"Nova Sound", "Coldplay"}
+    assert profiles.loc["Nova Sound", "tags"] == ["indie pop"]
+    assert profiles.loc["Coldplay", "tags"] == ["britpop", "rock"]
+
+    engine = SimilarityEngine().fit(profiles)
+    scores = engine.score("Nova Sound", ["Coldplay"])
+    assert scores["audience_overlap"].iloc[0] == 0
+
+
+def test_concurrent_refits_never_expose_partial_state(tmp_path, monkeypatch):
+    import itertools
+    import threading
+    import genre_analysis
+    from genre_analysis import GenrePulseAnalyzer
+
+    # Every call sees a "new" warehouse whose size alternates, forcing refits
+    analyzer = GenrePulseAnalyzer(data_directory=str(tmp_path))
+    versions = itertools.count()
+    sizes = itertools.cycle([5, 300])
+    monkeypatch.setattr(analyzer.store, "last_modified", lambda: next(versions))
+    monkeypatch.setattr(analyzer.store, "read", lambda table, **kwargs: None)
+    monkeypatch.setattr(genre_analysis, "build_artist_profiles", lambda tables: synthetic_profiles(next(sizes)))
+
+    errors = []
+
+    def compare():
+        for _ in range(40):
+            try:
+                analyzer.compare_artists("Artist 250", ["Artist 1", "Artist 2"])
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=compare) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, f"❌ {len(errors)} queries hit a half-refitted engine: {errors[0]!r}"
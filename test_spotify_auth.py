@@ -0,0 +1,86 @@
+import time
+import threading
+from cache import ResponseCache
+from spotify_auth import SpotifyTokenManager
+from data_collector import GenreDataCollector
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class FakeAuthHttp:
+    def __init__(self, expires_in=3600, delay=0.0):
+        self.expires_in = expires_in
+        self.delay = delay
+        self.posts = 0
+        self.gets = []
+
+    def post(self, url, data=None, policy=None):
+        self.posts += 1
+        time.sleep(self.delay)
+        return FakeResponse(200, {"access_token": f"token-{self.posts}", "expires_in": self.expires_in})
+
+    def get(self, url, headers=None, params=None, policy=None):
+        self.gets.append(headers["Authorization"])
+        if headers["Authorization"] == "Bearer token-1":
+            return FakeResponse(401)
+        return FakeResponse(200, {"ok": True})
+
+    def limiter(self, provider):
+        return None
+
+
+def test_token_refreshes_before_expiry():
+    http = FakeAuthHttp(expires_in=3600)
+    manager = SpotifyTokenManager(http, "id", "secret", refresh_margin=60)
+    assert manager.get_token() == "token-1"
+    assert manager.get_token() == "token-1" and http.posts == 1
+
+    manager.expires_at = time.time() + 30
+    assert manager.get_token() == "token-2", "❌ Token inside refresh margin was not renewed"
+
+
+def test_concurrent_callers_share_one_refresh():
+    http = FakeAuthHttp(delay=0.05)
+    manager = SpotifyTokenManager(http, "id", "secret")
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(manager.get_token())) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert http.posts == 1, f"❌ {http.posts} refreshes for one expiry"
+    assert set(tokens) == {"token-1"}
+
+
+def test_unauthorized_refreshes_once_and_retries(tmp_path):
+    http = FakeAuthHttp()
+    collector = GenreDataCollector(data_directory=str(tmp_path), cache=ResponseCache(), http=http)
+    token = collector.get_spotify_token()
+
+    data = collector.fetch_data(
+        "https://api.spotify.com/v1/search",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"q": "Coldplay"}
+    )
+
+    assert data == {"ok": True}
+    assert http.gets == ["Bearer token-1", "Bearer token-2"] and http.posts == 2
+
+
+def test_status_never_hits_network():
+    http = FakeAuthHttp()
+    manager = SpotifyTokenManager(http, "id", "secret")
+    status = manager.status()
+    assert status["configured"] and not status["has_token"] and http.posts == 0
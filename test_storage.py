@@ -0,0 +1,76 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from storage import SingleFlight, atomic_write, version_directory
+
+
+def test_atomic_write_publishes_versions(tmp_path):
+    path = str(tmp_path / "report.md")
+    for i in range(4):
+        with atomic_write(path, keep_versions=2) as f:
+            f.write(f"run {i}")
+    assert open(path).read() == "run 3"
+
+    versions = sorted(os.listdir(version_directory(path)))
+    assert len(versions) == 2, "❌ Old versions were not pruned"
+    assert open(os.path.join(version_directory(path), versions[-1])).read() == "run 3"
+
+    try:
+        with atomic_write(path) as f:
+            f.write("half written")
+            raise RuntimeError("crash mid-write")
+    except RuntimeError:
+        pass
+    assert open(path).read() == "run 3", "❌ A failed write replaced the published file"
+    assert not [f for f in os.listdir(version_directory(path)) if f.endswith(".tmp")]
+
+    # Pruning this file leaves a file whose name extends it alone
+    other = str(tmp_path / "report.v2.md")
+    with atomic_write(other) as f:
+        f.write("other")
+    with atomic_write(path, keep_versions=1) as f:
+        f.write("run 4")
+    kept = {p: [open(os.path.join(version_directory(p), f)).read() for f in os.listdir(version_directory(p))] for p in (path, other)}
+    assert kept == {path: ["run 4"], other: ["other"]}, f"❌ Versions of the two files were mixed up: {kept}"
+
+
+def test_concurrent_identical_runs_join(tmp_path):
+    flights = SingleFlight(str(tmp_path / "locks"))
+    calls = []
+    started = threading.Event()
+
+    def slow_report():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return {"report_path": "weekly.md", "run": len(calls)}
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        first = pool.submit(flights.run, "weekly_report", slow_report)
+        started.wait(timeout=5)
+        joined = [pool.submit(flights.run, "weekly_report", slow_report) for _ in range(3)]
+        results = [first.result()] + [f.result() for f in joined]
+
+    assert len(calls) == 1, f"❌ {len(calls)} runs for one in-flight key"
+    assert all(r == {"report_path": "weekly.md", "run": 1} for r in results)
+
+    # Once nothing is in flight a new request runs again
+    assert flights.run("weekly_report", slow_report)["run"] == 2
+
+
+def test_waiter_runs_when_holder_fails(tmp_path):
+    flights = SingleFlight(str(tmp_path / "locks"))
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.2)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        failed = pool.submit(flights.run, "weekly_report", failing)
+        started.wait(timeout=5)
+        waiter = pool.submit(flights.run, "weekly_report", lambda: "fresh")
+        assert waiter.result() == "fresh"
+        assert isinstance(failed.exception(), RuntimeError)
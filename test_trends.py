@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import pandas as pd
+from trends import trend_signals, rank_trends, weekly_snapshots
+
+
+def weekly_history(series, weeks=10, seed=0):
+    # series: unique_id -> growth multiplier applied in the final week
+    rng = np.random.default_rng(seed)
+    ds = pd.date_range("2025-01-05", periods=weeks, freq="W")
+    frames = []
+    for uid, jump in series.items():
+        y = 100 * np.cumprod(1 + rng.normal(0.01, 0.02, weeks))
+        y[-1] = y[-2] * jump
+        frames.append(pd.DataFrame({"unique_id": uid, "ds": ds, "y": y}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_signals_match_per_series_computation():
+    history = weekly_history({
+        "genre|afrobeat|listeners": 1.4,
+        "genre|rock|popularity": 0.7,
+        "genre|ambient|listeners": 1.05,
+        "spotify|Nova Sound|followers": 1.2,
+    })
+    signals = trend_signals(history, window=4).set_index("unique_id")
+
+    for uid, group in weekly_snapshots(history).groupby("unique_id"):
+        growth = group["y"].pct_change().to_numpy()
+        prior = growth[-5:-1]
+        row = signals.loc[uid]
+        assert np.isclose(row["growth"], growth[-1])
+        assert np.isclose(row["acceleration"], growth[-1] - growth[-2])
+        assert np.isclose(row["zscore"], (growth[-1] - prior.mean()) / prior.std(ddof=1)), f"❌ Wrong z-score for {uid}"
+
+    ranked = rank_trends(signals.reset_index(), k=2)
+    assert list(ranked["breakout"]["entity"]) == ["afrobeat", "ambient"]
+    assert list(ranked["declining"]["entity"]) == ["rock"]
+    assert "Nova Sound" in set(ranked["early"]["entity"])
+
+
+def test_signals_scale_to_many_series():
+    n_series, weeks = 20000, 12
+    rng = np.random.default_rng(1)
+    history = pd.DataFrame({
+        "unique_id": np.repeat([f"genre|g{i}|listeners" for i in range(n_series)], weeks),
+        "ds": np.tile(pd.date_range("2025-01-05", periods=weeks, freq="W").to_numpy(), n_series),
+        "y": rng.uniform(50, 150, n_series * weeks),
+    })
+
+    started = time.perf_counter()
+    ranked = rank_trends(trend_signals(history), k=5)
+    elapsed = time.perf_counter() - started
+
+    assert ranked["series"] == n_series and len(ranked["breakout"]) == 5
+    assert elapsed < 1.0, f"❌ Trend detection took {elapsed:.2f}s for {n_series} series"
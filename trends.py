@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+
+from history_store import KEY_SEPARATOR
+
+# Weeks of prior week-over-week growth a series' latest move is scored against
+ZSCORE_WINDOW = 8
+
+# Weekly points a series needs before it is ranked (two growth values)
+MIN_TREND_POINTS = 3
+
+SIGNAL_COLUMNS = [
+    "unique_id", "source", "entity", "metric", "week", "value", "points",
+    "growth", "previous_growth", "acceleration", "zscore",
+]
+
+
+def weekly_snapshots(df):
+    # One point per series per week (its last observation), sorted by series
+    # then week. Takes and returns the long unique_id, ds, y format.
+    df = df.assign(ds=df["ds"].dt.to_period("W").dt.end_time.dt.normalize())
+    return df.groupby(["unique_id", "ds"], as_index=False, sort=True)["y"].last()
+
+
+def trend_signals(history, window=ZSCORE_WINDOW):
+    # Latest-week signals for every series in one vectorized pass:
+    #   growth          - week-over-week change of the latest week
+    #   previous_growth - the same for the week before
+    #   acceleration    - growth minus previous_growth
+    #   zscore          - growth against the mean/std of the series' growth
+    #                     over the `window` weeks before the latest one
+    # Series are contiguous after weekly_snapshots, so per-series windows
+    # come from prefix sums between group boundaries, not a loop per series.
+    weekly = weekly_snapshots(history)
+    if weekly.empty:
+        return pd.DataFrame(columns=SIGNAL_COLUMNS)
+
+    ids = weekly["unique_id"].to_numpy()
+    y = weekly["y"].to_numpy(dtype=float)
+    n = len(y)
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    ends = np.r_[starts[1:], n]
+    points = ends - starts
+    first = np.zeros(n, dtype=bool)
+    first[starts] = True
+
+    previous = np.r_[np.nan, y[:-1]]
+    previous[first] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = np.where(previous > 0, y / previous - 1, np.nan)
+
+    valid = ~np.isnan(growth)
+    filled = np.where(valid, growth, 0.0)
+    sums = np.r_[0.0, np.cumsum(filled)]
+    squares = np.r_[0.0, np.cumsum(filled * filled)]
+    counts = np.r_[0, np.cumsum(valid)]
+
+    last = ends - 1
+    lo = np.maximum(starts, last - window)
+    m = counts[last] - counts[lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = (sums[last] - sums[lo]) / m
+        variance = ((squares[last] - squares[lo]) - m * mean * mean) / (m - 1)
+        std = np.sqrt(np.clip(variance, 0.0, None))
+        zscore = np.where((m >= 2) & (std > 1e-12), (growth[last] - mean) / std, np.nan)
+
+    previous_growth = np.where(points >= 2, growth[np.maximum(last - 1, 0)], np.nan)
+    signals = pd.DataFrame({
+        "unique_id": ids[last],
+        "week": weekly["ds"].to_numpy()[last],
+        "value": y[last],
+        "points": points,
+        "growth": growth[last],
+        "previous_growth": previous_growth,
+        "acceleration": growth[last] - previous_growth,
+        "zscore": zscore,
+    })
+    parts = signals["unique_id"].str.split(KEY_SEPARATOR, n=2, expand=True)
+    signals["source"], signals["entity"], signals["metric"] = parts[0], parts[1], parts[2]
+    return signals[SIGNAL_COLUMNS]
+
+
+def rank_trends(signals, k=5, min_points=MIN_TREND_POINTS):
+    # Top-k lists for the report, over series observed in the latest week:
+    #   breakout  - growing genres, most unusual growth (z-score) first
+    #   declining - shrinking genres, most unusual drop first
+    #   early     - any genre or artist whose growth is positive and
+    #               speeding up, excluding the breakouts
+    # A genre tracked by several metrics appears once, by its best one.
+    empty = signals.iloc[0:0]
+    if signals.empty:
+        return {"week": None, "series": 0, "breakout": empty, "declining": empty, "early": empty}
+
+    week = signals["week"].max()
+    current = signals[(signals["week"] == week) & (signals["points"] >= min_points) & signals["growth"].notna()]
+    genres = current[current["source"] == "genre"]
+    breakout = (
+        genres[genres["growth"] > 0]
+        .sort_values(["zscore", "growth"], ascending=False, na_position="last")
+        .drop_duplicates("entity")
+        .head(k)
+    )
+    declining = (
+        genres[genres["growth"] < 0]
+        .sort_values(["zscore", "growth"], ascending=True, na_position="last")
+        .drop_duplicates("entity")
+        .head(k)
+    )
+    rising = current[(current["growth"] > 0) & (current["acceleration"] > 0)]
+    early = (
+        rising[~rising["entity"].isin(breakout["entity"])]
+        .sort_values("acceleration", ascending=False)
+        .drop_duplicates("entity")
+        .head(k)
+    )
+    return {
+        "week": week,
+        "series": len(signals),
+        "breakout": breakout.reset_index(drop=True),
+        "declining": declining.reset_index(drop=True),
+        "early": early.reset_index(drop=True),
+    }